@@ -3,6 +3,7 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from bson import ObjectId
 from app.models.user import User
+from app.services import user_cache
 from app.core.security import decode_token
 from app.core.roles import get_permissions_for_role, has_permission
 from app.core.exceptions import UnauthorizedError, ForbiddenError
@@ -27,7 +28,7 @@ async def get_current_user(
     if not user_id:
         raise UnauthorizedError("Invalid token payload")
     
-    user = await User.get(ObjectId(user_id))
+    user = await user_cache.get_user(ObjectId(user_id))
     if not user:
         raise UnauthorizedError("User not found")
     
@@ -35,7 +36,7 @@ async def get_current_user(
 
 
 def require_permission(permission: str):
-    """Dependency factory to require a specific permission"""
+    """Dependency factory to require a specific permission (checked against the cached user's role)"""
     async def permission_checker(current_user: User = Depends(get_current_user)) -> User:
         user_permissions = get_permissions_for_role(current_user.role)
         if not has_permission(user_permissions, permission):
@@ -1,4 +1,7 @@
-from fastapi import APIRouter, Depends, Query, status
+import ipaddress
+import logging
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request, status
 from app.api.deps import get_current_user
 from app.models.user import User
 from app.schemas.auth import (
@@ -15,9 +18,14 @@ from app.schemas.auth import (
     VerifyEmailRequest,
 )
 from app.services import auth_service
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+_proxy_warning_logged = False
+
 
 @router.post("/register", response_model=RegisterResponse, status_code=status.HTTP_201_CREATED)
 async def register(data: RegisterRequest):
@@ -25,10 +33,45 @@ async def register(data: RegisterRequest):
     return await auth_service.register_user(data)
 
 
+def _warn_if_behind_proxy(request: Request, client_ip: Optional[str]) -> None:
+    """Warn once if logins seem to arrive through a proxy whose forwarded IPs aren't trusted
+
+    Every login then shares the proxy's per-IP throttling window.
+    """
+    global _proxy_warning_logged
+    if _proxy_warning_logged:
+        return
+    try:
+        private = client_ip is not None and ipaddress.ip_address(client_ip).is_private
+    except ValueError:
+        private = False
+    if private or request.headers.get("x-forwarded-for"):
+        _proxy_warning_logged = True
+        logger.warning(
+            f"Login request from {client_ip} looks proxied but LOGIN_TRUST_FORWARDED_FOR is off: "
+            "all clients share one per-IP login window. Enable it behind a trusted reverse proxy."
+        )
+
+
+def _client_ip(request: Request) -> Optional[str]:
+    if settings.LOGIN_TRUST_FORWARDED_FOR:
+        # Proxies append the address they received the request from, so only the
+        # last LOGIN_TRUSTED_PROXY_HOPS entries are trustworthy; anything further
+        # left was sent by the client and can be forged.
+        forwarded_for = [ip.strip() for ip in request.headers.get("x-forwarded-for", "").split(",") if ip.strip()]
+        hops = max(settings.LOGIN_TRUSTED_PROXY_HOPS, 1)
+        if len(forwarded_for) >= hops:
+            return forwarded_for[-hops]
+    client_ip = request.client.host if request.client else None
+    if not settings.LOGIN_TRUST_FORWARDED_FOR:
+        _warn_if_behind_proxy(request, client_ip)
+    return client_ip
+
+
 @router.post("/login", response_model=LoginResponse)
-async def login(data: LoginRequest):
-    """Login user"""
-    return await auth_service.login_user(data)
+async def login(data: LoginRequest, request: Request):
+    """Login user (throttled per email and client IP)"""
+    return await auth_service.login_user(data, _client_ip(request))
 
 
 @router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
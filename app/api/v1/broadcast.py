@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, status
+from bson import ObjectId
+from app.api.deps import require_permission
+from app.models.user import User
+from app.schemas.broadcast import BroadcastCreate, BroadcastResponse
+from app.services import broadcast_service
+
+router = APIRouter()
+
+
+@router.post("", response_model=BroadcastResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_broadcast(
+    data: BroadcastCreate,
+    current_user: User = Depends(require_permission("send-messages")),
+):
+    """Send a message to many conversations of one account. Returns the job; sending continues in the background."""
+    return await broadcast_service.create_broadcast(current_user.id, data, current_user.role)
+
+
+@router.get("/{broadcast_id}", response_model=BroadcastResponse)
+async def get_broadcast(
+    broadcast_id: str,
+    current_user: User = Depends(require_permission("send-messages")),
+):
+    """Get a broadcast's progress and per-recipient results"""
+    return await broadcast_service.get_broadcast(ObjectId(broadcast_id), current_user.id, current_user.role)
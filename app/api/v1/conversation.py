@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, Query, status
+from datetime import datetime
 from bson import ObjectId
 from app.api.deps import get_current_user, require_permission
 from app.models.user import User
@@ -83,7 +84,7 @@ async def delete_conversation(
     if not account:
         raise NotFoundError("Conversation not found")
     
-    conversation.isActive = False
-    await conversation.save()
+    # Targeted update: a full save could overwrite concurrent counter/lastMessage updates
+    await conversation.set({"isActive": False, "updatedAt": datetime.utcnow()})
     return None
 
@@ -0,0 +1,40 @@
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Query
+from bson import ObjectId
+from app.api.deps import require_permission
+from app.models.user import User
+from app.schemas.dead_letter import DeadLetterListResponse, DeadLetterBulkRequest, DeadLetterBulkResponse
+from app.services import dead_letter_service
+
+router = APIRouter()
+
+
+@router.get("", response_model=DeadLetterListResponse)
+async def list_dead_letters(
+    status: Optional[Literal["pending", "exhausted"]] = Query(None),
+    limit: int = Query(50, ge=1, le=100),
+    skip: int = Query(0, ge=0),
+    current_user: User = Depends(require_permission("view-logs")),
+):
+    """List webhook events that failed processing"""
+    return await dead_letter_service.list_dead_letters(status, skip, limit)
+
+
+@router.post("/replay", response_model=DeadLetterBulkResponse)
+async def replay_dead_letters(
+    data: DeadLetterBulkRequest,
+    current_user: User = Depends(require_permission("view-logs")),
+):
+    """Schedule dead letters for an immediate retry"""
+    count = await dead_letter_service.replay_dead_letters([ObjectId(id) for id in data.ids])
+    return {"count": count}
+
+
+@router.post("/discard", response_model=DeadLetterBulkResponse)
+async def discard_dead_letters(
+    data: DeadLetterBulkRequest,
+    current_user: User = Depends(require_permission("view-logs")),
+):
+    """Delete dead letters without retrying them"""
+    count = await dead_letter_service.discard_dead_letters([ObjectId(id) for id in data.ids])
+    return {"count": count}
@@ -1,4 +1,6 @@
+from typing import Optional
 from fastapi import APIRouter, Depends, Query, status
+from fastapi.responses import StreamingResponse
 from bson import ObjectId
 from app.api.deps import get_current_user, require_permission
 from app.models.user import User
@@ -7,6 +9,8 @@ from app.schemas.instagram_account import (
     InstagramAccountResponse,
     InstagramAccountUpdate,
     InstagramProfileResponse,
+    InstagramMediaPageResponse,
+    BackfillJobResponse,
 )
 from app.services import instagram_service
 
@@ -72,3 +76,44 @@ async def get_instagram_profile(
     """Get Instagram profile details. Admins can access any account."""
     return await instagram_service.get_instagram_profile(ObjectId(account_id), current_user.id, current_user.role)
 
+
+
+@router.get("/{account_id}/media", response_model=InstagramMediaPageResponse)
+async def get_instagram_media(
+    account_id: str,
+    limit: int = Query(25, ge=1, le=100),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's `next`"),
+    current_user: User = Depends(require_permission("manage-instagram-accounts")),
+):
+    """Get a page of the account's media. Admins can access any account."""
+    return await instagram_service.get_instagram_media(
+        ObjectId(account_id), current_user.id, current_user.role, limit, after
+    )
+
+
+@router.get("/{account_id}/media/stream")
+async def stream_instagram_media(
+    account_id: str,
+    current_user: User = Depends(require_permission("manage-instagram-accounts")),
+):
+    """Stream all of the account's media as NDJSON (one item per line). Admins can access any account."""
+    stream = await instagram_service.stream_instagram_media(ObjectId(account_id), current_user.id, current_user.role)
+    return StreamingResponse(stream, media_type="application/x-ndjson")
+
+
+@router.post("/{account_id}/backfill", response_model=BackfillJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def start_instagram_backfill(
+    account_id: str,
+    current_user: User = Depends(require_permission("manage-instagram-accounts")),
+):
+    """Import the account's conversation history in the background. A failed import resumes from its checkpoint."""
+    return await instagram_service.start_instagram_backfill(ObjectId(account_id), current_user.id, current_user.role)
+
+
+@router.get("/{account_id}/backfill", response_model=BackfillJobResponse)
+async def get_instagram_backfill(
+    account_id: str,
+    current_user: User = Depends(require_permission("manage-instagram-accounts")),
+):
+    """Progress of the account's latest history import"""
+    return await instagram_service.get_instagram_backfill(ObjectId(account_id), current_user.id, current_user.role)
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, Query, status
+from typing import Literal
+from fastapi import APIRouter, Depends, Query, Response, status
 from bson import ObjectId
 from app.api.deps import get_current_user, require_permission
 from app.models.user import User
@@ -25,10 +26,21 @@ async def get_messages(
 async def send_message(
     conversation_id: str,
     data: MessageCreate,
+    response: Response,
+    mode: Literal["sync", "async"] = Query("sync"),
     current_user: User = Depends(require_permission("send-messages")),
 ):
-    """Send a message via Instagram API. Admins can send from any account."""
-    return await message_service.send_message(ObjectId(conversation_id), current_user.id, data, current_user.role)
+    """Send a message via Instagram API. Admins can send from any account.
+    
+    With mode=async the message is stored as pending and 202 is returned at once;
+    poll the conversation's messages for its status (sent/failed).
+    """
+    message = await message_service.send_message(
+        ObjectId(conversation_id), current_user.id, data, current_user.role, mode
+    )
+    if mode == "async":
+        response.status_code = status.HTTP_202_ACCEPTED
+    return message
 
 
 @router.post("/{conversation_id}/read", status_code=status.HTTP_204_NO_CONTENT)
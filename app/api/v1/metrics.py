@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends
+from app.api.deps import require_permission
+from app.models.user import User
+from app.services import webhook_service, webhook_queue_service, dead_letter_service, outbound_service, user_cache, login_throttle
+from app.utils.graph_batcher import profile_batcher
+from app.utils.meta_api import circuit_breaker
+from app.utils.rate_limiter import rate_limiter
+
+router = APIRouter()
+
+
+@router.get("")
+async def get_metrics(
+    current_user: User = Depends(require_permission("view-logs")),
+):
+    """Get runtime metrics for background processing"""
+    return {
+        "webhookQueue": await webhook_queue_service.get_queue_stats(),
+        "webhookDispatcher": webhook_service.dispatcher.metrics(),
+        "deadLetters": await dead_letter_service.get_dead_letter_stats(),
+        "outboundQueue": await outbound_service.get_outbound_stats(),
+        "outboundDispatcher": outbound_service.dispatcher.metrics(),
+        "metaRateLimiter": rate_limiter.metrics(),
+        "metaCircuitBreaker": circuit_breaker.metrics(),
+        "metaProfileBatcher": profile_batcher.metrics(),
+        "userCache": user_cache.get_user_cache_stats(),
+        "loginThrottle": login_throttle.get_login_throttle_stats(),
+    }
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1 import auth, instagram_account, conversation, message, webhook, upload
+from app.api.v1 import auth, instagram_account, conversation, message, webhook, upload, metrics, dead_letter, broadcast
 
 router = APIRouter(prefix="/v1")
 
@@ -7,6 +7,8 @@ router.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 router.include_router(instagram_account.router, prefix="/instagram", tags=["Instagram Accounts"])
 router.include_router(conversation.router, prefix="/conversations", tags=["Conversations"])
 router.include_router(message.router, prefix="/messages", tags=["Messages"])
+router.include_router(broadcast.router, prefix="/broadcasts", tags=["Broadcasts"])
 router.include_router(webhook.router, prefix="/webhook", tags=["Webhook"])
 router.include_router(upload.router, prefix="/upload", tags=["Upload"])
-
+router.include_router(dead_letter.router, prefix="/dead-letters", tags=["Dead Letters"])
+router.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Query, Request, status
 from fastapi.responses import PlainTextResponse
-from app.services import webhook_service
+from app.services import webhook_service, webhook_queue_service
 from app.config.settings import settings
 import logging
 
@@ -26,13 +26,21 @@ async def verify_webhook(
 
 @router.post("")
 async def handle_webhook(request: Request):
-    """Handle webhook events from Meta"""
+    """Handle webhook events from Meta
+    
+    The signed raw body is persisted to the webhook queue and acknowledged
+    immediately; queue workers parse and process it in the background.
+    """
+    body = await request.body()
+    if not webhook_service.verify_signature(body, request.headers.get("X-Hub-Signature-256")):
+        logger.warning("Webhook signature verification failed")
+        return PlainTextResponse("Forbidden", status_code=status.HTTP_403_FORBIDDEN)
+    
     try:
-        event_data = await request.json()
-        logger.info(f"Webhook POST received from {request.client.host if request.client else 'unknown'}")
-        result = await webhook_service.process_webhook_event(event_data)
-        return result
+        await webhook_queue_service.enqueue_webhook_event(body)
     except Exception as e:
-        logger.error(f"Error handling webhook request: {e}", exc_info=True)
-        return "EVENT_RECEIVED"  # Always return success to Meta
-
+        logger.error(f"Error enqueuing webhook event: {e}", exc_info=True)
+        # Not persisted - let Meta redeliver instead of dropping the event
+        return PlainTextResponse("EVENT_NOT_PERSISTED", status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    return "EVENT_RECEIVED"
@@ -1,4 +1,5 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 from beanie import init_beanie
 from app.config.settings import settings
 from app.models.user import User
@@ -6,6 +7,12 @@ from app.models.token import Token
 from app.models.instagram_account import InstagramAccount
 from app.models.conversation import Conversation
 from app.models.message import Message
+from app.models.webhook_event import WebhookEvent
+from app.models.contact import Contact
+from app.models.dead_letter import DeadLetter
+from app.models.broadcast_job import BroadcastJob
+from app.models.backfill_job import BackfillJob
+from app.models.login_attempt import LoginAttempt
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,14 +20,131 @@ logger = logging.getLogger(__name__)
 client: AsyncIOMotorClient = None
 
 
+async def _remove_duplicate_messages(database) -> None:
+    """Delete duplicate messages (same messageId), keeping the oldest copy
+
+    The unique messageId_1 index can't be built while duplicates from the old,
+    non-atomic ingestion path exist.
+    """
+    duplicates = database["messages"].aggregate(
+        [
+            {"$match": {"messageId": {"$gt": ""}}},
+            {"$group": {"_id": "$messageId", "ids": {"$push": "$_id"}}},
+            {"$match": {"ids.1": {"$exists": True}}},
+        ],
+        allowDiskUse=True,
+    )
+    removed = 0
+    async for group in duplicates:
+        _, *duplicate_ids = sorted(group["ids"])
+        result = await database["messages"].delete_many({"_id": {"$in": duplicate_ids}})
+        removed += result.deleted_count
+        logger.warning(f"Removed {result.deleted_count} duplicate(s) of message {group['_id']}")
+    if removed:
+        logger.warning(f"Removed {removed} duplicate messages before building the unique messageId_1 index")
+
+
+async def _merge_duplicate_conversations(database) -> None:
+    """Fold duplicate active conversations (same account and user) into the oldest one
+
+    Earlier versions could create them under concurrent deliveries; the unique
+    active_conversation_unique index can't be built while they exist.
+    """
+    conversations = database["conversations"]
+    duplicates = conversations.aggregate(
+        [
+            {"$match": {"isActive": True}},
+            {"$group": {"_id": {"account": "$instagramAccount", "user": "$igUserId"}, "ids": {"$push": "$_id"}}},
+            {"$match": {"ids.1": {"$exists": True}}},
+        ],
+        allowDiskUse=True,
+    )
+    async for group in duplicates:
+        keep_id, *duplicate_ids = sorted(group["ids"])
+        logger.warning(f"Merging duplicate conversations {duplicate_ids} into {keep_id}")
+        await database["messages"].update_many(
+            {"conversation": {"$in": duplicate_ids}}, {"$set": {"conversation": keep_id}}
+        )
+        updates = []
+        async for duplicate in conversations.find({"_id": {"$in": duplicate_ids}}):
+            if duplicate.get("lastMessageTimestamp"):
+                updates.extend(
+                    Conversation.last_message_updates(
+                        keep_id,
+                        duplicate.get("lastMessage"),
+                        duplicate["lastMessageTimestamp"],
+                        unread_increment=duplicate.get("unreadCount", 0),
+                    )
+                )
+            if duplicate.get("lastInboundAt"):
+                updates.append(UpdateOne({"_id": keep_id}, {"$max": {"lastInboundAt": duplicate["lastInboundAt"]}}))
+        if updates:
+            await conversations.bulk_write(updates)
+        await conversations.update_many({"_id": {"$in": duplicate_ids}}, {"$set": {"isActive": False}})
+
+
+async def _mark_active_backfills(database) -> None:
+    """Set the active flag on backfill jobs created before it existed
+
+    Only the oldest pending/running job per account stays active (the others
+    were queued by racing requests and are failed) so active_backfill_unique
+    can be built.
+    """
+    jobs = database["backfill_jobs"]
+    await jobs.update_many(
+        {"active": {"$exists": False}},
+        [{"$set": {"active": {"$in": ["$status", ["pending", "running"]]}}}],
+    )
+    duplicates = jobs.aggregate(
+        [
+            {"$match": {"active": True}},
+            {"$group": {"_id": "$instagramAccount", "ids": {"$push": "$_id"}}},
+            {"$match": {"ids.1": {"$exists": True}}},
+        ]
+    )
+    async for group in duplicates:
+        _, *duplicate_ids = sorted(group["ids"])
+        logger.warning(f"Failing duplicate backfill jobs {duplicate_ids} of account {group['_id']}")
+        await jobs.update_many(
+            {"_id": {"$in": duplicate_ids}},
+            {"$set": {"status": "failed", "active": False, "leaseExpiresAt": None, "error": "Duplicate backfill job"}},
+        )
+
+
+async def _migrate_indexes(database) -> None:
+    """Drop indexes whose options changed so init_beanie can recreate them"""
+    # messageId_1 used to be a plain index; webhook ingestion now relies on it being unique
+    indexes = await database["messages"].index_information()
+    if not indexes.get("messageId_1", {}).get("unique"):
+        await _remove_duplicate_messages(database)
+        if "messageId_1" in indexes:
+            logger.info("Dropping non-unique messageId_1 index")
+            await database["messages"].drop_index("messageId_1")
+    
+    # Active conversations are now unique per (instagramAccount, igUserId)
+    indexes = await database["conversations"].index_information()
+    if "active_conversation_unique" not in indexes:
+        await _merge_duplicate_conversations(database)
+        if "instagramAccount_1_igUserId_1" in indexes:
+            logger.info("Dropping non-unique instagramAccount_1_igUserId_1 index")
+            await database["conversations"].drop_index("instagramAccount_1_igUserId_1")
+    
+    # At most one pending/running backfill per account
+    indexes = await database["backfill_jobs"].index_information()
+    if "active_backfill_unique" not in indexes:
+        await _mark_active_backfills(database)
+
+
 async def connect_to_mongo():
     """Create database connection"""
     global client
     try:
         client = AsyncIOMotorClient(settings.MONGODB_URL)
+        database = client.get_default_database()
+        await _migrate_indexes(database)
         await init_beanie(
-            database=client.get_default_database(),
-            document_models=[User, Token, InstagramAccount, Conversation, Message]
+            database=database,
+            document_models=[User, Token, InstagramAccount, Conversation, Message, WebhookEvent, Contact, DeadLetter, BroadcastJob, BackfillJob, LoginAttempt]
         )
         logger.info("Connected to MongoDB")
     except Exception as e:
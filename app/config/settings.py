@@ -14,12 +14,93 @@ class Settings(BaseSettings):
     JWT_SECRET: str 
     JWT_ACCESS_EXPIRATION_MINUTES: int 
     JWT_REFRESH_EXPIRATION_DAYS: int
+    JWT_DECODE_CACHE_SIZE: int = 10000  # Verified tokens kept until their exp (0 disables)
+    
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12  # Existing hashes are upgraded on the next login after a change
+    BCRYPT_MAX_WORKERS: int = 2  # Concurrent hashes off the event loop
+    
+    # Login throttling (sliding windows, checked before any DB lookup or bcrypt work)
+    LOGIN_EMAIL_MAX_ATTEMPTS: int = 5
+    LOGIN_EMAIL_WINDOW_SECONDS: int = 300
+    LOGIN_IP_MAX_ATTEMPTS: int = 30
+    LOGIN_IP_WINDOW_SECONDS: int = 300
+    LOGIN_LIMITER_BACKEND: str = "memory"  # "mongo" shares attempt counts between workers
+    LOGIN_LIMITER_MAX_KEYS: int = 100000  # In-memory keys tracked (least recently used are dropped)
+    LOGIN_TRUST_FORWARDED_FOR: bool = False  # Take the client IP from X-Forwarded-For (behind a proxy)
+    LOGIN_TRUSTED_PROXY_HOPS: int = 1  # Proxies in front of the app that append to X-Forwarded-For
+    
+    # Authenticated user cache (get_current_user)
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: int = 60  # Bounds staleness across workers; local changes invalidate at once
     
     # Meta Instagram API
     META_APP_ID: str
     META_APP_SECRET: str
     META_VERIFY_TOKEN: str
     META_API_VERSION: str
+    META_GRAPH_URL: str = "https://graph.facebook.com"
+    
+    # Meta Graph HTTP client
+    META_HTTP2: bool = False
+    META_HTTP_MAX_CONNECTIONS: int = 100
+    META_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    META_HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    META_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    META_PROFILE_TIMEOUT_SECONDS: float = 10.0
+    META_DISCOVERY_TIMEOUT_SECONDS: float = 20.0
+    META_SEND_TIMEOUT_SECONDS: float = 15.0
+    
+    # Meta Graph rate limiting (per page / Instagram Business account)
+    META_RATE_LIMIT_PER_SECOND: float = 20.0
+    META_RATE_LIMIT_BURST: int = 40
+    META_USAGE_SLOWDOWN_THRESHOLD: float = 75.0  # Usage % at which to start slowing down
+    META_RATE_LIMIT_MIN_FACTOR: float = 0.05
+    META_RATE_LIMIT_PAUSE_SECONDS: float = 60.0
+    # Longest a Graph call waits for the limiter before failing with a retryable error;
+    # backfills and broadcasts, which nobody waits on, may wait up to the background limit
+    META_RATE_LIMIT_MAX_WAIT_SECONDS: float = 5.0
+    META_RATE_LIMIT_BACKGROUND_MAX_WAIT_SECONDS: float = 900.0
+    
+    # Meta Graph retries and per-account circuit breaker
+    META_RETRY_ATTEMPTS: int = 3
+    META_RETRY_BASE_DELAY_SECONDS: float = 0.2
+    META_RETRY_MAX_DELAY_SECONDS: float = 2.0
+    META_CIRCUIT_FAILURE_THRESHOLD: int = 5  # Consecutive failed calls before failing fast
+    META_CIRCUIT_RESET_SECONDS: float = 30.0
+    META_CIRCUIT_FATAL_RESET_SECONDS: float = 300.0  # After invalid token / permission errors
+    
+    # Graph batch requests for profile lookups
+    META_BATCH_WINDOW_SECONDS: float = 0.02  # How long lookups are collected before sending
+    META_BATCH_MAX_SIZE: int = 50  # Graph allows at most 50 sub-requests per batch
+    
+    # Outbound send queue (POST /v1/messages/{id}?mode=async)
+    OUTBOUND_SEND_CONCURRENCY: int = 16
+    OUTBOUND_LEASE_SECONDS: int = 120  # Must exceed a send including Graph retries
+    OUTBOUND_SWEEP_INTERVAL_SECONDS: float = 10.0
+    OUTBOUND_MAX_ATTEMPTS: int = 3  # Deliveries interrupted by a crash before giving up
+    
+    # Instagram profile details cache (GET /v1/instagram/{id}/profile)
+    PROFILE_CACHE_SIZE: int = 1000
+    PROFILE_CACHE_TTL_SECONDS: int = 300  # Older entries are served while refreshed in the background
+    PROFILE_CACHE_MAX_STALE_SECONDS: int = 86400  # Older entries are refetched before responding
+    
+    # Conversation backfill (history import from the Graph Conversations API)
+    BACKFILL_ON_CONNECT: bool = False  # Start a backfill when an account is connected
+    BACKFILL_CONCURRENCY: int = 4  # Conversations imported in parallel
+    BACKFILL_PAGE_SIZE: int = 25  # Conversations per page (one checkpoint per page)
+    BACKFILL_MESSAGE_PAGE_SIZE: int = 100
+    BACKFILL_LEASE_SECONDS: int = 300
+    BACKFILL_POLL_SECONDS: float = 30.0
+    
+    # Broadcasts
+    MESSAGING_WINDOW_HOURS: int = 24  # Meta only allows replies this long after the user's last message
+    BROADCAST_CONCURRENCY: int = 8  # Concurrent sends per broadcast (Graph rate limiting applies on top)
+    BROADCAST_MAX_RECIPIENTS: int = 5000
+    BROADCAST_FLUSH_SIZE: int = 100  # Results written to Mongo per batch
+    BROADCAST_STORE_ATTEMPTS: int = 3  # Tries to store a batch of sent messages before failing the broadcast
+    BROADCAST_LEASE_SECONDS: int = 120  # Renewed every third of this while the broadcast runs
+    BROADCAST_RECOVERY_INTERVAL_SECONDS: float = 30.0
     
     # CORS - can be comma-separated string or "*" for all
     CORS_ORIGINS: str
@@ -29,6 +110,33 @@ class Settings(BaseSettings):
     CLOUDINARY_API_KEY: str
     CLOUDINARY_API_SECRET: str
     
+    # Webhook queue
+    WEBHOOK_WORKER_COUNT: int = 4
+    WEBHOOK_LEASE_SECONDS: int = 60
+    WEBHOOK_POLL_INTERVAL_SECONDS: float = 1.0
+    WEBHOOK_MAX_ATTEMPTS: int = 5
+    WEBHOOK_RETRY_BASE_DELAY_SECONDS: float = 5.0  # Doubles per failed attempt
+    WEBHOOK_RETRY_MAX_DELAY_SECONDS: float = 300.0
+    WEBHOOK_DISPATCH_CONCURRENCY: int = 16
+    WEBHOOK_VERIFY_SIGNATURE: bool = True
+    WEBHOOK_DEBUG_SAMPLE_RATE: float = 0.0  # Fraction of deliveries logged in full
+    
+    # Dead-letter retries for failed webhook events
+    DEAD_LETTER_MAX_ATTEMPTS: int = 8
+    DEAD_LETTER_BASE_DELAY_SECONDS: int = 30
+    DEAD_LETTER_MAX_DELAY_SECONDS: int = 3600
+    DEAD_LETTER_POLL_SECONDS: int = 15
+    
+    # Recipient-to-account routing index
+    ACCOUNT_INDEX_REFRESH_SECONDS: int = 300
+    ACCOUNT_INDEX_NEGATIVE_TTL_SECONDS: int = 60
+    ACCOUNT_INDEX_NEGATIVE_CACHE_SIZE: int = 10000
+    
+    # Contact profile cache
+    CONTACT_CACHE_SIZE: int = 50000
+    CONTACT_CACHE_TTL_SECONDS: int = 86400
+    CONTACT_FETCH_RETRY_SECONDS: int = 300
+    
     def get_cors_origins(self) -> List[str]:
         """Parse CORS origins from comma-separated string"""
         if self.CORS_ORIGINS == "*":
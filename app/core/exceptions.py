@@ -1,3 +1,5 @@
+import math
+from typing import Optional
 from fastapi import HTTPException, status
 
 
@@ -20,3 +22,13 @@ class BadRequestError(HTTPException):
     def __init__(self, detail: str = "Bad request"):
         super().__init__(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
 
+
+class ServiceUnavailableError(HTTPException):
+    def __init__(self, detail: str = "Service unavailable"):
+        super().__init__(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=detail)
+
+
+class TooManyRequestsError(HTTPException):
+    def __init__(self, detail: str = "Too many requests", retry_after: Optional[float] = None):
+        headers = {"Retry-After": str(max(math.ceil(retry_after), 1))} if retry_after is not None else None
+        super().__init__(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=detail, headers=headers)
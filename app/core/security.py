@@ -1,9 +1,25 @@
+import asyncio
+import hashlib
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 import bcrypt
 from app.config.settings import settings
 
+# Verified payloads by token digest, each kept until the token's exp. Clients send
+# the same long-lived token on every request, so this skips the HMAC check and
+# JSON parsing after the first one. Only valid tokens are cached.
+_decoded: "OrderedDict[bytes, Tuple[dict, float]]" = OrderedDict()
+
+# bcrypt is CPU-bound (~250 ms at cost 12) and releases the GIL, so async code runs
+# it on a small dedicated pool: the event loop stays responsive and at most
+# BCRYPT_MAX_WORKERS hashes run at once.
+_bcrypt_executor: Optional[ThreadPoolExecutor] = None
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
@@ -14,7 +30,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
             hash_bytes = hashed_password.encode('utf-8')
         else:
             hash_bytes = hashed_password
-        return bcrypt.checkpw(password_bytes, hash_bytes)
+        return bcrypt.checkpw(password_bytes[:72], hash_bytes)  # Same 72-byte limit as hashing
     except Exception:
         return False
 
@@ -23,11 +39,47 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     # Truncate password to 72 bytes (bcrypt limit)
     password_bytes = password.encode('utf-8')[:72]
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Whether a hash was made with a different cost than BCRYPT_ROUNDS"""
+    try:
+        # $2b$12$<salt+hash>
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+
+async def _run_bcrypt(func, *args):
+    global _bcrypt_executor
+    if _bcrypt_executor is None:
+        _bcrypt_executor = ThreadPoolExecutor(max_workers=settings.BCRYPT_MAX_WORKERS, thread_name_prefix="bcrypt")
+    return await asyncio.get_running_loop().run_in_executor(_bcrypt_executor, func, *args)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the bcrypt pool (use from async code)"""
+    return await _run_bcrypt(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash on the bcrypt pool (use from async code)"""
+    return await _run_bcrypt(get_password_hash, password)
+
+
+def new_jti() -> str:
+    """Short random token ID (JWT `jti` claim)"""
+    return secrets.token_urlsafe(12)
+
+
+def hash_jti(jti: str) -> str:
+    """Key under which a token is stored in the tokens collection"""
+    return hashlib.sha256(jti.encode("utf-8")).hexdigest()
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token - set to never expire (365 days)"""
     to_encode = data.copy()
@@ -36,6 +88,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         # Set to 365 days (effectively never expires unless logout)
         expire = datetime.utcnow() + timedelta(days=365)
+    to_encode.setdefault("jti", new_jti())
     to_encode.update({"exp": expire, "type": "access"})
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET, algorithm="HS256")
     return encoded_jwt
@@ -46,16 +99,41 @@ def create_refresh_token(data: dict) -> str:
     to_encode = data.copy()
     # Set to 365 days (effectively never expires unless logout)
     expire = datetime.utcnow() + timedelta(days=365)
+    to_encode.setdefault("jti", new_jti())
     to_encode.update({"exp": expire, "type": "refresh"})
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET, algorithm="HS256")
     return encoded_jwt
 
 
+def _token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
 def decode_token(token: str) -> dict:
     """Decode and verify a JWT token"""
+    key = _token_key(token)
+    entry = _decoded.get(key)
+    if entry is not None:
+        payload, expires = entry
+        if expires > time.time():
+            _decoded.move_to_end(key)
+            return dict(payload)
+        del _decoded[key]
+    
     try:
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
-        return payload
     except JWTError:
         return None
+    
+    if settings.JWT_DECODE_CACHE_SIZE > 0 and isinstance(payload.get("exp"), (int, float)):
+        _decoded[key] = (payload, payload["exp"])
+        while len(_decoded) > settings.JWT_DECODE_CACHE_SIZE:
+            _decoded.popitem(last=False)
+        payload = dict(payload)
+    return payload
+
+
+def evict_token(token: str) -> None:
+    """Forget a token's cached payload (call when revoking it)"""
+    _decoded.pop(_token_key(token), None)
 
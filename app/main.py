@@ -8,6 +8,13 @@ from app.config.database import connect_to_mongo, close_mongo_connection
 from app.config.logger import logger
 from app.api.v1.router import router as v1_router
 from app.core.exceptions import HTTPException as CustomHTTPException
+from app.utils import meta_api
+from app.services.account_index import account_index
+from app.services.webhook_queue_service import start_webhook_workers, stop_webhook_workers
+from app.services.dead_letter_service import start_dead_letter_scheduler, stop_dead_letter_scheduler
+from app.services.outbound_service import start_outbound_sweeper, stop_outbound_sweeper
+from app.services.backfill_service import start_backfill_scheduler, stop_backfill_scheduler
+from app.services.broadcast_service import start_broadcast_recovery, stop_broadcast_recovery
 import logging
 
 # Logging is configured in app.config.logger
@@ -36,6 +43,7 @@ async def custom_http_exception_handler(request: Request, exc: CustomHTTPExcepti
     return JSONResponse(
         status_code=exc.status_code,
         content={"error": {"code": exc.status_code, "message": exc.detail}},
+        headers=getattr(exc, "headers", None),
     )
 
 
@@ -45,6 +53,7 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     return JSONResponse(
         status_code=exc.status_code,
         content={"error": {"code": exc.status_code, "message": exc.detail}},
+        headers=getattr(exc, "headers", None),
     )
 
 
@@ -70,14 +79,28 @@ async def general_exception_handler(request: Request, exc: Exception):
 # Startup and shutdown events
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database connection on startup"""
+    """Initialize database connection and background workers on startup"""
     await connect_to_mongo()
+    await meta_api.init_client()
+    await account_index.start()
+    start_webhook_workers()
+    start_dead_letter_scheduler()
+    start_outbound_sweeper()
+    start_backfill_scheduler()
+    start_broadcast_recovery()
     logger.info("Application started")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """Close database connection on shutdown"""
+    """Stop background workers and close database connection on shutdown"""
+    await stop_broadcast_recovery()
+    await stop_backfill_scheduler()
+    await stop_outbound_sweeper()
+    await stop_dead_letter_scheduler()
+    await stop_webhook_workers()
+    await account_index.stop()
+    await meta_api.close_client()
     await close_mongo_connection()
     logger.info("Application shutdown")
 
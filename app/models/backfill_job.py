@@ -0,0 +1,56 @@
+from beanie import Document
+from pymongo import IndexModel
+from pydantic import Field, ConfigDict
+from datetime import datetime
+from typing import Optional, Literal
+from bson import ObjectId
+
+
+class BackfillJob(Document):
+    """Import of an account's historic conversations from the Graph Conversations API"""
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
+    instagramAccount: ObjectId = Field(...)
+    user: Optional[ObjectId] = None  # Who started it (None when started on connect)
+    status: Literal["pending", "running", "completed", "failed"] = Field(default="pending")
+    active: bool = True  # Pending or running; at most one active job per account
+    # Checkpoint: cursor of the conversations page to resume from (None = first page)
+    cursor: Optional[str] = None
+    conversationsProcessed: int = Field(default=0, ge=0)
+    messagesSeen: int = Field(default=0, ge=0)
+    messagesImported: int = Field(default=0, ge=0)  # New messages (others already existed)
+    attempts: int = Field(default=0, ge=0)  # Runs claimed so far; fences out stale runners
+    leaseExpiresAt: Optional[datetime] = None
+    error: Optional[str] = None
+    createdAt: datetime = Field(default_factory=datetime.utcnow)
+    updatedAt: datetime = Field(default_factory=datetime.utcnow)
+    completedAt: Optional[datetime] = None
+
+    def transform(self) -> dict:
+        """Return backfill job data with progress"""
+        return {
+            "id": str(self.id),
+            "instagramAccount": str(self.instagramAccount),
+            "status": self.status,
+            "conversationsProcessed": self.conversationsProcessed,
+            "messagesSeen": self.messagesSeen,
+            "messagesImported": self.messagesImported,
+            "attempts": self.attempts,
+            "error": self.error,
+            "createdAt": self.createdAt.isoformat(),
+            "updatedAt": self.updatedAt.isoformat(),
+            "completedAt": self.completedAt.isoformat() if self.completedAt else None,
+        }
+
+    class Settings:
+        name = "backfill_jobs"
+        indexes = [
+            [("instagramAccount", 1), ("createdAt", -1)],
+            [("status", 1), ("leaseExpiresAt", 1)],
+            IndexModel(
+                [("instagramAccount", 1)],
+                name="active_backfill_unique",
+                unique=True,
+                partialFilterExpression={"active": True},
+            ),
+        ]
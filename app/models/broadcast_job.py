@@ -0,0 +1,81 @@
+from beanie import Document
+from pydantic import BaseModel, Field, ConfigDict
+from datetime import datetime
+from typing import Optional, List, Literal
+from bson import ObjectId
+
+
+class BroadcastResult(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
+    conversation: ObjectId
+    igUserId: str
+    status: Literal["sent", "failed", "skipped"]
+    messageId: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BroadcastRecipient(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
+    conversation: ObjectId
+    igUserId: str
+
+
+class BroadcastJob(Document):
+    """One text or attachment sent to many conversations of an account"""
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
+    user: ObjectId = Field(..., index=True)  # Who started it
+    instagramAccount: ObjectId = Field(...)
+    text: Optional[str] = None
+    attachment: Optional[dict] = None  # {"type", "url"}
+    status: Literal["running", "completed", "failed"] = Field(default="running")
+    total: int = Field(default=0, ge=0)
+    sent: int = Field(default=0, ge=0)
+    failed: int = Field(default=0, ge=0)
+    skipped: int = Field(default=0, ge=0)
+    recipients: List[BroadcastRecipient] = Field(default_factory=list)  # To be sent (skipped ones excluded)
+    results: List[BroadcastResult] = Field(default_factory=list)  # Appended as recipients complete
+    attempts: int = Field(default=1, ge=0)  # Fences out a runner whose job was recovered
+    leaseExpiresAt: Optional[datetime] = None  # Renewed by the running process
+    error: Optional[str] = None
+    createdAt: datetime = Field(default_factory=datetime.utcnow)
+    updatedAt: datetime = Field(default_factory=datetime.utcnow)
+    completedAt: Optional[datetime] = None
+
+    def transform(self) -> dict:
+        """Return broadcast job data with progress"""
+        return {
+            "id": str(self.id),
+            "instagramAccount": str(self.instagramAccount),
+            "text": self.text,
+            "attachment": self.attachment,
+            "status": self.status,
+            "total": self.total,
+            "sent": self.sent,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "remaining": self.total - self.sent - self.failed - self.skipped,
+            "results": [
+                {
+                    "conversation": str(r.conversation),
+                    "igUserId": r.igUserId,
+                    "status": r.status,
+                    "messageId": r.messageId,
+                    "error": r.error,
+                }
+                for r in self.results
+            ],
+            "error": self.error,
+            "createdAt": self.createdAt.isoformat(),
+            "updatedAt": self.updatedAt.isoformat(),
+            "completedAt": self.completedAt.isoformat() if self.completedAt else None,
+        }
+
+    class Settings:
+        name = "broadcast_jobs"
+        indexes = [
+            [("instagramAccount", 1), ("createdAt", -1)],
+            [("status", 1), ("leaseExpiresAt", 1)],
+        ]
@@ -0,0 +1,21 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel
+from datetime import datetime
+from typing import Optional
+
+
+class Contact(Document):
+    """Cached Instagram profile of a user who messaged one of our accounts"""
+    igUserId: str = Field(..., min_length=1)
+    username: Optional[str] = Field(None, max_length=100)
+    name: Optional[str] = None
+    fetchedAt: datetime = Field(default_factory=datetime.utcnow)
+    createdAt: datetime = Field(default_factory=datetime.utcnow)
+    updatedAt: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "contacts"
+        indexes = [
+            IndexModel([("igUserId", 1)], unique=True),
+        ]
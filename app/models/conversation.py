@@ -1,8 +1,10 @@
 from beanie import Document
 from pydantic import Field, ConfigDict
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 from bson import ObjectId
+from pymongo import IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 
 
 class Conversation(Document):
@@ -14,16 +16,12 @@ class Conversation(Document):
     lastMessage: Optional[str] = None
     lastMessageTimestamp: Optional[datetime] = Field(None, index=True)
     unreadCount: int = Field(default=0, ge=0)
+    lastSeenByUserAt: Optional[datetime] = None  # Read receipt watermark: page messages up to here are seen
+    lastInboundAt: Optional[datetime] = None  # Last message from the user; opens the 24h messaging window
     isActive: bool = Field(default=True)
     createdAt: datetime = Field(default_factory=datetime.utcnow)
     updatedAt: datetime = Field(default_factory=datetime.utcnow)
 
-    def update_last_message(self, text: str, timestamp: datetime):
-        """Update last message and timestamp"""
-        self.lastMessage = text[:500] if text else None  # Truncate to 500 chars
-        self.lastMessageTimestamp = timestamp
-        self.updatedAt = datetime.utcnow()
-
     def transform(self) -> dict:
         """Return conversation data"""
         # Ensure timestamps are sent as UTC with 'Z' suffix for proper frontend parsing
@@ -34,6 +32,20 @@ class Conversation(Document):
                 last_msg_str = last_msg_str + 'Z'
             last_message_timestamp = last_msg_str
         
+        last_seen_by_user_at = None
+        if self.lastSeenByUserAt:
+            last_seen_str = self.lastSeenByUserAt.isoformat()
+            if not last_seen_str.endswith('Z') and '+' not in last_seen_str:
+                last_seen_str = last_seen_str + 'Z'
+            last_seen_by_user_at = last_seen_str
+        
+        last_inbound_at = None
+        if self.lastInboundAt:
+            last_inbound_str = self.lastInboundAt.isoformat()
+            if not last_inbound_str.endswith('Z') and '+' not in last_inbound_str:
+                last_inbound_str = last_inbound_str + 'Z'
+            last_inbound_at = last_inbound_str
+        
         created_at_str = self.createdAt.isoformat()
         if not created_at_str.endswith('Z') and '+' not in created_at_str:
             created_at_str = created_at_str + 'Z'
@@ -50,36 +62,98 @@ class Conversation(Document):
             "lastMessage": self.lastMessage,
             "lastMessageTimestamp": last_message_timestamp,
             "unreadCount": self.unreadCount,
+            "lastSeenByUserAt": last_seen_by_user_at,
+            "lastInboundAt": last_inbound_at,
             "isActive": self.isActive,
             "createdAt": created_at_str,
             "updatedAt": updated_at_str,
         }
 
     @classmethod
-    async def find_or_create(
+    async def upsert_active(
         cls, instagram_account_id: ObjectId, ig_user_id: str, ig_username: Optional[str] = None
-    ) -> "Conversation":
-        """Find existing conversation or create new one"""
-        conversation = await cls.find_one(
-            {"instagramAccount": instagram_account_id, "igUserId": ig_user_id, "isActive": True}
-        )
-        if not conversation:
-            conversation = cls(
-                instagramAccount=instagram_account_id,
-                igUserId=ig_user_id,
-                igUsername=ig_username,
+    ) -> ObjectId:
+        """Atomically find or create the active conversation and return its ID"""
+        now = datetime.utcnow()
+        set_on_insert = {
+            "instagramAccount": instagram_account_id,
+            "igUserId": ig_user_id,
+            "lastMessage": None,
+            "lastMessageTimestamp": None,
+            "unreadCount": 0,
+            "lastSeenByUserAt": None,
+            "lastInboundAt": None,
+            "isActive": True,
+            "createdAt": now,
+            "updatedAt": now,
+        }
+        update = {"$setOnInsert": set_on_insert}
+        if ig_username:
+            update["$set"] = {"igUsername": ig_username}
+        else:
+            set_on_insert["igUsername"] = None
+        
+        query = {"instagramAccount": instagram_account_id, "igUserId": ig_user_id, "isActive": True}
+        try:
+            result = await cls.get_motor_collection().find_one_and_update(
+                query, update, projection={"_id": 1}, upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # A concurrent upsert inserted it first (the unique index rejected ours); it now matches
+            result = await cls.get_motor_collection().find_one_and_update(
+                query, update, projection={"_id": 1}, return_document=ReturnDocument.AFTER
             )
-            await conversation.insert()
-        elif ig_username and conversation.igUsername != ig_username:
-            conversation.igUsername = ig_username
-            await conversation.save()
-        return conversation
+        return result["_id"]
+
+    @staticmethod
+    def last_message_updates(
+        conversation_id: ObjectId,
+        text: Optional[str],
+        timestamp: datetime,
+        unread_increment: int = 0,
+        inbound: bool = False,
+    ) -> List[UpdateOne]:
+        """Write operations that record a new message on a conversation
+        
+        Safe under concurrent and out-of-order processing: a single pipeline
+        update replaces lastMessage and lastMessageTimestamp together, and only
+        with a message at least as new as the current one; unreadCount is
+        incremented and lastInboundAt (for messages from the user) only moves
+        forward.
+        """
+        is_newer = {"$lte": [{"$ifNull": ["$lastMessageTimestamp", None]}, timestamp]}
+        latest = {
+            # $literal: message text must not be read as a field path or operator
+            "lastMessage": {"$cond": [is_newer, {"$literal": text[:500] if text else None}, "$lastMessage"]},
+            "lastMessageTimestamp": {"$cond": [is_newer, timestamp, "$lastMessageTimestamp"]},
+            "unreadCount": {"$add": [{"$ifNull": ["$unreadCount", 0]}, unread_increment]},
+            "updatedAt": datetime.utcnow(),
+        }
+        if inbound:
+            latest["lastInboundAt"] = {"$max": ["$lastInboundAt", timestamp]}
+        return [UpdateOne({"_id": conversation_id}, [{"$set": latest}])]
+
+    @classmethod
+    async def record_last_message(
+        cls, conversation_id: ObjectId, text: Optional[str], timestamp: datetime, unread_increment: int = 0
+    ) -> None:
+        """Atomically record a new message on a conversation (see last_message_updates)"""
+        await cls.get_motor_collection().bulk_write(
+            cls.last_message_updates(conversation_id, text, timestamp, unread_increment)
+        )
 
     class Settings:
         name = "conversations"
         indexes = [
-            [("instagramAccount", 1), ("igUserId", 1)],  # Unique compound index
+            # At most one active conversation per account and Instagram user
+            IndexModel(
+                [("instagramAccount", 1), ("igUserId", 1)],
+                name="active_conversation_unique",
+                unique=True,
+                partialFilterExpression={"isActive": True},
+            ),
             [("instagramAccount", 1), ("lastMessageTimestamp", -1)],
+            [("instagramAccount", 1), ("lastInboundAt", -1)],
             [("igUserId", 1)],
         ]
 
@@ -0,0 +1,41 @@
+from beanie import Document
+from pydantic import Field
+from datetime import datetime
+from typing import Optional, Literal
+
+
+class DeadLetter(Document):
+    """Webhook messaging event that failed processing and is waiting to be retried"""
+    event: dict = Field(...)  # Meta-shaped entry[].messaging[] item
+    recipientId: Optional[str] = None
+    senderId: Optional[str] = None
+    errorClass: str = Field(...)
+    errorMessage: Optional[str] = None
+    attempts: int = Field(default=1, ge=0)
+    status: Literal["pending", "exhausted"] = Field(default="pending")
+    nextRetryAt: Optional[datetime] = None
+    createdAt: datetime = Field(default_factory=datetime.utcnow)
+    updatedAt: datetime = Field(default_factory=datetime.utcnow)
+
+    def transform(self) -> dict:
+        """Return dead letter data"""
+        return {
+            "id": str(self.id),
+            "event": self.event,
+            "recipientId": self.recipientId,
+            "senderId": self.senderId,
+            "errorClass": self.errorClass,
+            "errorMessage": self.errorMessage,
+            "attempts": self.attempts,
+            "status": self.status,
+            "nextRetryAt": self.nextRetryAt.isoformat() if self.nextRetryAt else None,
+            "createdAt": self.createdAt.isoformat(),
+            "updatedAt": self.updatedAt.isoformat(),
+        }
+
+    class Settings:
+        name = "webhook_dead_letters"
+        indexes = [
+            [("status", 1), ("nextRetryAt", 1)],
+            [("createdAt", -1)],
+        ]
@@ -0,0 +1,20 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel
+from datetime import datetime
+from typing import List
+
+
+class LoginAttempt(Document):
+    """Recent login attempts for one throttling key (shared login limiter)"""
+    key: str = Field(...)  # "email:<address>" or "ip:<address>"
+    hits: List[datetime] = []  # Allowed attempts inside the window
+    allowed: bool = True  # Whether the latest attempt was allowed
+    expiresAt: datetime  # The TTL index deletes idle keys at this time
+
+    class Settings:
+        name = "login_attempts"
+        indexes = [
+            IndexModel([("key", 1)], unique=True),
+            IndexModel([("expiresAt", 1)], expireAfterSeconds=0),
+        ]
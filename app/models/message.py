@@ -1,5 +1,6 @@
 from beanie import Document
 from pydantic import BaseModel, Field, HttpUrl, ConfigDict
+from pymongo import IndexModel
 from datetime import datetime
 from typing import Optional, List, Literal
 from bson import ObjectId
@@ -10,6 +11,13 @@ class Attachment(BaseModel):
     url: HttpUrl
 
 
+class Reaction(BaseModel):
+    userId: str
+    reaction: Optional[str] = None
+    emoji: Optional[str] = None
+    timestamp: datetime
+
+
 class Message(Document):
     model_config = ConfigDict(arbitrary_types_allowed=True)
     
@@ -18,16 +26,27 @@ class Message(Document):
     messageId: Optional[str] = Field(None, unique=True, sparse=True)  # Meta message ID
     sender: Literal["user", "page"] = Field(...)
     senderId: str = Field(..., min_length=1)
+    recipientId: Optional[str] = None  # Instagram user ID, for page messages
     text: Optional[str] = None
     attachments: List[Attachment] = Field(default_factory=list)
+    reactions: List[Reaction] = Field(default_factory=list)
     timestamp: datetime = Field(..., index=True)
     isRead: bool = Field(default=False, index=True)
+    # Delivery state of page messages; pending messages are sent by the outbound worker
+    status: Literal["pending", "sent", "failed"] = "sent"
+    error: Optional[str] = None
+    sendAttempts: int = 0
+    leaseExpiresAt: Optional[datetime] = None
     metadata: Optional[dict] = None
     createdAt: datetime = Field(default_factory=datetime.utcnow)
     updatedAt: datetime = Field(default_factory=datetime.utcnow)
 
-    def transform(self) -> dict:
-        """Return message data"""
+    def transform(self, seen_watermark: Optional[datetime] = None) -> dict:
+        """Return message data
+        
+        seen_watermark is the conversation's lastSeenByUserAt; page messages sent
+        at or before it are reported as seen.
+        """
         # Ensure timestamps are sent as UTC with 'Z' suffix for proper frontend parsing
         # Python's isoformat() doesn't add 'Z' for naive datetimes, so we add it manually
         timestamp_str = self.timestamp.isoformat()
@@ -53,6 +72,13 @@ class Message(Document):
             "attachments": [{"type": a.type, "url": str(a.url)} for a in self.attachments],
             "timestamp": timestamp_str,
             "isRead": self.isRead,
+            "status": self.status,
+            "error": self.error,
+            "seen": self.sender == "page" and seen_watermark is not None and self.timestamp <= seen_watermark,
+            "reactions": [
+                {"userId": r.userId, "reaction": r.reaction, "emoji": r.emoji, "timestamp": r.timestamp.isoformat()}
+                for r in self.reactions
+            ],
             "metadata": self.metadata,
             "createdAt": created_at_str,
             "updatedAt": updated_at_str,
@@ -63,7 +89,19 @@ class Message(Document):
         indexes = [
             [("conversation", 1), ("timestamp", -1)],
             [("instagramAccount", 1), ("timestamp", -1)],
-            [("messageId", 1)],  # Unique sparse index
+            # Unique for real Meta IDs only; messages without one store messageId: null
+            IndexModel(
+                [("messageId", 1)],
+                name="messageId_1",
+                unique=True,
+                partialFilterExpression={"messageId": {"$gt": ""}},
+            ),
             [("sender", 1), ("isRead", 1)],
+            # Outbound queue: only pending messages are indexed
+            IndexModel(
+                [("status", 1), ("leaseExpiresAt", 1)],
+                name="outbound_pending",
+                partialFilterExpression={"status": "pending"},
+            ),
         ]
 
@@ -1,17 +1,18 @@
 from beanie import Document
 from pydantic import Field, ConfigDict
+from pymongo import IndexModel
 from datetime import datetime
-from typing import Optional
 from bson import ObjectId
 
 
 class Token(Document):
+    """Issued refresh/reset/verification token, stored by the hash of its jti"""
     model_config = ConfigDict(arbitrary_types_allowed=True)
     
-    token: str = Field(..., index=True)
+    jtiHash: str = Field(...)
     user: ObjectId = Field(..., index=True)
     type: str = Field(..., pattern="^(refresh|resetPassword|verifyEmail)$")
-    expires: datetime
+    expires: datetime  # The TTL index deletes the document at this time
     blacklisted: bool = Field(default=False)
     createdAt: datetime = Field(default_factory=datetime.utcnow)
     updatedAt: datetime = Field(default_factory=datetime.utcnow)
@@ -19,8 +20,7 @@ class Token(Document):
     class Settings:
         name = "tokens"
         indexes = [
-            [("token", 1)],
+            [("jtiHash", 1), ("type", 1), ("blacklisted", 1)],
             [("user", 1)],
-            [("type", 1)],
+            IndexModel([("expires", 1)], expireAfterSeconds=0),
         ]
-
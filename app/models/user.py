@@ -3,7 +3,18 @@ from pydantic import EmailStr, Field, field_validator, ConfigDict
 from datetime import datetime
 from typing import Optional
 from bson import ObjectId
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash, verify_password, verify_password_async
+
+
+def validate_password_strength(password: str) -> str:
+    """Check plain password requirements (raises ValueError)"""
+    if len(password) < 8:
+        raise ValueError("Password must be at least 8 characters")
+    if not any(c.isalpha() for c in password):
+        raise ValueError("Password must contain at least one letter")
+    if not any(c.isdigit() for c in password):
+        raise ValueError("Password must contain at least one number")
+    return password
 
 
 class User(Document):
@@ -24,21 +35,18 @@ class User(Document):
             # Already hashed, return as-is
             return v
         
-        # Validate plain password requirements
-        if len(v) < 8:
-            raise ValueError("Password must be at least 8 characters")
-        if not any(c.isalpha() for c in v):
-            raise ValueError("Password must contain at least one letter")
-        if not any(c.isdigit() for c in v):
-            raise ValueError("Password must contain at least one number")
-        
-        # Hash the plain password
-        return get_password_hash(v)
+        # Hash the plain password. This blocks; async code should pass a hash
+        # from get_password_hash_async instead.
+        return get_password_hash(validate_password_strength(v))
 
     def is_password_match(self, password: str) -> bool:
         """Verify password"""
         return verify_password(password, self.password)
 
+    async def is_password_match_async(self, password: str) -> bool:
+        """Verify password without blocking the event loop"""
+        return await verify_password_async(password, self.password)
+
     def transform(self) -> dict:
         """Return user data without password"""
         return {
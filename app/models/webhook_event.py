@@ -0,0 +1,23 @@
+from beanie import Document
+from pydantic import Field
+from datetime import datetime
+from typing import Optional, Literal, Union
+
+
+class WebhookEvent(Document):
+    """Raw webhook delivery from Meta waiting to be processed by a queue worker"""
+    payload: Union[bytes, dict] = Field(...)  # Raw request body (dict for legacy rows)
+    status: Literal["pending", "processing", "failed"] = Field(default="pending")
+    attempts: int = Field(default=0, ge=0)
+    leaseExpiresAt: Optional[datetime] = None
+    nextAttemptAt: Optional[datetime] = None  # Retry backoff: not claimed before this time
+    lastError: Optional[str] = None
+    createdAt: datetime = Field(default_factory=datetime.utcnow)
+    updatedAt: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "webhook_events"
+        indexes = [
+            [("status", 1), ("createdAt", 1)],
+            [("status", 1), ("leaseExpiresAt", 1)],
+        ]
@@ -0,0 +1,44 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional, List
+from app.schemas.message import AttachmentSchema
+
+
+class BroadcastFilter(BaseModel):
+    unreadOnly: bool = False
+    lastMessageAfter: Optional[datetime] = None
+    lastMessageBefore: Optional[datetime] = None
+
+
+class BroadcastCreate(BaseModel):
+    instagramAccountId: str
+    text: Optional[str] = None
+    attachment: Optional[AttachmentSchema] = None
+    conversationIds: Optional[List[str]] = Field(None, min_length=1)
+    filter: Optional[BroadcastFilter] = None  # Applied to the account's active conversations
+
+
+class BroadcastResultResponse(BaseModel):
+    conversation: str
+    igUserId: str
+    status: str
+    messageId: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BroadcastResponse(BaseModel):
+    id: str
+    instagramAccount: str
+    text: Optional[str] = None
+    attachment: Optional[AttachmentSchema] = None
+    status: str
+    total: int
+    sent: int
+    failed: int
+    skipped: int
+    remaining: int
+    results: List[BroadcastResultResponse] = []
+    error: Optional[str] = None
+    createdAt: datetime
+    updatedAt: datetime
+    completedAt: Optional[datetime] = None
@@ -11,6 +11,8 @@ class ConversationResponse(BaseModel):
     lastMessage: Optional[str] = None
     lastMessageTimestamp: Optional[datetime] = None
     unreadCount: int
+    lastSeenByUserAt: Optional[datetime] = None
+    lastInboundAt: Optional[datetime] = None
     isActive: bool
     createdAt: datetime
     updatedAt: datetime
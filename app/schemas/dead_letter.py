@@ -0,0 +1,32 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional, List
+
+
+class DeadLetterResponse(BaseModel):
+    id: str
+    event: dict
+    recipientId: Optional[str] = None
+    senderId: Optional[str] = None
+    errorClass: str
+    errorMessage: Optional[str] = None
+    attempts: int
+    status: str
+    nextRetryAt: Optional[datetime] = None
+    createdAt: datetime
+    updatedAt: datetime
+
+
+class DeadLetterListResponse(BaseModel):
+    deadLetters: List[DeadLetterResponse]
+    total: int
+    limit: int
+    skip: int
+
+
+class DeadLetterBulkRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=1000)
+
+
+class DeadLetterBulkResponse(BaseModel):
+    count: int
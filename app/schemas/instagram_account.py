@@ -35,6 +35,7 @@ class InstagramAccountResponse(InstagramAccountBase):
 
 class InstagramAccountUpdate(BaseModel):
     username: Optional[str] = Field(None, max_length=100)
+    pageAccessToken: Optional[str] = Field(None, min_length=1)
     profilePictureUrl: Optional[HttpUrl] = None
     followersCount: Optional[int] = Field(None, ge=0)
     isActive: Optional[bool] = None
@@ -50,3 +51,22 @@ class InstagramProfileResponse(BaseModel):
     mediaCount: int = 0
     media: list[dict] = []
 
+
+class InstagramMediaPageResponse(BaseModel):
+    media: list[dict] = []
+    next: Optional[str] = None  # Cursor for the next page; None on the last page
+
+
+
+class BackfillJobResponse(BaseModel):
+    id: str
+    instagramAccount: str
+    status: str
+    conversationsProcessed: int
+    messagesSeen: int
+    messagesImported: int
+    attempts: int
+    error: Optional[str] = None
+    createdAt: datetime
+    updatedAt: datetime
+    completedAt: Optional[datetime] = None
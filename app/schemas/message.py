@@ -8,6 +8,13 @@ class AttachmentSchema(BaseModel):
     url: str
 
 
+class ReactionSchema(BaseModel):
+    userId: str
+    reaction: Optional[str] = None
+    emoji: Optional[str] = None
+    timestamp: datetime
+
+
 class MessageBase(BaseModel):
     text: Optional[str] = None
     attachment: Optional[AttachmentSchema] = None
@@ -28,6 +35,10 @@ class MessageResponse(BaseModel):
     attachments: List[AttachmentSchema] = []
     timestamp: datetime
     isRead: bool
+    status: Literal["pending", "sent", "failed"] = "sent"
+    error: Optional[str] = None
+    seen: bool = False
+    reactions: List[ReactionSchema] = []
     metadata: Optional[dict] = None
     createdAt: datetime
     updatedAt: datetime
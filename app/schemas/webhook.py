@@ -0,0 +1,67 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+ATTACHMENT_TYPES = {"image", "video", "audio", "file"}
+
+
+@dataclass(slots=True)
+class MessagingEvent:
+    """Compact view of one entry[].messaging[] item from a Meta webhook delivery"""
+    sender_id: Optional[str]
+    recipient_id: Optional[str]
+    timestamp: Optional[int]
+    kind: str  # "message", "reaction", "read" or "other"
+    mid: Optional[str] = None
+    text: Optional[str] = None
+    attachments: List[Tuple[str, str]] = field(default_factory=list)  # (type, url)
+    reaction: Optional[Dict[str, Any]] = None
+    read: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_dict(cls, event: Dict[str, Any]) -> "MessagingEvent":
+        """Build from the decoded messaging event"""
+        sender_id = (event.get("sender") or {}).get("id")
+        recipient_id = (event.get("recipient") or {}).get("id")
+        result = cls(
+            sender_id=str(sender_id) if sender_id is not None else None,
+            recipient_id=str(recipient_id) if recipient_id is not None else None,
+            timestamp=event.get("timestamp"),
+            kind="other",
+        )
+        if "message" in event:
+            message = event["message"] or {}
+            result.kind = "message"
+            result.mid = message.get("mid")
+            result.text = message.get("text")
+            for attachment in message.get("attachments") or []:
+                url = (attachment.get("payload") or {}).get("url")
+                if url:
+                    att_type = attachment.get("type", "file")
+                    # Meta also sends share/story_mention/ig_reel etc.; store those as files
+                    result.attachments.append((att_type if att_type in ATTACHMENT_TYPES else "file", url))
+        elif "reaction" in event:
+            result.kind = "reaction"
+            result.reaction = event["reaction"] or {}
+        elif "read" in event:
+            result.kind = "read"
+            result.read = event["read"] or {}
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Rebuild a Meta-shaped messaging event (used to persist failed events)"""
+        event: Dict[str, Any] = {
+            "sender": {"id": self.sender_id},
+            "recipient": {"id": self.recipient_id},
+            "timestamp": self.timestamp,
+        }
+        if self.kind == "message":
+            event["message"] = {
+                "mid": self.mid,
+                "text": self.text,
+                "attachments": [{"type": att_type, "payload": {"url": url}} for att_type, url in self.attachments],
+            }
+        elif self.kind == "reaction":
+            event["reaction"] = self.reaction
+        elif self.kind == "read":
+            event["read"] = self.read
+        return event
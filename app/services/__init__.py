@@ -1,4 +1,4 @@
-from app.services import auth_service, instagram_service, message_service, webhook_service
+from app.services import auth_service, instagram_service, message_service, webhook_service, dead_letter_service, webhook_queue_service, outbound_service, broadcast_service, backfill_service
 
-__all__ = ["auth_service", "instagram_service", "message_service", "webhook_service"]
+__all__ = ["auth_service", "instagram_service", "message_service", "webhook_service", "dead_letter_service", "webhook_queue_service", "outbound_service", "broadcast_service", "backfill_service"]
 
@@ -0,0 +1,164 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+from bson import ObjectId
+from app.models.instagram_account import InstagramAccount
+from app.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_ids(value: Optional[str]) -> Set[str]:
+    """Lookup keys for a Meta ID: the stripped string plus its integer form"""
+    if value is None:
+        return set()
+    keys = {str(value).strip()}
+    try:
+        keys.add(str(int(value)))
+    except (ValueError, TypeError):
+        pass
+    return keys
+
+
+class AccountRoutingIndex:
+    """In-memory map from webhook recipient IDs to active Instagram account IDs
+
+    Only routing keys are cached: instagramBusinessId and pageId (string and
+    integer-normalized) to the account's _id. The account itself, including its
+    access token, is loaded when an event is routed to it, so token and status
+    changes made by any process take effect at once. Recipients that match no
+    account are remembered for a short time so repeated events to unknown IDs
+    don't reach the database.
+    """
+
+    def __init__(self):
+        self._by_business_id: Dict[str, ObjectId] = {}
+        self._by_page_id: Dict[str, ObjectId] = {}
+        self._keys_by_account: Dict[ObjectId, Set[str]] = {}
+        self._negative: "OrderedDict[str, float]" = OrderedDict()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._keys_by_account)
+
+    async def load(self) -> None:
+        """Rebuild the index from all active accounts (routing keys only)"""
+        accounts = await InstagramAccount.get_motor_collection().find(
+            {"isActive": True}, projection={"_id": 1, "instagramBusinessId": 1, "pageId": 1}
+        ).to_list(length=None)
+        by_business_id: Dict[str, ObjectId] = {}
+        by_page_id: Dict[str, ObjectId] = {}
+        keys_by_account: Dict[ObjectId, Set[str]] = {}
+        for account in accounts:
+            business_keys = _normalize_ids(account.get("instagramBusinessId"))
+            page_keys = _normalize_ids(account.get("pageId"))
+            for key in business_keys:
+                by_business_id[key] = account["_id"]
+            for key in page_keys:
+                by_page_id[key] = account["_id"]
+            keys_by_account[account["_id"]] = business_keys | page_keys
+        self._by_business_id = by_business_id
+        self._by_page_id = by_page_id
+        self._keys_by_account = keys_by_account
+        self._negative.clear()
+        logger.info(f"Account routing index loaded: {len(accounts)} active accounts")
+
+    def upsert(self, account: InstagramAccount) -> None:
+        """Add or replace an account's routing keys (removes it if no longer active)"""
+        self.remove(account.id)
+        if not account.isActive:
+            return
+        business_keys = _normalize_ids(account.instagramBusinessId)
+        page_keys = _normalize_ids(account.pageId)
+        for key in business_keys:
+            self._by_business_id[key] = account.id
+        for key in page_keys:
+            self._by_page_id[key] = account.id
+        self._keys_by_account[account.id] = business_keys | page_keys
+        for key in business_keys | page_keys:
+            self._negative.pop(key, None)
+
+    def remove(self, account_id: ObjectId) -> None:
+        """Drop an account from the index"""
+        for key in self._keys_by_account.pop(account_id, set()):
+            for index in (self._by_business_id, self._by_page_id):
+                if index.get(key) == account_id:
+                    del index[key]
+
+    def get(self, recipient_id: str) -> Optional[ObjectId]:
+        """Resolve a recipient ID to an account ID from memory only (Instagram Business ID takes precedence)"""
+        keys = _normalize_ids(recipient_id)
+        for index in (self._by_business_id, self._by_page_id):
+            for key in keys:
+                account_id = index.get(key)
+                if account_id:
+                    return account_id
+        return None
+
+    async def lookup(self, recipient_id: str) -> Optional[InstagramAccount]:
+        """Load the active account a recipient ID routes to
+
+        An indexed account is loaded by _id; if it was deactivated or its IDs
+        changed in another process the stale keys are dropped and the recipient
+        is resolved again with one query on the Meta IDs.
+        """
+        keys = _normalize_ids(recipient_id)
+        account_id = self.get(recipient_id)
+        if account_id:
+            account = await InstagramAccount.find_one({"_id": account_id, "isActive": True})
+            if account and keys & (_normalize_ids(account.instagramBusinessId) | _normalize_ids(account.pageId)):
+                return account
+            self.remove(account_id)
+            if account:
+                self.upsert(account)
+
+        expires_at = self._negative.get(recipient_id)
+        if expires_at is not None:
+            if expires_at > time.monotonic():
+                return None
+            del self._negative[recipient_id]
+
+        candidates = await InstagramAccount.find(
+            {
+                "$or": [{"instagramBusinessId": {"$in": list(keys)}}, {"pageId": {"$in": list(keys)}}],
+                "isActive": True,
+            }
+        ).to_list()
+        for account in candidates:
+            self.upsert(account)
+        account_id = self.get(recipient_id)
+        if not account_id:
+            self._remember_unknown(recipient_id)
+            return None
+        return next(account for account in candidates if account.id == account_id)
+
+    def _remember_unknown(self, recipient_id: str) -> None:
+        self._negative[recipient_id] = time.monotonic() + settings.ACCOUNT_INDEX_NEGATIVE_TTL_SECONDS
+        self._negative.move_to_end(recipient_id)
+        while len(self._negative) > settings.ACCOUNT_INDEX_NEGATIVE_CACHE_SIZE:
+            self._negative.popitem(last=False)
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(settings.ACCOUNT_INDEX_REFRESH_SECONDS)
+            try:
+                await self.load()
+            except Exception as e:
+                logger.error(f"Error refreshing account routing index: {e}")
+
+    async def start(self) -> None:
+        """Load the index and start the periodic refresh"""
+        await self.load()
+        self._refresh_task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        """Stop the periodic refresh"""
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+
+
+account_index = AccountRoutingIndex()
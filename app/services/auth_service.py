@@ -1,10 +1,21 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from bson import ObjectId
-from app.models.user import User
+from app.models.user import User, validate_password_strength
 from app.models.token import Token
+from app.services import user_cache
+from app.services.login_throttle import check_login_attempt, reset_login_attempts
 from app.schemas.auth import RegisterRequest, LoginRequest
-from app.core.security import create_access_token, create_refresh_token, decode_token
+from app.core.security import (
+    create_access_token,
+    create_refresh_token,
+    decode_token,
+    evict_token,
+    get_password_hash_async,
+    hash_jti,
+    new_jti,
+    password_needs_rehash,
+)
 from app.core.exceptions import UnauthorizedError, BadRequestError
 from app.config.settings import settings
 import logging
@@ -12,6 +23,63 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+async def _hash_new_password(password: str) -> str:
+    """Check a new password's requirements and hash it off the event loop"""
+    try:
+        validate_password_strength(password)
+    except ValueError as e:
+        raise BadRequestError(str(e))
+    return await get_password_hash_async(password)
+
+
+async def _rehash_password(user: User, password: str) -> None:
+    """Re-hash a verified password made with an outdated BCRYPT_ROUNDS"""
+    try:
+        hashed = await get_password_hash_async(password)
+        # Only replace the hash we verified against
+        await User.get_motor_collection().update_one(
+            {"_id": user.id, "password": user.password},
+            {"$set": {"password": hashed, "updatedAt": datetime.utcnow()}},
+        )
+        user_cache.invalidate_user(user.id)
+    except Exception as e:
+        logger.warning(f"Failed to rehash password for {user.email}: {e}")
+
+
+async def _issue_refresh_token(user_id: ObjectId) -> str:
+    """Create a refresh token and store it by its jti"""
+    jti = new_jti()
+    refresh_token = create_refresh_token({"sub": str(user_id), "jti": jti})
+    refresh_token_doc = Token(
+        jtiHash=hash_jti(jti),
+        user=user_id,
+        type="refresh",
+        expires=datetime.utcnow() + timedelta(days=settings.JWT_REFRESH_EXPIRATION_DAYS),
+    )
+    await refresh_token_doc.insert()
+    return refresh_token
+
+
+async def _find_token(token: str, token_type: str) -> Optional[Token]:
+    """Stored, non-blacklisted token for a JWT with a valid signature"""
+    payload = decode_token(token)
+    jti = payload.get("jti") if payload else None
+    if not jti:
+        # Tokens issued before they carried a jti are no longer accepted
+        return None
+    return await Token.find_one({"jtiHash": hash_jti(jti), "type": token_type, "blacklisted": False})
+
+
+async def _revoke_token(token: str, token_doc: Token) -> None:
+    """Blacklist a stored token and let the TTL index delete it"""
+    evict_token(token)
+    now = datetime.utcnow()
+    token_doc.blacklisted = True
+    token_doc.expires = now
+    token_doc.updatedAt = now
+    await token_doc.save()
+
+
 async def register_user(data: RegisterRequest) -> dict:
     """Register a new user"""
     # Check if email is taken
@@ -22,22 +90,13 @@ async def register_user(data: RegisterRequest) -> dict:
     user = User(
         name=data.name.strip(),
         email=data.email.lower(),
-        password=data.password,  # Will be hashed by validator
+        password=await _hash_new_password(data.password),
     )
     await user.insert()
     
     # Generate tokens
     access_token = create_access_token({"sub": str(user.id), "role": user.role})
-    refresh_token = create_refresh_token({"sub": str(user.id)})
-    
-    # Store refresh token
-    refresh_token_doc = Token(
-        token=refresh_token,
-        user=user.id,
-        type="refresh",
-        expires=datetime.utcnow() + timedelta(days=settings.JWT_REFRESH_EXPIRATION_DAYS),
-    )
-    await refresh_token_doc.insert()
+    refresh_token = await _issue_refresh_token(user.id)
     
     logger.info(f"User registered: {user.email}")
     
@@ -56,30 +115,29 @@ async def register_user(data: RegisterRequest) -> dict:
     }
 
 
-async def login_user(data: LoginRequest) -> dict:
+async def login_user(data: LoginRequest, client_ip: Optional[str] = None) -> dict:
     """Login user"""
+    # Throttle before any DB lookup or bcrypt work
+    await check_login_attempt(data.email.lower(), client_ip)
+    
     try:
         user = await User.find_one({"email": data.email.lower()})
         if not user:
             logger.warning(f"Login attempt with non-existent email: {data.email.lower()}")
             raise UnauthorizedError("Invalid email or password")
         
-        if not user.is_password_match(data.password):
+        if not await user.is_password_match_async(data.password):
             logger.warning(f"Login attempt with wrong password for: {data.email.lower()}")
             raise UnauthorizedError("Invalid email or password")
         
+        if password_needs_rehash(user.password):
+            await _rehash_password(user, data.password)
+        
+        await reset_login_attempts(user.email)
+        
         # Generate tokens
         access_token = create_access_token({"sub": str(user.id), "role": user.role})
-        refresh_token = create_refresh_token({"sub": str(user.id)})
-        
-        # Store refresh token
-        refresh_token_doc = Token(
-            token=refresh_token,
-            user=user.id,
-            type="refresh",
-            expires=datetime.utcnow() + timedelta(days=settings.JWT_REFRESH_EXPIRATION_DAYS),
-        )
-        await refresh_token_doc.insert()
+        refresh_token = await _issue_refresh_token(user.id)
         
         logger.info(f"User logged in: {user.email}")
         
@@ -106,17 +164,16 @@ async def login_user(data: LoginRequest) -> dict:
 
 async def logout_user(refresh_token: str) -> None:
     """Logout user by blacklisting refresh token"""
-    token_doc = await Token.find_one({"token": refresh_token, "type": "refresh"})
+    token_doc = await _find_token(refresh_token, "refresh")
     if token_doc:
-        token_doc.blacklisted = True
-        await token_doc.save()
+        await _revoke_token(refresh_token, token_doc)
         logger.info(f"User logged out: {token_doc.user}")
 
 
 async def refresh_tokens(refresh_token: str) -> dict:
     """Refresh access token using refresh token"""
     # Check if token exists and is not blacklisted
-    token_doc = await Token.find_one({"token": refresh_token, "type": "refresh", "blacklisted": False})
+    token_doc = await _find_token(refresh_token, "refresh")
     if not token_doc:
         raise UnauthorizedError("Invalid refresh token")
     
@@ -136,20 +193,12 @@ async def refresh_tokens(refresh_token: str) -> dict:
     
     # Generate new tokens
     access_token = create_access_token({"sub": str(user.id), "role": user.role})
-    new_refresh_token = create_refresh_token({"sub": str(user.id)})
     
     # Blacklist old refresh token
-    token_doc.blacklisted = True
-    await token_doc.save()
+    await _revoke_token(refresh_token, token_doc)
     
     # Store new refresh token
-    new_refresh_token_doc = Token(
-        token=new_refresh_token,
-        user=user.id,
-        type="refresh",
-        expires=datetime.utcnow() + timedelta(days=settings.JWT_REFRESH_EXPIRATION_DAYS),
-    )
-    await new_refresh_token_doc.insert()
+    new_refresh_token = await _issue_refresh_token(user.id)
     
     return {
         "access": {
@@ -171,11 +220,12 @@ async def forgot_password(email: str) -> dict:
         return {"resetPasswordToken": "dummy_token"}
     
     # Generate reset token
-    reset_token = create_refresh_token({"sub": str(user.id), "type": "resetPassword"})
+    jti = new_jti()
+    reset_token = create_refresh_token({"sub": str(user.id), "type": "resetPassword", "jti": jti})
     
     # Store reset token
     reset_token_doc = Token(
-        token=reset_token,
+        jtiHash=hash_jti(jti),
         user=user.id,
         type="resetPassword",
         expires=datetime.utcnow() + timedelta(hours=1),  # 1 hour expiry
@@ -190,7 +240,7 @@ async def forgot_password(email: str) -> dict:
 async def reset_password(token: str, new_password: str) -> None:
     """Reset password using reset token"""
     # Check if token exists and is not blacklisted
-    token_doc = await Token.find_one({"token": token, "type": "resetPassword", "blacklisted": False})
+    token_doc = await _find_token(token, "resetPassword")
     if not token_doc:
         raise UnauthorizedError("Invalid reset token")
     
@@ -209,13 +259,13 @@ async def reset_password(token: str, new_password: str) -> None:
         raise UnauthorizedError("User not found")
     
     # Update password
-    user.password = new_password  # Will be hashed by validator
+    user.password = await _hash_new_password(new_password)
     user.updatedAt = datetime.utcnow()
     await user.save()
+    user_cache.invalidate_user(user.id)
     
     # Blacklist reset token
-    token_doc.blacklisted = True
-    await token_doc.save()
+    await _revoke_token(token, token_doc)
     
     logger.info(f"Password reset for: {user.email}")
 
@@ -223,7 +273,7 @@ async def reset_password(token: str, new_password: str) -> None:
 async def verify_email(token: str) -> None:
     """Verify email using verification token"""
     # Check if token exists and is not blacklisted
-    token_doc = await Token.find_one({"token": token, "type": "verifyEmail", "blacklisted": False})
+    token_doc = await _find_token(token, "verifyEmail")
     if not token_doc:
         raise UnauthorizedError("Invalid verification token")
     
@@ -243,8 +293,7 @@ async def verify_email(token: str) -> None:
     
     # Mark email as verified (you can add an emailVerified field to User model if needed)
     # For now, just blacklist the token
-    token_doc.blacklisted = True
-    await token_doc.save()
+    await _revoke_token(token, token_doc)
     
     logger.info(f"Email verified for: {user.email}")
 
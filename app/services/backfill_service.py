@@ -0,0 +1,338 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from app.models.backfill_job import BackfillJob
+from app.models.conversation import Conversation
+from app.models.instagram_account import InstagramAccount
+from app.models.message import Message
+from app.utils.meta_api import (
+    iter_instagram_conversation_pages,
+    iter_instagram_conversation_messages,
+    allow_rate_limit_wait,
+)
+from app.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+_scheduler_task: Optional[asyncio.Task] = None
+_wakeup: Optional[asyncio.Event] = None
+
+
+class LeaseLost(Exception):
+    """Another process has taken over the backfill job"""
+
+
+def _lease_expiry(now: datetime) -> datetime:
+    return now + timedelta(seconds=settings.BACKFILL_LEASE_SECONDS)
+
+
+async def start_backfill(account: InstagramAccount, user_id: Optional[ObjectId] = None) -> BackfillJob:
+    """Queue a history import for an account
+
+    Returns the account's pending or running job if there is one; a failed job
+    is resumed from its checkpoint instead of starting over. The partial unique
+    index on active jobs keeps concurrent calls from queueing two.
+    """
+    collection = BackfillJob.get_motor_collection()
+    now = datetime.utcnow()
+    latest = await get_latest_backfill(account.id)
+    if latest and latest.status == "failed":
+        try:
+            await collection.update_one(
+                {"_id": latest.id, "status": "failed"},
+                {"$set": {"status": "pending", "active": True, "error": None, "updatedAt": now}},
+            )
+        except DuplicateKeyError:
+            pass  # Another job became active meanwhile; it is returned below
+
+    query = {"instagramAccount": account.id, "active": True}
+    update = {
+        "$setOnInsert": {
+            "instagramAccount": account.id,
+            "user": user_id,
+            "status": "pending",
+            "active": True,
+            "cursor": None,
+            "conversationsProcessed": 0,
+            "messagesSeen": 0,
+            "messagesImported": 0,
+            "attempts": 0,
+            "leaseExpiresAt": None,
+            "error": None,
+            "createdAt": now,
+            "updatedAt": now,
+            "completedAt": None,
+        }
+    }
+    try:
+        result = await collection.find_one_and_update(
+            query, update, projection={"_id": 1}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # A concurrent call inserted it first (the unique index rejected ours); it now matches
+        result = await collection.find_one(query, projection={"_id": 1})
+    job = await BackfillJob.get(result["_id"])
+
+    if _wakeup:
+        _wakeup.set()
+    logger.info(f"Backfill {job.id} ({job.status}) for account {account.id}")
+    return job
+
+
+async def get_latest_backfill(account_id: ObjectId) -> Optional[BackfillJob]:
+    """The account's most recent backfill job"""
+    return await BackfillJob.find({"instagramAccount": account_id}).sort("-createdAt").first_or_none()
+
+
+async def _claim_job() -> Optional[Dict[str, Any]]:
+    """Lease the oldest pending job, or a running one whose process died"""
+    now = datetime.utcnow()
+    return await BackfillJob.get_motor_collection().find_one_and_update(
+        {
+            "$or": [
+                {"status": "pending"},
+                {"status": "running", "leaseExpiresAt": {"$lt": now}},
+            ]
+        },
+        {
+            "$set": {"status": "running", "leaseExpiresAt": _lease_expiry(now), "updatedAt": now},
+            "$inc": {"attempts": 1},
+        },
+        sort=[("createdAt", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def _update_job(job: Dict[str, Any], update: Dict[str, Any]) -> None:
+    """Apply a progress update and renew the lease, unless another runner took the job over
+
+    Fenced on attempts and on the cursor this runner last wrote, so counters
+    are only ever added together with the checkpoint they belong to.
+    """
+    now = datetime.utcnow()
+    update.setdefault("$set", {}).update({"leaseExpiresAt": _lease_expiry(now), "updatedAt": now})
+    result = await BackfillJob.get_motor_collection().update_one(
+        {"_id": job["_id"], "attempts": job["attempts"], "cursor": job.get("cursor")}, update
+    )
+    if result.matched_count == 0:
+        raise LeaseLost()
+
+
+def _graph_datetime(value: Optional[str]) -> datetime:
+    """Parse a Graph timestamp ("2024-05-01T12:00:00+0000") to naive UTC"""
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z").astimezone(timezone.utc).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        return datetime.utcnow()
+
+
+def _graph_attachments(item: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Message attachments in the shape stored on Message"""
+    attachments = []
+    for attachment in (item.get("attachments") or {}).get("data", []):
+        if attachment.get("image_data", {}).get("url"):
+            attachments.append({"type": "image", "url": attachment["image_data"]["url"]})
+        elif attachment.get("video_data", {}).get("url"):
+            attachments.append({"type": "video", "url": attachment["video_data"]["url"]})
+        elif attachment.get("file_url"):
+            is_audio = (attachment.get("mime_type") or "").startswith("audio/")
+            attachments.append({"type": "audio" if is_audio else "file", "url": attachment["file_url"]})
+    return attachments
+
+
+def _message_document(
+    item: Dict[str, Any], conversation_id: ObjectId, account: InstagramAccount, account_ids: Set[str], ig_user_id: str
+) -> Dict[str, Any]:
+    """Message document for a Graph conversation message"""
+    sender_id = (item.get("from") or {}).get("id")
+    from_page = sender_id in account_ids
+    now = datetime.utcnow()
+    return {
+        "conversation": conversation_id,
+        "instagramAccount": account.id,
+        "messageId": item["id"],
+        "sender": "page" if from_page else "user",
+        "senderId": sender_id or ig_user_id,
+        "recipientId": ig_user_id if from_page else None,
+        "text": item.get("message") or None,
+        "attachments": _graph_attachments(item),
+        "reactions": [],
+        "timestamp": _graph_datetime(item.get("created_time")),
+        "isRead": True,  # History is not unread
+        "status": "sent",
+        "error": None,
+        "sendAttempts": 0,
+        "leaseExpiresAt": None,
+        "metadata": {"backfill": True},
+        "createdAt": now,
+        "updatedAt": now,
+    }
+
+
+async def _upsert_messages(documents: List[Dict[str, Any]]) -> int:
+    """Insert messages that don't exist yet (keyed by messageId); returns how many were new"""
+    if not documents:
+        return 0
+    operations = [
+        UpdateOne({"messageId": document["messageId"]}, {"$setOnInsert": document}, upsert=True)
+        for document in documents
+    ]
+    try:
+        result = await Message.get_motor_collection().bulk_write(operations, ordered=False)
+        return result.upserted_count
+    except BulkWriteError as e:
+        # A webhook can store the same message concurrently: the upsert then loses on the unique index
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+        return e.details.get("nUpserted", 0)
+
+
+async def _import_conversation(
+    job: Dict[str, Any], account: InstagramAccount, account_ids: Set[str], conversation: Dict[str, Any]
+) -> Tuple[int, int]:
+    """Import one Graph conversation page by page (only one page of messages in memory)
+
+    Returns the messages seen and newly imported; the caller records them with
+    the checkpoint. Each page of messages renews the job's lease.
+    """
+    participants = (conversation.get("participants") or {}).get("data", [])
+    user = next((p for p in participants if p.get("id") and p["id"] not in account_ids), None)
+    if not user:
+        return 0, 0
+
+    conversation_id = await Conversation.upsert_active(account.id, user["id"], user.get("username"))
+    newest: Optional[Dict[str, Any]] = None
+    newest_inbound: Optional[datetime] = None
+    seen = imported = 0
+
+    async for items, _ in iter_instagram_conversation_messages(
+        conversation["id"], account.pageAccessToken, account.pageId, settings.BACKFILL_MESSAGE_PAGE_SIZE
+    ):
+        documents = [
+            _message_document(item, conversation_id, account, account_ids, user["id"])
+            for item in items
+            if item.get("id")
+        ]
+        for document in documents:
+            if newest is None or document["timestamp"] > newest["timestamp"]:
+                newest = document
+            if document["sender"] == "user" and (newest_inbound is None or document["timestamp"] > newest_inbound):
+                newest_inbound = document["timestamp"]
+        seen += len(documents)
+        imported += await _upsert_messages(documents)
+        await _update_job(job, {})
+
+    if newest:
+        preview = newest["text"] or f"[{len(newest['attachments'])} attachment(s)]"
+        updates = Conversation.last_message_updates(conversation_id, preview, newest["timestamp"])
+        if newest_inbound:
+            updates.append(UpdateOne({"_id": conversation_id}, {"$max": {"lastInboundAt": newest_inbound}}))
+        await Conversation.get_motor_collection().bulk_write(updates)
+    return seen, imported
+
+
+async def run_backfill(job: Dict[str, Any]) -> None:
+    """Import an account's conversations, checkpointing after each page of conversations"""
+    collection = BackfillJob.get_motor_collection()
+    account = await InstagramAccount.find_one({"_id": job["instagramAccount"], "isActive": True})
+    if not account:
+        await collection.update_one(
+            {"_id": job["_id"]}, {"$set": {"status": "failed", "active": False, "error": "Instagram account not found"}}
+        )
+        return
+
+    account_ids = {account.pageId, account.instagramBusinessId}
+    semaphore = asyncio.Semaphore(settings.BACKFILL_CONCURRENCY)
+
+    async def import_conversation(conversation: Dict[str, Any]) -> Tuple[int, int]:
+        async with semaphore:
+            return await _import_conversation(job, account, account_ids, conversation)
+
+    logger.info(f"Backfill {job['_id']} running for account {account.id} (attempt {job['attempts']})")
+    try:
+        async for conversations, next_cursor in iter_instagram_conversation_pages(
+            account.pageId, account.pageAccessToken, settings.BACKFILL_PAGE_SIZE, job.get("cursor")
+        ):
+            results = await asyncio.gather(
+                *(import_conversation(conversation) for conversation in conversations), return_exceptions=True
+            )
+            errors = [result for result in results if isinstance(result, Exception)]
+            if errors:
+                raise errors[0]
+            # Resuming re-reads at most this page; the upserts make that harmless, and its
+            # counts are only added here, together with the cursor that moves past it
+            await _update_job(
+                job,
+                {
+                    "$set": {"cursor": next_cursor},
+                    "$inc": {
+                        "conversationsProcessed": len(conversations),
+                        "messagesSeen": sum(seen for seen, _ in results),
+                        "messagesImported": sum(imported for _, imported in results),
+                    },
+                },
+            )
+            job["cursor"] = next_cursor
+
+        await _update_job(
+            job,
+            {"$set": {"status": "completed", "active": False, "leaseExpiresAt": None, "completedAt": datetime.utcnow()}},
+        )
+        logger.info(f"Backfill {job['_id']} completed for account {account.id}")
+    except LeaseLost:
+        logger.warning(f"Backfill {job['_id']} was taken over by another worker")
+    except Exception as e:
+        logger.error(f"Backfill {job['_id']} failed: {e}", exc_info=True)
+        await collection.update_one(
+            {"_id": job["_id"], "attempts": job["attempts"]},
+            {
+                "$set": {
+                    "status": "failed",
+                    "active": False,
+                    "error": str(e)[:1000],
+                    "leaseExpiresAt": None,
+                    "updatedAt": datetime.utcnow(),
+                }
+            },
+        )
+
+
+async def _run_scheduler() -> None:
+    """Run queued backfills one at a time until cancelled"""
+    allow_rate_limit_wait(settings.META_RATE_LIMIT_BACKGROUND_MAX_WAIT_SECONDS)
+    while True:
+        try:
+            job = await _claim_job()
+            if job:
+                await run_backfill(job)
+                continue
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Backfill scheduler error: {e}", exc_info=True)
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=settings.BACKFILL_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+
+def start_backfill_scheduler() -> None:
+    """Start the background backfill runner"""
+    global _scheduler_task, _wakeup
+    _wakeup = asyncio.Event()
+    _scheduler_task = asyncio.create_task(_run_scheduler())
+
+
+async def stop_backfill_scheduler() -> None:
+    """Stop the runner; an interrupted job resumes from its checkpoint once its lease expires"""
+    global _scheduler_task
+    if _scheduler_task:
+        _scheduler_task.cancel()
+        await asyncio.gather(_scheduler_task, return_exceptions=True)
+        _scheduler_task = None
@@ -0,0 +1,421 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from app.models.broadcast_job import BroadcastJob, BroadcastRecipient, BroadcastResult
+from app.models.conversation import Conversation
+from app.models.instagram_account import InstagramAccount
+from app.models.message import Message, Attachment
+from app.schemas.broadcast import BroadcastCreate
+from app.core.exceptions import NotFoundError, BadRequestError
+from app.utils.meta_api import send_instagram_message, send_instagram_attachment, allow_rate_limit_wait
+from app.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Running broadcasts (kept referenced so they aren't garbage collected)
+_tasks: Set[asyncio.Task] = set()
+_recovery_task: Optional[asyncio.Task] = None
+
+INTERRUPTED_ERROR = "Broadcast interrupted before this send was recorded; it may have been delivered"
+
+
+class LeaseLost(Exception):
+    """The broadcast was recovered as interrupted while this process was still running it"""
+
+
+def _lease_expiry(now: datetime) -> datetime:
+    return now + timedelta(seconds=settings.BROADCAST_LEASE_SECONDS)
+
+
+async def _get_account(account_id: ObjectId, user_id: ObjectId, user_role: str) -> InstagramAccount:
+    if user_role == "admin":
+        account = await InstagramAccount.find_one({"_id": account_id, "isActive": True})
+    else:
+        account = await InstagramAccount.find_one({"_id": account_id, "user": user_id, "isActive": True})
+    if not account:
+        raise NotFoundError("Instagram account not found")
+    return account
+
+
+def _recipient_query(account: InstagramAccount, data: BroadcastCreate) -> Dict[str, Any]:
+    """Mongo query for the broadcast's conversations"""
+    query: Dict[str, Any] = {"instagramAccount": account.id, "isActive": True}
+    if data.conversationIds:
+        query["_id"] = {"$in": [ObjectId(id) for id in data.conversationIds]}
+    if data.filter:
+        if data.filter.unreadOnly:
+            query["unreadCount"] = {"$gt": 0}
+        last_message = {}
+        if data.filter.lastMessageAfter:
+            last_message["$gte"] = data.filter.lastMessageAfter
+        if data.filter.lastMessageBefore:
+            last_message["$lt"] = data.filter.lastMessageBefore
+        if last_message:
+            query["lastMessageTimestamp"] = last_message
+    return query
+
+
+async def _last_inbound_times(conversations: List[Dict[str, Any]]) -> Dict[ObjectId, Optional[datetime]]:
+    """lastInboundAt per conversation, derived from messages for conversations that predate the field"""
+    result = {conversation["_id"]: conversation.get("lastInboundAt") for conversation in conversations}
+    missing = [id for id, last_inbound_at in result.items() if last_inbound_at is None]
+    if missing:
+        async for row in Message.get_motor_collection().aggregate(
+            [
+                {"$match": {"conversation": {"$in": missing}, "sender": "user"}},
+                {"$group": {"_id": "$conversation", "lastInboundAt": {"$max": "$timestamp"}}},
+            ]
+        ):
+            result[row["_id"]] = row["lastInboundAt"]
+    return result
+
+
+async def create_broadcast(user_id: ObjectId, data: BroadcastCreate, user_role: str = "user") -> dict:
+    """Create a broadcast job and start sending in the background
+
+    Conversations outside the 24-hour messaging window are recorded as skipped
+    without calling Graph.
+    """
+    if not data.text and not data.attachment:
+        raise BadRequestError("Either text or attachment is required")
+    if data.conversationIds is None and data.filter is None:
+        raise BadRequestError("Either conversationIds or filter is required")
+
+    account = await _get_account(ObjectId(data.instagramAccountId), user_id, user_role)
+
+    conversations = await Conversation.get_motor_collection().find(
+        _recipient_query(account, data),
+        projection={"_id": 1, "igUserId": 1, "lastInboundAt": 1},
+    ).to_list(length=settings.BROADCAST_MAX_RECIPIENTS + 1)
+    if not conversations:
+        raise BadRequestError("No conversations match the broadcast")
+    if len(conversations) > settings.BROADCAST_MAX_RECIPIENTS:
+        raise BadRequestError(f"A broadcast can reach at most {settings.BROADCAST_MAX_RECIPIENTS} conversations")
+
+    window_start = datetime.utcnow() - timedelta(hours=settings.MESSAGING_WINDOW_HOURS)
+    last_inbound = await _last_inbound_times(conversations)
+    recipients = []
+    skipped = []
+    for conversation in conversations:
+        last_inbound_at = last_inbound[conversation["_id"]]
+        if last_inbound_at and last_inbound_at >= window_start:
+            recipients.append(conversation)
+        else:
+            skipped.append(
+                BroadcastResult(
+                    conversation=conversation["_id"],
+                    igUserId=conversation["igUserId"],
+                    status="skipped",
+                    error="Outside the 24-hour messaging window",
+                )
+            )
+
+    job = BroadcastJob(
+        user=user_id,
+        instagramAccount=account.id,
+        text=data.text,
+        attachment=data.attachment.model_dump() if data.attachment else None,
+        total=len(conversations),
+        skipped=len(skipped),
+        recipients=[
+            BroadcastRecipient(conversation=conversation["_id"], igUserId=conversation["igUserId"])
+            for conversation in recipients
+        ],
+        results=skipped,
+        leaseExpiresAt=_lease_expiry(datetime.utcnow()),
+    )
+    await job.insert()
+
+    task = asyncio.create_task(_run_broadcast(job, account, recipients))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+    logger.info(
+        f"Broadcast {job.id} started on account {account.id}: "
+        f"{len(recipients)} recipients, {len(skipped)} skipped (outside messaging window)"
+    )
+    return job.transform()
+
+
+async def _send_one(job: BroadcastJob, account: InstagramAccount, conversation: Dict[str, Any]) -> BroadcastResult:
+    """Send the broadcast to one conversation (errors are recorded, not raised)"""
+    try:
+        if job.attachment:
+            result = await send_instagram_attachment(
+                conversation["igUserId"], job.attachment, account.pageAccessToken, account.instagramBusinessId, account.pageId
+            )
+        else:
+            result = await send_instagram_message(
+                conversation["igUserId"], job.text, account.pageAccessToken, account.instagramBusinessId, account.pageId
+            )
+        return BroadcastResult(
+            conversation=conversation["_id"],
+            igUserId=conversation["igUserId"],
+            status="sent",
+            messageId=result.get("message_id"),
+        )
+    except Exception as e:
+        return BroadcastResult(
+            conversation=conversation["_id"], igUserId=conversation["igUserId"], status="failed", error=str(e)[:500]
+        )
+
+
+async def _store_sent(job: BroadcastJob, account: InstagramAccount, sent: List[BroadcastResult], now: datetime) -> None:
+    """Insert Messages for delivered sends and update their conversations (retried; safe to repeat)"""
+    attachments = [Attachment(**job.attachment)] if job.attachment else []
+    messages = [
+        Message(
+            conversation=result.conversation,
+            instagramAccount=account.id,
+            messageId=result.messageId,
+            sender="page",
+            senderId=account.instagramBusinessId,
+            recipientId=result.igUserId,
+            text=job.text,
+            attachments=attachments,
+            timestamp=now,
+            isRead=True,  # Outgoing messages are read
+            metadata={"broadcast": str(job.id)},
+        )
+        for result in sent
+    ]
+    preview = job.text or f"[{job.attachment['type']}]"
+    updates = []
+    for result in sent:
+        updates.extend(Conversation.last_message_updates(result.conversation, preview, now))
+
+    for attempt in range(settings.BROADCAST_STORE_ATTEMPTS):
+        try:
+            try:
+                await Message.insert_many(messages, ordered=False)
+            except BulkWriteError as e:
+                # Stored by an earlier attempt (unique messageId)
+                if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                    raise
+            await Conversation.get_motor_collection().bulk_write(updates)
+            return
+        except Exception as e:
+            if attempt + 1 >= settings.BROADCAST_STORE_ATTEMPTS:
+                raise
+            logger.warning(f"Broadcast {job.id}: storing {len(sent)} sent messages failed, retrying: {e}")
+            await asyncio.sleep(0.5 * 2 ** attempt)
+
+
+async def _flush(job: BroadcastJob, account: InstagramAccount, results: List[BroadcastResult]) -> None:
+    """Write a batch of results: sent Messages, conversation updates and job progress
+
+    The results are recorded on the job even if the Messages can't be stored, so
+    sends that reached Instagram are never lost; the storage error is re-raised.
+    Raises LeaseLost if the job has been recovered as interrupted meanwhile.
+    """
+    now = datetime.utcnow()
+    sent = [result for result in results if result.status == "sent"]
+    storage_error = None
+    if sent:
+        try:
+            await _store_sent(job, account, sent, now)
+        except Exception as e:
+            logger.error(f"Broadcast {job.id}: failed to store {len(sent)} sent messages: {e}", exc_info=True)
+            storage_error = e
+
+    update = await BroadcastJob.get_motor_collection().update_one(
+        {"_id": job.id, "attempts": job.attempts},
+        {
+            "$push": {"results": {"$each": [result.model_dump() for result in results]}},
+            "$inc": {"sent": len(sent), "failed": len(results) - len(sent)},
+            "$set": {"leaseExpiresAt": _lease_expiry(now), "updatedAt": now},
+        },
+    )
+    if update.matched_count == 0:
+        raise LeaseLost()
+    if storage_error:
+        raise storage_error
+
+
+async def _renew_lease(job: BroadcastJob) -> bool:
+    """Extend the running process's lease; False once the job has been recovered by another process"""
+    now = datetime.utcnow()
+    result = await BroadcastJob.get_motor_collection().update_one(
+        {"_id": job.id, "attempts": job.attempts, "status": "running"},
+        {"$set": {"leaseExpiresAt": _lease_expiry(now), "updatedAt": now}},
+    )
+    return result.matched_count > 0
+
+
+async def _run_broadcast(job: BroadcastJob, account: InstagramAccount, recipients: List[Dict[str, Any]]) -> None:
+    """Fan the broadcast out with bounded concurrency, flushing results in batches
+
+    A heartbeat renews the job's lease while sends are in flight (they can wait
+    on the Graph rate limiter for a long time between flushes).
+    """
+    allow_rate_limit_wait(settings.META_RATE_LIMIT_BACKGROUND_MAX_WAIT_SECONDS)
+    semaphore = asyncio.Semaphore(settings.BROADCAST_CONCURRENCY)
+    batch: List[BroadcastResult] = []
+    stopping = False
+
+    async def send(conversation: Dict[str, Any]) -> None:
+        async with semaphore:
+            if stopping:
+                result = BroadcastResult(
+                    conversation=conversation["_id"],
+                    igUserId=conversation["igUserId"],
+                    status="failed",
+                    error="Broadcast stopped before sending",
+                )
+            else:
+                result = await _send_one(job, account, conversation)
+        batch.append(result)
+
+    async def flush() -> None:
+        results = batch[:]
+        batch.clear()
+        await _flush(job, account, results)
+
+    async def heartbeat() -> None:
+        nonlocal stopping
+        while True:
+            await asyncio.sleep(settings.BROADCAST_LEASE_SECONDS / 3)
+            try:
+                if not await _renew_lease(job):
+                    logger.warning(f"Broadcast {job.id} was recovered by another process; stopping")
+                    stopping = True
+                    return
+            except Exception as e:
+                logger.warning(f"Broadcast {job.id}: failed to renew lease: {e}")
+
+    status, error = "completed", None
+    heartbeat_task = asyncio.create_task(heartbeat())
+    pending = [asyncio.ensure_future(send(conversation)) for conversation in recipients]
+    try:
+        for completed in asyncio.as_completed(pending):
+            await completed
+            if len(batch) >= settings.BROADCAST_FLUSH_SIZE:
+                await flush()
+        if batch:
+            await flush()
+        if stopping:
+            raise LeaseLost()
+    except Exception as e:
+        if isinstance(e, LeaseLost):
+            logger.warning(f"Broadcast {job.id} was recovered by another process; its remaining results are lost")
+        else:
+            logger.error(f"Broadcast {job.id} failed: {e}", exc_info=True)
+        status, error = "failed", str(e)[:1000]
+        # Stop starting new sends, but let in-flight ones finish so they are recorded
+        stopping = True
+        await asyncio.gather(*pending, return_exceptions=True)
+        if batch:
+            try:
+                await flush()
+            except Exception as flush_error:
+                logger.error(f"Broadcast {job.id}: failed to record final results: {flush_error}", exc_info=True)
+    finally:
+        heartbeat_task.cancel()
+        for future in pending:
+            future.cancel()
+        await asyncio.gather(heartbeat_task, return_exceptions=True)
+
+    now = datetime.utcnow()
+    result = await BroadcastJob.get_motor_collection().update_one(
+        {"_id": job.id, "attempts": job.attempts},
+        {"$set": {"status": status, "error": error, "leaseExpiresAt": None, "completedAt": now, "updatedAt": now}},
+    )
+    if result.matched_count:
+        logger.info(f"Broadcast {job.id} {status}")
+
+
+async def _recover_expired() -> Optional[Dict[str, Any]]:
+    """Fail one running broadcast whose process died, recording its unsent recipients
+
+    Recipients without a result may have been sent just before the crash, so they
+    are listed as failed rather than re-sent. Incrementing attempts fences out the
+    original process should it still be alive.
+    """
+    now = datetime.utcnow()
+    remaining = {
+        "$filter": {
+            "input": {"$ifNull": ["$recipients", []]},
+            "cond": {"$not": [{"$in": ["$$this.conversation", {"$ifNull": ["$results.conversation", []]}]}]},
+        }
+    }
+    return await BroadcastJob.get_motor_collection().find_one_and_update(
+        {"status": "running", "$or": [{"leaseExpiresAt": {"$lt": now}}, {"leaseExpiresAt": None}]},
+        [
+            {"$set": {"_remaining": remaining}},
+            {
+                "$set": {
+                    "results": {
+                        "$concatArrays": [
+                            {"$ifNull": ["$results", []]},
+                            {
+                                "$map": {
+                                    "input": "$_remaining",
+                                    "in": {
+                                        "conversation": "$$this.conversation",
+                                        "igUserId": "$$this.igUserId",
+                                        "status": "failed",
+                                        "messageId": None,
+                                        "error": {"$literal": INTERRUPTED_ERROR},
+                                    },
+                                }
+                            },
+                        ]
+                    },
+                    "failed": {"$add": ["$failed", {"$size": "$_remaining"}]},
+                    "attempts": {"$add": [{"$ifNull": ["$attempts", 1]}, 1]},
+                    "status": "failed",
+                    "error": "Broadcast interrupted (process stopped)",
+                    "leaseExpiresAt": None,
+                    "completedAt": now,
+                    "updatedAt": now,
+                }
+            },
+            {"$unset": "_remaining"},
+        ],
+        projection={"_id": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def _run_recovery() -> None:
+    """Fail broadcasts abandoned by crashed or restarted processes until cancelled"""
+    while True:
+        try:
+            while doc := await _recover_expired():
+                logger.warning(f"Broadcast {doc['_id']} was interrupted; marked failed with its unsent recipients")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Broadcast recovery error: {e}", exc_info=True)
+        await asyncio.sleep(settings.BROADCAST_RECOVERY_INTERVAL_SECONDS)
+
+
+def start_broadcast_recovery() -> None:
+    """Start the background task that recovers interrupted broadcasts"""
+    global _recovery_task
+    _recovery_task = asyncio.create_task(_run_recovery())
+
+
+async def stop_broadcast_recovery() -> None:
+    """Stop recovery and running broadcasts; other processes fail them once their lease expires"""
+    global _recovery_task
+    if _recovery_task:
+        _recovery_task.cancel()
+        await asyncio.gather(_recovery_task, return_exceptions=True)
+        _recovery_task = None
+    for task in list(_tasks):
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+
+
+async def get_broadcast(job_id: ObjectId, user_id: ObjectId, user_role: str = "user") -> dict:
+    """Get a broadcast job with its progress and per-recipient results"""
+    query = {"_id": job_id} if user_role == "admin" else {"_id": job_id, "user": user_id}
+    job = await BroadcastJob.find_one(query)
+    if not job:
+        raise NotFoundError("Broadcast not found")
+    return job.transform()
@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime
+from typing import Optional, Set
+from app.models.contact import Contact
+from app.models.instagram_account import InstagramAccount
+from app.utils.cache import TTLCache, SingleFlight
+from app.utils.graph_batcher import profile_batcher
+from app.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# In-process tier in front of the persistent `contacts` collection. Entries older
+# than the TTL are still served, and refreshed from Graph in the background.
+_cache = TTLCache(maxsize=settings.CONTACT_CACHE_SIZE, ttl=settings.CONTACT_CACHE_TTL_SECONDS)
+_lookups = SingleFlight()
+_background_tasks: Set[asyncio.Task] = set()
+
+
+async def get_contact_username(ig_user_id: str, account: InstagramAccount) -> Optional[str]:
+    """Get a sender's username without blocking on Graph for known contacts"""
+    entry = _cache.get_entry(ig_user_id)
+    if entry is None:
+        # Unknown in this process: load from Mongo, or from Graph for new contacts
+        username = await _lookups.do(ig_user_id, lambda: _load_contact(ig_user_id, account))
+        entry = _cache.get_entry(ig_user_id) or (username, 0.0)
+    
+    username, age = entry
+    if age > _cache.ttl and not _lookups.is_inflight(ig_user_id):
+        task = asyncio.create_task(
+            _lookups.do(ig_user_id, lambda: _fetch_contact(ig_user_id, account, username))
+        )
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+    return username
+
+
+async def _load_contact(ig_user_id: str, account: InstagramAccount) -> Optional[str]:
+    """Fill the in-process cache from the contacts collection, falling back to Graph"""
+    contact = await Contact.find_one({"igUserId": ig_user_id})
+    if not contact:
+        return await _fetch_contact(ig_user_id, account, None)
+    
+    _cache.set(ig_user_id, contact.username, age=(datetime.utcnow() - contact.fetchedAt).total_seconds())
+    return contact.username
+
+
+async def _fetch_contact(ig_user_id: str, account: InstagramAccount, fallback: Optional[str]) -> Optional[str]:
+    """Fetch a profile from Graph and persist it; keeps the previous username on failure"""
+    try:
+        # Concurrent lookups for the same account share one Graph batch request
+        profile = await profile_batcher.get(ig_user_id, account.pageAccessToken, account.pageId)
+    except Exception as e:
+        logger.warning(f"Failed to fetch username for {ig_user_id}: {e}")
+        # Serve the fallback and try Graph again once the retry delay has passed
+        _cache.set(ig_user_id, fallback, age=max(_cache.ttl - settings.CONTACT_FETCH_RETRY_SECONDS, 0))
+        return fallback
+    
+    now = datetime.utcnow()
+    await Contact.get_motor_collection().update_one(
+        {"igUserId": ig_user_id},
+        {
+            "$set": {
+                "username": profile.get("username"),
+                "name": profile.get("name"),
+                "fetchedAt": now,
+                "updatedAt": now,
+            },
+            "$setOnInsert": {"createdAt": now},
+        },
+        upsert=True,
+    )
+    _cache.set(ig_user_id, profile.get("username"))
+    return profile.get("username")
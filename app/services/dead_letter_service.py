@@ -0,0 +1,167 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import ReturnDocument
+from app.models.dead_letter import DeadLetter
+from app.schemas.webhook import MessagingEvent
+from app.services import webhook_service
+from app.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+_scheduler_task: Optional[asyncio.Task] = None
+_wakeup: Optional[asyncio.Event] = None
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff with jitter for the given number of failed attempts"""
+    delay = min(
+        settings.DEAD_LETTER_BASE_DELAY_SECONDS * (2 ** max(attempts - 1, 0)),
+        settings.DEAD_LETTER_MAX_DELAY_SECONDS,
+    )
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _error_fields(error: Exception) -> Dict[str, Any]:
+    return {"errorClass": type(error).__name__, "errorMessage": str(error)[:1000]}
+
+
+async def record_failures(failures: List[Tuple[MessagingEvent, Exception]]) -> None:
+    """Write failed messaging events to the dead-letter collection"""
+    now = datetime.utcnow()
+    await DeadLetter.insert_many(
+        [
+            DeadLetter(
+                event=event.to_dict(),
+                recipientId=event.recipient_id,
+                senderId=event.sender_id,
+                nextRetryAt=now + _retry_delay(1),
+                **_error_fields(error),
+            )
+            for event, error in failures
+        ]
+    )
+    logger.warning(f"Dead-lettered {len(failures)} webhook events")
+
+
+async def _claim_due() -> Optional[Dict[str, Any]]:
+    """Lease the next dead letter that is due for a retry"""
+    now = datetime.utcnow()
+    return await DeadLetter.get_motor_collection().find_one_and_update(
+        {"status": "pending", "nextRetryAt": {"$lte": now}},
+        # Push nextRetryAt out while the retry runs so other workers skip it
+        {"$set": {"nextRetryAt": now + timedelta(seconds=settings.WEBHOOK_LEASE_SECONDS), "updatedAt": now}},
+        sort=[("nextRetryAt", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def retry_dead_letter(doc: Dict[str, Any]) -> bool:
+    """Re-drive one dead letter; removes it on success, reschedules it on failure"""
+    collection = DeadLetter.get_motor_collection()
+    event = MessagingEvent.from_dict(doc["event"])
+    failures = await webhook_service.process_messaging_events([event])
+    if not failures:
+        await collection.delete_one({"_id": doc["_id"]})
+        logger.info(f"Dead letter {doc['_id']} replayed after {doc['attempts']} failed attempts")
+        return True
+
+    attempts = doc["attempts"] + 1
+    exhausted = attempts >= settings.DEAD_LETTER_MAX_ATTEMPTS
+    now = datetime.utcnow()
+    await collection.update_one(
+        {"_id": doc["_id"]},
+        {
+            "$set": {
+                "attempts": attempts,
+                "status": "exhausted" if exhausted else "pending",
+                "nextRetryAt": None if exhausted else now + _retry_delay(attempts),
+                "updatedAt": now,
+                **_error_fields(failures[0][1]),
+            }
+        },
+    )
+    if exhausted:
+        logger.error(f"Dead letter {doc['_id']} exhausted after {attempts} attempts")
+    return False
+
+
+async def _run_scheduler() -> None:
+    """Re-drive due dead letters until cancelled"""
+    while True:
+        try:
+            doc = await _claim_due()
+            if doc:
+                await retry_dead_letter(doc)
+                continue
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Dead letter scheduler error: {e}", exc_info=True)
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=settings.DEAD_LETTER_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+
+def start_dead_letter_scheduler() -> None:
+    """Start the background retry scheduler"""
+    global _scheduler_task, _wakeup
+    _wakeup = asyncio.Event()
+    _scheduler_task = asyncio.create_task(_run_scheduler())
+
+
+async def stop_dead_letter_scheduler() -> None:
+    """Stop the background retry scheduler"""
+    global _scheduler_task
+    if _scheduler_task:
+        _scheduler_task.cancel()
+        await asyncio.gather(_scheduler_task, return_exceptions=True)
+        _scheduler_task = None
+
+
+async def list_dead_letters(status: Optional[str] = None, skip: int = 0, limit: int = 50) -> dict:
+    """List dead letters, newest first"""
+    query = {"status": status} if status else {}
+    dead_letters = await DeadLetter.find(query).sort("-createdAt").skip(skip).limit(limit).to_list()
+    total = await DeadLetter.find(query).count()
+    return {
+        "deadLetters": [dead_letter.transform() for dead_letter in dead_letters],
+        "total": total,
+        "limit": limit,
+        "skip": skip,
+    }
+
+
+async def replay_dead_letters(ids: List[ObjectId]) -> int:
+    """Make dead letters (including exhausted ones) due for an immediate retry"""
+    result = await DeadLetter.get_motor_collection().update_many(
+        {"_id": {"$in": ids}},
+        {"$set": {"status": "pending", "nextRetryAt": datetime.utcnow(), "updatedAt": datetime.utcnow()}},
+    )
+    if _wakeup:
+        _wakeup.set()
+    logger.info(f"Dead letters scheduled for replay: {result.modified_count}")
+    return result.modified_count
+
+
+async def discard_dead_letters(ids: List[ObjectId]) -> int:
+    """Delete dead letters without retrying them"""
+    result = await DeadLetter.get_motor_collection().delete_many({"_id": {"$in": ids}})
+    logger.info(f"Dead letters discarded: {result.deleted_count}")
+    return result.deleted_count
+
+
+async def get_dead_letter_stats() -> Dict[str, int]:
+    """Number of dead letters by status"""
+    counts = {"pending": 0, "exhausted": 0}
+    async for row in DeadLetter.get_motor_collection().aggregate(
+        [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+    ):
+        counts[row["_id"]] = row["count"]
+    return counts
@@ -1,14 +1,32 @@
-from typing import List, Optional
+import asyncio
+from typing import AsyncIterator, List, Optional, Set, Tuple
+import orjson
 from datetime import datetime
 from bson import ObjectId
 from app.models.instagram_account import InstagramAccount
 from app.schemas.instagram_account import InstagramAccountCreate, InstagramAccountUpdate
-from app.core.exceptions import NotFoundError, BadRequestError
-from app.utils.meta_api import get_instagram_profile_details
+from app.core.exceptions import NotFoundError, BadRequestError, ServiceUnavailableError
+from app.services.account_index import account_index
+from app.services import backfill_service
+from app.utils.cache import TTLCache, SingleFlight
+from app.utils.meta_api import (
+    get_instagram_profile_details,
+    iter_instagram_media,
+    iter_instagram_media_pages,
+    circuit_breaker,
+    MetaAPIError,
+)
+from app.config.settings import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Profile details keyed by (instagramBusinessId, username). Entries older than the
+# TTL are served immediately and refreshed in the background.
+_profile_cache = TTLCache(maxsize=settings.PROFILE_CACHE_SIZE, ttl=settings.PROFILE_CACHE_TTL_SECONDS)
+_profile_fetches = SingleFlight()
+_background_tasks: Set[asyncio.Task] = set()
+
 
 async def create_instagram_account(user_id: ObjectId, data: InstagramAccountCreate) -> dict:
     """Create a new Instagram account"""
@@ -26,9 +44,13 @@ async def create_instagram_account(user_id: ObjectId, data: InstagramAccountCrea
         followersCount=data.followersCount or 0,
     )
     await account.insert()
+    account_index.upsert(account)
     
     logger.info(f"Instagram account created: {account.instagramBusinessId} for user {user_id}")
     
+    if settings.BACKFILL_ON_CONNECT:
+        await backfill_service.start_backfill(account, user_id)
+    
     return await account.transform()
 
 
@@ -78,6 +100,11 @@ async def update_instagram_account(
     
     account.updatedAt = datetime.utcnow()
     await account.save()
+    account_index.upsert(account)
+    if "pageAccessToken" in update_data:
+        # A new token may fix whatever opened the account's circuit
+        circuit_breaker.reset(account.pageId)
+        circuit_breaker.reset(account.instagramBusinessId)
     
     logger.info(f"Instagram account updated: {account_id}")
     
@@ -90,10 +117,18 @@ async def delete_instagram_account(account_id: ObjectId, user_id: ObjectId, user
     account.isActive = False
     account.updatedAt = datetime.utcnow()
     await account.save()
+    account_index.remove(account.id)
     
     logger.info(f"Instagram account deleted: {account_id}")
 
 
+def _meta_api_error(action: str, error: MetaAPIError) -> Exception:
+    """HTTP error for a failed Graph call: 503 if it can be retried later, else 400"""
+    if error.retryable:
+        return ServiceUnavailableError(f"{action}: {str(error)}")
+    return BadRequestError(f"{action}: {str(error)}")
+
+
 async def get_instagram_profile(account_id: ObjectId, user_id: ObjectId, user_role: str = "user") -> dict:
     """Get Instagram profile details using Meta API"""
     account = await get_instagram_account(account_id, user_id, user_role)
@@ -101,14 +136,94 @@ async def get_instagram_profile(account_id: ObjectId, user_id: ObjectId, user_ro
     if not account.username:
         raise BadRequestError("Username not set for this account")
     
-    try:
-        profile = await get_instagram_profile_details(
-            account.instagramBusinessId,
-            account.username,
-            account.pageAccessToken,
-        )
+    key = (account.instagramBusinessId, account.username)
+    entry = _profile_cache.get_entry(key)
+    if entry is not None and entry[1] <= settings.PROFILE_CACHE_MAX_STALE_SECONDS:
+        profile, age = entry
+        if age > _profile_cache.ttl and not _profile_fetches.is_inflight(key):
+            task = asyncio.create_task(_refresh_profile(key, account.pageAccessToken))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
         return profile
+    
+    try:
+        # Concurrent misses share one Graph request
+        return await _profile_fetches.do(key, lambda: _fetch_profile(key, account.pageAccessToken))
+    except MetaAPIError as e:
+        logger.error(f"Error fetching Instagram profile: {e}")
+        raise _meta_api_error("Failed to fetch profile", e)
     except Exception as e:
         logger.error(f"Error fetching Instagram profile: {e}")
         raise BadRequestError(f"Failed to fetch profile: {str(e)}")
 
+
+async def _fetch_profile(key: Tuple[str, str], page_access_token: str) -> dict:
+    """Fetch profile details from Graph and cache them"""
+    instagram_business_id, username = key
+    profile = await get_instagram_profile_details(instagram_business_id, username, page_access_token)
+    _profile_cache.set(key, profile)
+    return profile
+
+
+async def _refresh_profile(key: Tuple[str, str], page_access_token: str) -> None:
+    """Background refresh of a stale profile; the stale entry stays on failure"""
+    try:
+        await _profile_fetches.do(key, lambda: _fetch_profile(key, page_access_token))
+    except Exception as e:
+        logger.warning(f"Failed to refresh Instagram profile {key[0]}/{key[1]}: {e}")
+
+
+async def get_instagram_media(
+    account_id: ObjectId, user_id: ObjectId, user_role: str = "user", limit: int = 25, after: Optional[str] = None
+) -> dict:
+    """Get one page of the account's media; pass the returned cursor as `after` for the next page"""
+    account = await get_instagram_account(account_id, user_id, user_role)
+    if not account.username:
+        raise BadRequestError("Username not set for this account")
+    
+    pages = iter_instagram_media_pages(
+        account.instagramBusinessId, account.username, account.pageAccessToken, limit, after
+    )
+    try:
+        media, next_cursor = await anext(pages)
+    except MetaAPIError as e:
+        raise _meta_api_error("Failed to fetch media", e)
+    finally:
+        await pages.aclose()
+    return {"media": media, "next": next_cursor}
+
+
+async def stream_instagram_media(
+    account_id: ObjectId, user_id: ObjectId, user_role: str = "user"
+) -> AsyncIterator[bytes]:
+    """NDJSON stream of all the account's media, fetched page by page as the client reads"""
+    account = await get_instagram_account(account_id, user_id, user_role)
+    if not account.username:
+        raise BadRequestError("Username not set for this account")
+    return _media_ndjson(account)
+
+
+async def _media_ndjson(account: InstagramAccount) -> AsyncIterator[bytes]:
+    try:
+        async for item in iter_instagram_media(account.instagramBusinessId, account.username, account.pageAccessToken):
+            yield orjson.dumps(item) + b"\n"
+    except MetaAPIError as e:
+        # Headers are already sent: report the failure as the last line
+        logger.error(f"Error streaming Instagram media for {account.id}: {e}")
+        yield orjson.dumps({"error": str(e)}) + b"\n"
+
+
+async def start_instagram_backfill(account_id: ObjectId, user_id: ObjectId, user_role: str = "user") -> dict:
+    """Start (or resume) importing the account's conversation history"""
+    account = await get_instagram_account(account_id, user_id, user_role)
+    job = await backfill_service.start_backfill(account, user_id)
+    return job.transform()
+
+
+async def get_instagram_backfill(account_id: ObjectId, user_id: ObjectId, user_role: str = "user") -> dict:
+    """Progress of the account's latest history import"""
+    account = await get_instagram_account(account_id, user_id, user_role)
+    job = await backfill_service.get_latest_backfill(account.id)
+    if not job:
+        raise NotFoundError("No backfill has been started for this account")
+    return job.transform()
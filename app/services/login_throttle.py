@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.models.login_attempt import LoginAttempt
+from app.core.exceptions import TooManyRequestsError
+from app.utils.sliding_window import SlidingWindowLimiter
+from app.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+_limiter = SlidingWindowLimiter(max_keys=settings.LOGIN_LIMITER_MAX_KEYS)
+
+
+async def _mongo_hit(key: str, limit: int, window: float) -> float:
+    """Sliding-window hit shared across workers: one atomic update per key"""
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=window)
+    update = [
+        {"$set": {"hits": {"$filter": {"input": {"$ifNull": ["$hits", []]}, "cond": {"$gt": ["$$this", cutoff]}}}}},
+        {"$set": {"allowed": {"$lt": [{"$size": "$hits"}, limit]}}},
+        {
+            "$set": {
+                "hits": {"$cond": ["$allowed", {"$concatArrays": ["$hits", [now]]}, "$hits"]},
+                "expiresAt": now + timedelta(seconds=window),
+            }
+        },
+    ]
+    collection = LoginAttempt.get_motor_collection()
+    try:
+        document = await collection.find_one_and_update(
+            {"key": key}, update, upsert=True, return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # A concurrent first attempt for this key inserted it; update the existing document
+        document = await collection.find_one_and_update(
+            {"key": key}, update, upsert=True, return_document=ReturnDocument.AFTER
+        )
+    if document["allowed"]:
+        return 0.0
+    return max((document["hits"][0] - cutoff).total_seconds(), 0.0)
+
+
+async def _hit(key: str, limit: int, window: float) -> float:
+    if settings.LOGIN_LIMITER_BACKEND == "mongo":
+        try:
+            return await _mongo_hit(key, limit, window)
+        except Exception as e:
+            # Fall back to this worker's own counters rather than locking everyone out
+            logger.warning(f"Shared login limiter unavailable, using in-memory counters: {e}")
+    return _limiter.hit(key, limit, window)
+
+
+async def check_login_attempt(email: str, client_ip: Optional[str]) -> None:
+    """Count a login attempt, raising TooManyRequestsError when the IP or email is over its limit"""
+    checks = [(f"email:{email}", settings.LOGIN_EMAIL_MAX_ATTEMPTS, settings.LOGIN_EMAIL_WINDOW_SECONDS)]
+    if client_ip:
+        checks.insert(0, (f"ip:{client_ip}", settings.LOGIN_IP_MAX_ATTEMPTS, settings.LOGIN_IP_WINDOW_SECONDS))
+
+    for key, limit, window in checks:
+        retry_after = await _hit(key, limit, window)
+        if retry_after > 0:
+            logger.warning(f"Login throttled for {key}")
+            raise TooManyRequestsError("Too many login attempts. Please try again later.", retry_after=retry_after)
+
+
+async def reset_login_attempts(email: str) -> None:
+    """Clear an email's attempts after a successful login"""
+    key = f"email:{email}"
+    _limiter.reset(key)
+    if settings.LOGIN_LIMITER_BACKEND == "mongo":
+        try:
+            await LoginAttempt.get_motor_collection().delete_one({"key": key})
+        except Exception as e:
+            logger.warning(f"Failed to reset shared login attempts for {email}: {e}")
+
+
+def get_login_throttle_stats() -> dict:
+    return {"backend": settings.LOGIN_LIMITER_BACKEND, **_limiter.metrics()}
@@ -1,12 +1,13 @@
-from typing import List, Optional
+from typing import List, Optional, Literal
 from datetime import datetime
 from bson import ObjectId
 from app.models.message import Message, Attachment
 from app.models.conversation import Conversation
 from app.models.instagram_account import InstagramAccount
 from app.schemas.message import MessageCreate, AttachmentSchema
-from app.core.exceptions import NotFoundError, BadRequestError
-from app.utils.meta_api import send_instagram_message, send_instagram_attachment
+from app.core.exceptions import NotFoundError, BadRequestError, ServiceUnavailableError
+from app.services import outbound_service
+from app.utils.meta_api import send_instagram_message, send_instagram_attachment, MetaAPIError
 import logging
 
 logger = logging.getLogger(__name__)
@@ -40,7 +41,7 @@ async def get_conversation_messages(
     total = await Message.find({"conversation": conversation_id}).count()
     
     return {
-        "messages": [message.transform() for message in messages],
+        "messages": [message.transform(conversation.lastSeenByUserAt) for message in messages],
         "total": total,
         "limit": limit,
         "skip": skip,
@@ -48,9 +49,17 @@ async def get_conversation_messages(
 
 
 async def send_message(
-    conversation_id: ObjectId, user_id: ObjectId, data: MessageCreate, user_role: str = "user"
+    conversation_id: ObjectId,
+    user_id: ObjectId,
+    data: MessageCreate,
+    user_role: str = "user",
+    mode: Literal["sync", "async"] = "sync",
 ) -> dict:
-    """Send a message via Instagram API"""
+    """Send a message via Instagram API
+    
+    In async mode the message is stored as pending and sent by the outbound
+    worker; its status moves to sent or failed.
+    """
     # Validate at least one of text or attachment
     if not data.text and not data.attachment:
         raise BadRequestError("Either text or attachment is required")
@@ -71,6 +80,10 @@ async def send_message(
     if not account:
         raise NotFoundError("Conversation not found")
     
+    if mode == "async":
+        message = await outbound_service.enqueue_message(conversation, account, data)
+        return message.transform()
+    
     # Send message via Meta API
     message_id = None
     try:
@@ -96,6 +109,12 @@ async def send_message(
                 account.pageId,
             )
             message_id = result.get("message_id")
+    except MetaAPIError as e:
+        logger.error(f"Error sending message via Meta API: {e}")
+        if e.retryable:
+            # Graph is down or the account's circuit is open: the message can be retried later
+            raise ServiceUnavailableError(f"Failed to send message: {str(e)}")
+        raise BadRequestError(f"Failed to send message: {str(e)}")
     except Exception as e:
         logger.error(f"Error sending message via Meta API: {e}")
         raise BadRequestError(f"Failed to send message: {str(e)}")
@@ -113,6 +132,7 @@ async def send_message(
         messageId=message_id,
         sender="page",
         senderId=account.instagramBusinessId,
+        recipientId=conversation.igUserId,
         text=data.text,
         attachments=attachments,
         timestamp=datetime.utcnow(),
@@ -121,11 +141,9 @@ async def send_message(
     await message.insert()
     
     # Update conversation
-    if data.text:
-        conversation.update_last_message(data.text, datetime.utcnow())
-    else:
-        conversation.update_last_message(f"[{data.attachment.type}]", datetime.utcnow())
-    await conversation.save()
+    await Conversation.record_last_message(
+        conversation_id, data.text or f"[{data.attachment.type}]", message.timestamp
+    )
     
     logger.info(f"Message sent: {message_id} in conversation {conversation_id}")
     
@@ -156,9 +174,9 @@ async def mark_messages_as_read(conversation_id: ObjectId, user_id: ObjectId, us
     ).update_many({"$set": {"isRead": True}})
     
     # Reset unread count
-    conversation.unreadCount = 0
-    conversation.updatedAt = datetime.utcnow()
-    await conversation.save()
+    await Conversation.find_one({"_id": conversation_id}).update(
+        {"$set": {"unreadCount": 0, "updatedAt": datetime.utcnow()}}
+    )
     
     logger.info(f"Messages marked as read for conversation {conversation_id}")
 
@@ -0,0 +1,178 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+from app.models.message import Message, Attachment
+from app.models.conversation import Conversation
+from app.models.instagram_account import InstagramAccount
+from app.schemas.message import MessageCreate
+from app.utils.dispatcher import PartitionedDispatcher
+from app.utils.meta_api import send_instagram_message, send_instagram_attachment
+from app.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Sends are partitioned per conversation so a recipient gets messages in the order they were written
+dispatcher = PartitionedDispatcher("outbound", settings.OUTBOUND_SEND_CONCURRENCY)
+
+_sweeper_task: Optional[asyncio.Task] = None
+
+
+def _lease_expiry(now: datetime) -> datetime:
+    return now + timedelta(seconds=settings.OUTBOUND_LEASE_SECONDS)
+
+
+async def enqueue_message(conversation: Conversation, account: InstagramAccount, data: MessageCreate) -> Message:
+    """Store a pending page message and queue it for delivery
+
+    The message is written before Graph is called, so a crash or failed send
+    can never lose it: it ends up sent, failed, or re-driven by the sweeper.
+    """
+    now = datetime.utcnow()
+    message = Message(
+        conversation=conversation.id,
+        instagramAccount=account.id,
+        sender="page",
+        senderId=account.instagramBusinessId,
+        recipientId=conversation.igUserId,
+        text=data.text,
+        attachments=[Attachment(type=data.attachment.type, url=data.attachment.url)] if data.attachment else [],
+        timestamp=now,
+        isRead=True,  # Outgoing messages are read
+        status="pending",
+        # Owned by this process until the lease expires
+        leaseExpiresAt=_lease_expiry(now),
+    )
+    await message.insert()
+    await Conversation.record_last_message(
+        conversation.id, data.text or f"[{data.attachment.type}]", message.timestamp
+    )
+
+    _submit(conversation.id, message.id, 0)
+    logger.info(f"Message queued: {message.id} in conversation {conversation.id}")
+    return message
+
+
+def _submit(conversation_id: ObjectId, message_id: ObjectId, attempt: int) -> None:
+    """Queue a delivery on its conversation's partition, logging it if it fails"""
+    def log_failure(future: asyncio.Future) -> None:
+        if future.cancelled():
+            logger.warning(f"Delivery of message {message_id} cancelled; the sweeper retries it once its lease expires")
+        elif future.exception():
+            # Send failures are recorded on the message; this is e.g. a database error
+            logger.error(
+                f"Delivery of message {message_id} failed; the sweeper retries it once its lease expires",
+                exc_info=future.exception(),
+            )
+
+    dispatcher.submit(conversation_id, deliver_message, message_id, attempt).add_done_callback(log_failure)
+
+
+async def deliver_message(message_id: ObjectId, attempt: int) -> None:
+    """Send a pending message through Graph and record sent/failed with the Meta message ID
+
+    attempt must match the message's sendAttempts: if the sweeper has taken the
+    message over (or it was already delivered) this call does nothing.
+    """
+    collection = Message.get_motor_collection()
+    owner = {"_id": message_id, "status": "pending", "sendAttempts": attempt}
+    now = datetime.utcnow()
+    doc = await collection.find_one_and_update(
+        owner,
+        {"$set": {"leaseExpiresAt": _lease_expiry(now), "updatedAt": now}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not doc:
+        return
+
+    account = await InstagramAccount.find_one({"_id": doc["instagramAccount"], "isActive": True})
+    try:
+        if not account:
+            raise ValueError("Instagram account not found")
+        if doc.get("attachments"):
+            attachment = doc["attachments"][0]
+            result = await send_instagram_attachment(
+                doc["recipientId"],
+                {"type": attachment["type"], "url": attachment["url"]},
+                account.pageAccessToken,
+                account.instagramBusinessId,
+                account.pageId,
+            )
+        else:
+            result = await send_instagram_message(
+                doc["recipientId"],
+                doc["text"],
+                account.pageAccessToken,
+                account.instagramBusinessId,
+                account.pageId,
+            )
+        update = {"status": "sent", "messageId": result.get("message_id"), "error": None}
+        logger.info(f"Message sent: {update['messageId']} in conversation {doc['conversation']}")
+    except Exception as e:
+        update = {"status": "failed", "error": str(e)[:1000]}
+        logger.error(f"Error sending queued message {message_id}: {e}")
+
+    await collection.update_one(
+        owner, {"$set": {**update, "leaseExpiresAt": None, "updatedAt": datetime.utcnow()}}
+    )
+
+
+async def _claim_expired() -> Optional[Dict[str, Any]]:
+    """Take over the oldest pending message whose lease has expired (its process died)"""
+    now = datetime.utcnow()
+    return await Message.get_motor_collection().find_one_and_update(
+        {"status": "pending", "leaseExpiresAt": {"$lt": now}},
+        {"$set": {"leaseExpiresAt": _lease_expiry(now), "updatedAt": now}, "$inc": {"sendAttempts": 1}},
+        sort=[("createdAt", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def _run_sweeper() -> None:
+    """Re-drive pending messages abandoned by crashed or restarted processes until cancelled"""
+    while True:
+        try:
+            while doc := await _claim_expired():
+                if doc["sendAttempts"] >= settings.OUTBOUND_MAX_ATTEMPTS:
+                    # A send may have reached Meta before the crash: don't risk repeating it forever
+                    await Message.get_motor_collection().update_one(
+                        {"_id": doc["_id"], "sendAttempts": doc["sendAttempts"]},
+                        {
+                            "$set": {
+                                "status": "failed",
+                                "error": "Delivery interrupted too many times",
+                                "leaseExpiresAt": None,
+                                "updatedAt": datetime.utcnow(),
+                            }
+                        },
+                    )
+                    continue
+                logger.warning(f"Re-driving pending message {doc['_id']} (attempt {doc['sendAttempts']})")
+                _submit(doc["conversation"], doc["_id"], doc["sendAttempts"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Outbound sweeper error: {e}", exc_info=True)
+        await asyncio.sleep(settings.OUTBOUND_SWEEP_INTERVAL_SECONDS)
+
+
+def start_outbound_sweeper() -> None:
+    """Start the background task that recovers abandoned sends"""
+    global _sweeper_task
+    _sweeper_task = asyncio.create_task(_run_sweeper())
+
+
+async def stop_outbound_sweeper() -> None:
+    """Stop the sweeper; queued sends are re-driven after restart once their lease expires"""
+    global _sweeper_task
+    if _sweeper_task:
+        _sweeper_task.cancel()
+        await asyncio.gather(_sweeper_task, return_exceptions=True)
+        _sweeper_task = None
+
+
+async def get_outbound_stats() -> Dict[str, int]:
+    """Number of messages waiting to be sent"""
+    return {"pending": await Message.get_motor_collection().count_documents({"status": "pending"})}
@@ -0,0 +1,44 @@
+from typing import Optional
+from bson import ObjectId
+from app.models.user import User
+from app.utils.cache import TTLCache, SingleFlight
+from app.config.settings import settings
+
+# Authenticated users by ID, so polling clients don't cost a users lookup per
+# request. Changes made in this process invalidate immediately; the TTL bounds
+# how long other workers can serve a stale role or password hash.
+_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+_lookups = SingleFlight()
+_invalidations = 0
+
+
+async def get_user(user_id: ObjectId) -> Optional[User]:
+    """Get a user by ID, from the cache when possible
+
+    The returned User is shared between requests and must not be modified;
+    load a fresh copy with User.get before saving changes.
+    """
+    user = _cache.get(user_id)
+    if user is None:
+        user = await _lookups.do(user_id, lambda: _load_user(user_id))
+    return user
+
+
+async def _load_user(user_id: ObjectId) -> Optional[User]:
+    invalidations = _invalidations
+    user = await User.get(user_id)
+    # Don't cache a document read before a concurrent invalidation
+    if user and invalidations == _invalidations:
+        _cache.set(user_id, user)
+    return user
+
+
+def invalidate_user(user_id: ObjectId) -> None:
+    """Drop a user from the cache; call after changing their password, role or deleting them"""
+    global _invalidations
+    _invalidations += 1
+    _cache.pop(user_id)
+
+
+def get_user_cache_stats() -> dict:
+    return {"size": len(_cache), "maxsize": _cache.maxsize, "ttlSeconds": _cache.ttl}
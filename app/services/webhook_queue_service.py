@@ -0,0 +1,185 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Union
+from pymongo import ReturnDocument
+from app.models.webhook_event import WebhookEvent
+from app.services import webhook_service, dead_letter_service
+from app.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+_worker_tasks: List[asyncio.Task] = []
+_wakeup: Optional[asyncio.Event] = None
+
+
+async def enqueue_webhook_event(payload: Union[bytes, Dict[str, Any]]) -> None:
+    """Persist a raw webhook delivery so it can be acknowledged immediately"""
+    await WebhookEvent(payload=payload).insert()
+    if _wakeup:
+        _wakeup.set()
+
+
+async def claim_next_event() -> Optional[Dict[str, Any]]:
+    """Lease the oldest pending event that is due (or one whose lease has expired)"""
+    now = datetime.utcnow()
+    return await WebhookEvent.get_motor_collection().find_one_and_update(
+        {
+            "$or": [
+                {"status": "pending", "nextAttemptAt": {"$not": {"$gt": now}}},
+                {"status": "processing", "leaseExpiresAt": {"$lt": now}},
+            ]
+        },
+        {
+            "$set": {
+                "status": "processing",
+                "leaseExpiresAt": now + timedelta(seconds=settings.WEBHOOK_LEASE_SECONDS),
+                "updatedAt": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("createdAt", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff with jitter for the given number of failed attempts"""
+    delay = min(
+        settings.WEBHOOK_RETRY_BASE_DELAY_SECONDS * (2 ** max(attempts - 1, 0)),
+        settings.WEBHOOK_RETRY_MAX_DELAY_SECONDS,
+    )
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+async def _dead_letter_delivery(event: Dict[str, Any], error: Exception) -> bool:
+    """Move an exhausted delivery's messaging events to the dead-letter store
+
+    Returns False if that failed too; the delivery is then kept as failed.
+    """
+    try:
+        messaging_events = webhook_service.parse_webhook_payload(event["payload"])
+        if messaging_events:
+            await dead_letter_service.record_failures([(messaging_event, error) for messaging_event in messaging_events])
+        return True
+    except Exception as e:
+        logger.error(f"Could not dead-letter webhook event {event['_id']}: {e}", exc_info=True)
+        return False
+
+
+async def process_queued_event(event: Dict[str, Any]) -> None:
+    """Process a leased event and remove it from the queue, or release it for retry
+    
+    Individual messaging events that fail are moved to the dead-letter store; the
+    whole delivery is only retried if that is not possible, and after
+    WEBHOOK_MAX_ATTEMPTS its events are dead-lettered as well. Every write is
+    fenced on the lease (attempts), so a worker whose lease expired can't delete
+    or release an event another worker has taken over.
+    """
+    collection = WebhookEvent.get_motor_collection()
+    attempts = event.get("attempts", 0)
+    lease = {"_id": event["_id"], "status": "processing", "attempts": attempts}
+    try:
+        failures = await webhook_service.process_webhook_event(event["payload"])
+        if failures:
+            await dead_letter_service.record_failures(failures)
+    except Exception as e:
+        logger.error(f"Error processing queued webhook event {event['_id']}: {e}", exc_info=True)
+        if attempts >= settings.WEBHOOK_MAX_ATTEMPTS and await _dead_letter_delivery(event, e):
+            await collection.delete_one(lease)
+            logger.error(f"Webhook event {event['_id']} dead-lettered after {attempts} attempts")
+            return
+        
+        exhausted = attempts >= settings.WEBHOOK_MAX_ATTEMPTS
+        now = datetime.utcnow()
+        await collection.update_one(
+            lease,
+            {
+                "$set": {
+                    "status": "failed" if exhausted else "pending",
+                    "leaseExpiresAt": None,
+                    "nextAttemptAt": None if exhausted else now + _retry_delay(attempts),
+                    "lastError": f"{type(e).__name__}: {e}"[:1000],
+                    "updatedAt": now,
+                }
+            },
+        )
+        if exhausted:
+            logger.error(f"Webhook event {event['_id']} failed after {attempts} attempts and was kept as failed")
+        return
+
+    result = await collection.delete_one(lease)
+    if result.deleted_count == 0:
+        logger.warning(f"Webhook event {event['_id']} was taken over by another worker before it completed")
+
+
+async def _dead_letter_failed_events() -> None:
+    """Dead-letter deliveries left as failed (by earlier versions, or when dead-lettering them failed)"""
+    collection = WebhookEvent.get_motor_collection()
+    try:
+        async for event in collection.find({"status": "failed"}):
+            error = RuntimeError(event.get("lastError") or "Webhook delivery failed")
+            if await _dead_letter_delivery(event, error):
+                await collection.delete_one({"_id": event["_id"], "status": "failed"})
+                logger.warning(f"Failed webhook event {event['_id']} moved to the dead-letter store")
+    except Exception as e:
+        logger.error(f"Error dead-lettering failed webhook events: {e}", exc_info=True)
+
+
+async def get_queue_stats() -> Dict[str, int]:
+    """Number of queued webhook events by status"""
+    counts = {"pending": 0, "processing": 0, "failed": 0}
+    async for row in WebhookEvent.get_motor_collection().aggregate(
+        [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+    ):
+        counts[row["_id"]] = row["count"]
+    return counts
+
+
+async def _wait_for_work() -> None:
+    """Sleep until an event is enqueued in this process or the poll interval elapses"""
+    try:
+        await asyncio.wait_for(_wakeup.wait(), timeout=settings.WEBHOOK_POLL_INTERVAL_SECONDS)
+    except asyncio.TimeoutError:
+        pass
+    _wakeup.clear()
+
+
+async def _worker(worker_id: int) -> None:
+    """Drain the webhook queue until cancelled"""
+    logger.info(f"Webhook worker {worker_id} started")
+    while True:
+        try:
+            event = await claim_next_event()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Webhook worker {worker_id} failed to claim event: {e}")
+            await asyncio.sleep(settings.WEBHOOK_POLL_INTERVAL_SECONDS)
+            continue
+
+        if not event:
+            await _wait_for_work()
+            continue
+
+        await process_queued_event(event)
+
+
+def start_webhook_workers() -> None:
+    """Start the pool of webhook queue workers"""
+    global _wakeup
+    _wakeup = asyncio.Event()
+    for worker_id in range(settings.WEBHOOK_WORKER_COUNT):
+        _worker_tasks.append(asyncio.create_task(_worker(worker_id)))
+    _worker_tasks.append(asyncio.create_task(_dead_letter_failed_events()))
+    logger.info(f"Started {settings.WEBHOOK_WORKER_COUNT} webhook workers")
+
+
+async def stop_webhook_workers() -> None:
+    """Cancel webhook workers; in-flight events are picked up again once their lease expires"""
+    for task in _worker_tasks:
+        task.cancel()
+    await asyncio.gather(*_worker_tasks, return_exceptions=True)
+    _worker_tasks.clear()
+    logger.info("Webhook workers stopped")
@@ -1,15 +1,29 @@
+import asyncio
+import functools
+import hashlib
+import hmac
+import random
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple, Union
+import orjson
 from bson import ObjectId
+from pymongo.errors import BulkWriteError
 from app.models.instagram_account import InstagramAccount
 from app.models.conversation import Conversation
 from app.models.message import Message, Attachment
-from app.utils.meta_api import get_instagram_user_profile
+from app.schemas.webhook import MessagingEvent
+from app.services.account_index import account_index
+from app.services.contact_service import get_contact_username
+from app.utils.dispatcher import PartitionedDispatcher
 from app.config.settings import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Messaging events are partitioned per conversation: different conversations are
+# processed concurrently, events within one conversation keep their arrival order.
+dispatcher = PartitionedDispatcher("webhook", settings.WEBHOOK_DISPATCH_CONCURRENCY)
+
 
 async def verify_webhook(mode: str, verify_token: str, challenge: str) -> Optional[str]:
     """Verify webhook subscription"""
@@ -20,182 +34,276 @@ async def verify_webhook(mode: str, verify_token: str, challenge: str) -> Option
     return None
 
 
-async def process_webhook_event(event_data: Dict[str, Any]) -> str:
-    """Process incoming webhook event from Meta"""
+def verify_signature(body: bytes, signature_header: Optional[str]) -> bool:
+    """Check Meta's X-Hub-Signature-256 (HMAC-SHA256 of the raw body with the app secret)"""
+    if not settings.WEBHOOK_VERIFY_SIGNATURE:
+        return True
+    if not signature_header or not signature_header.startswith("sha256="):
+        return False
+    expected = hmac.new(settings.META_APP_SECRET.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature_header[len("sha256="):])
+
+
+def parse_webhook_payload(payload: Union[bytes, Dict[str, Any]]) -> List[MessagingEvent]:
+    """Decode a delivery (raw bytes, or an already-decoded dict) into messaging events"""
+    event_data = orjson.loads(payload) if isinstance(payload, (bytes, bytearray, str)) else payload
+    return [
+        MessagingEvent.from_dict(message_event)
+        for entry_item in event_data.get("entry") or []
+        for message_event in entry_item.get("messaging") or []
+    ]
+
+
+async def process_webhook_event(payload: Union[bytes, Dict[str, Any]]) -> List[Tuple[MessagingEvent, Exception]]:
+    """Process a webhook delivery from Meta (called by the webhook queue workers)
+    
+    Returns the messaging events that failed, with their errors, so the caller
+    can dead-letter them.
+    """
+    if settings.WEBHOOK_DEBUG_SAMPLE_RATE and random.random() < settings.WEBHOOK_DEBUG_SAMPLE_RATE:
+        logger.info(f"Sampled webhook payload: {payload!r}")
+    
     try:
-        logger.info(f"Received webhook event: {event_data}")
-        entry = event_data.get("entry", [])
-        if not entry:
-            logger.warning("Empty webhook entry")
-            return "EVENT_RECEIVED"
-        
-        for entry_item in entry:
-            messaging = entry_item.get("messaging", [])
-            if not messaging:
-                logger.warning(f"No messaging events in entry: {entry_item}")
-                continue
-            for message_event in messaging:
-                logger.info(f"Processing messaging event: {message_event}")
-                await process_messaging_event(message_event)
-        
-        return "EVENT_RECEIVED"
-    except Exception as e:
-        logger.error(f"Error processing webhook event: {e}", exc_info=True)
-        return "EVENT_RECEIVED"  # Always return success to Meta
-
-
-async def process_messaging_event(event: Dict[str, Any]) -> None:
-    """Process a single messaging event"""
-    sender = event.get("sender", {})
-    recipient = event.get("recipient", {})
-    
-    sender_id = sender.get("id")
-    recipient_id = recipient.get("id")
-    
-    if not sender_id or not recipient_id:
-        logger.warning("Missing sender or recipient ID in webhook event")
-        return
+        events = parse_webhook_payload(payload)
+    except orjson.JSONDecodeError as e:
+        logger.error(f"Dropping undecodable webhook payload: {e}")
+        return []
+    if not events:
+        logger.warning("Webhook delivery without messaging events")
+        return []
     
-    logger.info(f"Processing webhook event - Sender: {sender_id}, Recipient: {recipient_id}")
+    return await process_messaging_events(events)
+
+
+async def _resolve_accounts(
+    events: List[MessagingEvent],
+) -> Tuple[List[Tuple[MessagingEvent, InstagramAccount]], List[Tuple[MessagingEvent, Exception]]]:
+    """Pair each event with the account it was sent to
     
-    # Find Instagram account by recipient ID
-    # Meta may send either Page ID or Instagram Business ID as recipient
-    # Try exact string match first (most common case)
-    account = None
+    Events without an account are dropped; events whose lookup failed are
+    returned separately with the error.
+    """
+    recipient_ids = list({event.recipient_id for event in events if event.sender_id and event.recipient_id})
+    lookups = await asyncio.gather(*(account_index.lookup(id) for id in recipient_ids), return_exceptions=True)
+    accounts = dict(zip(recipient_ids, lookups))
     
-    # First, try to match by Instagram Business ID (more specific)
-    account = await InstagramAccount.find_one(
-        {"instagramBusinessId": recipient_id, "isActive": True}
-    )
+    routed = []
+    failures = []
+    for event in events:
+        if not event.sender_id or not event.recipient_id:
+            logger.warning("Missing sender or recipient ID in webhook event")
+            continue
+        # Meta may send either Page ID or Instagram Business ID as recipient
+        account = accounts[event.recipient_id]
+        if isinstance(account, Exception):
+            logger.error(f"Error looking up account for recipient {event.recipient_id}: {account!r}")
+            failures.append((event, account))
+        elif not account:
+            logger.error(
+                f"❌ Instagram account not found for recipient: {event.recipient_id} "
+                f"({len(account_index)} active accounts indexed)"
+            )
+        else:
+            routed.append((event, account))
+    return routed, failures
+
+
+async def process_messaging_events(events: List[MessagingEvent]) -> List[Tuple[MessagingEvent, Exception]]:
+    """Process events concurrently per conversation and store their messages
     
-    # If not found, try Page ID
-    if not account:
-        account = await InstagramAccount.find_one(
-            {"pageId": recipient_id, "isActive": True}
-        )
+    Events are partitioned on the resolved account and the sender, so a
+    conversation keeps its order whether Meta addressed it to the Page ID or the
+    Instagram Business ID. Reactions and read receipts are applied after the
+    delivery's messages are stored, so they also find messages that arrived in
+    the same delivery. Returns the events that failed, with their errors.
+    """
+    routed, failures = await _resolve_accounts(events)
+    pending = [
+        dispatcher.submit((account.id, event.sender_id), process_messaging_event, event, account)
+        for event, account in routed
+    ]
+    results = await asyncio.gather(*pending, return_exceptions=True)
+    
+    messages = []
+    message_events = []
+    deferred = []
+    for (event, account), result in zip(routed, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error processing {event.kind} event from {event.sender_id}: {result!r}")
+            failures.append((event, result))
+        elif isinstance(result, Message):
+            messages.append(result)
+            message_events.append(event)
+        elif result is not None:
+            deferred.append((event, account, result))
     
-    # If still not found, try matching as integers (Meta sometimes sends numeric IDs)
-    if not account:
+    if messages:
         try:
-            recipient_id_int = int(recipient_id)
-            # Try IG Business ID as int
-            account = await InstagramAccount.find_one(
-                {"instagramBusinessId": str(recipient_id_int), "isActive": True}
+            await store_messages(messages)
+        except Exception as e:
+            # Safe to retry: stored messages are deduplicated and their conversation updates re-applied
+            logger.error(f"Error storing {len(messages)} messages: {e!r}")
+            failures.extend((event, e) for event in message_events)
+    
+    if deferred:
+        pending = [dispatcher.submit((account.id, event.sender_id), apply) for event, account, apply in deferred]
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        for (event, _, _), result in zip(deferred, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error processing {event.kind} event from {event.sender_id}: {result!r}")
+                failures.append((event, result))
+    return failures
+
+
+async def store_messages(messages: List[Message]) -> List[Message]:
+    """Insert a delivery's messages in one round trip and update their conversations
+    
+    Relies on the unique messageId index: duplicate-key errors mean Meta redelivered
+    a message we already have (or an earlier attempt stored it before failing), so
+    it is not inserted again. Conversation updates are applied for duplicates too,
+    without the unread increment, so a retry completes them. Returns the newly
+    stored messages.
+    """
+    duplicates = set()
+    try:
+        await Message.insert_many(messages, ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            if error.get("code") != 11000:
+                raise
+            duplicates.add(error["index"])
+    
+    stored = [message for index, message in enumerate(messages) if index not in duplicates]
+    for index in sorted(duplicates):
+        logger.info(f"Duplicate message ignored: {messages[index].messageId}")
+    
+    # lastMessage/lastMessageTimestamp/lastInboundAt updates are idempotent and are
+    # re-applied for duplicates; unreadCount only counts newly stored messages
+    updates = []
+    for index, message in enumerate(messages):
+        updates.extend(
+            Conversation.last_message_updates(
+                message.conversation,
+                _last_message_preview(message),
+                message.timestamp,
+                unread_increment=0 if index in duplicates else 1,
+                inbound=True,
             )
-            # Try Page ID as int
-            if not account:
-                account = await InstagramAccount.find_one(
-                    {"pageId": str(recipient_id_int), "isActive": True}
-                )
-        except (ValueError, TypeError):
-            pass
-    
-    if not account:
-        logger.error(f"❌ Instagram account not found for recipient: {recipient_id}")
-        logger.error(f"   Tried matching against instagramBusinessId and pageId (as string and int)")
-        # Log all active accounts for debugging
-        all_accounts = await InstagramAccount.find({"isActive": True}).to_list()
-        logger.error(f"   Active accounts in database:")
-        for acc in all_accounts:
-            logger.error(f"     - Username: {acc.username}, Page ID: {acc.pageId}, IG Business ID: {acc.instagramBusinessId}")
-        return
+        )
+    if updates:
+        await Conversation.get_motor_collection().bulk_write(updates)
     
-    logger.info(f"✅ Matched account: {account.username} (Page ID: {account.pageId}, IG Business ID: {account.instagramBusinessId})")
+    for message in stored:
+        logger.info(f"Message processed: {message.messageId} from {message.senderId} in conversation {message.conversation}")
+    return stored
+
+
+def _event_datetime(timestamp_ms: Optional[int]) -> datetime:
+    """Convert a Meta millisecond timestamp to naive UTC (now if missing)"""
+    if timestamp_ms:
+        return datetime.utcfromtimestamp(timestamp_ms / 1000)
+    return datetime.utcnow()
+
+
+def _last_message_preview(message: Message) -> str:
+    """Conversation preview text for a message"""
+    return message.text or f"[{len(message.attachments)} attachment(s)]"
+
+
+async def process_messaging_event(
+    event: MessagingEvent, account: InstagramAccount
+) -> Union[Message, Callable[[], Awaitable[None]], None]:
+    """Process a single messaging event addressed to account
+    
+    Message events are returned as unsaved Message documents so the whole
+    delivery can be written with one insert_many. Reactions and read receipts
+    are returned as updates to apply once those messages are stored.
+    """
+    logger.debug(f"Processing {event.kind} event - Sender: {event.sender_id}, Account: {account.id}")
     
     # Handle different event types
-    if "message" in event:
-        await process_message_event(event, account, sender_id)
-    elif "reaction" in event:
-        await process_reaction_event(event, account, sender_id)
-    elif "read" in event:
-        await process_read_event(event, account, sender_id)
-
-
-async def process_message_event(
-    event: Dict[str, Any], account: InstagramAccount, sender_id: str
-) -> None:
-    """Process incoming message event"""
-    message_data = event.get("message", {})
-    message_id = message_data.get("mid")
-    text = message_data.get("text")
-    attachments = message_data.get("attachments", [])
-    timestamp = event.get("timestamp")
-    
-    if not message_id:
+    if event.kind == "message":
+        return await process_message_event(event, account)
+    elif event.kind == "reaction":
+        return functools.partial(process_reaction_event, event, account)
+    elif event.kind == "read":
+        return functools.partial(process_read_event, event, account)
+    return None
+
+
+async def process_message_event(event: MessagingEvent, account: InstagramAccount) -> Optional[Message]:
+    """Build the Message for an incoming message event (stored by store_messages)"""
+    if not event.mid:
         logger.warning("Message ID missing in webhook event")
-        return
-    
-    # Check if message already exists (prevent duplicates)
-    existing_message = await Message.find_one({"messageId": message_id})
-    if existing_message:
-        logger.info(f"Duplicate message ignored: {message_id}")
-        return
+        return None
     
-    # Get username from Meta API
-    ig_username = None
-    try:
-        user_profile = await get_instagram_user_profile(sender_id, account.pageAccessToken)
-        ig_username = user_profile.get("username")
-    except Exception as e:
-        logger.warning(f"Failed to fetch username for {sender_id}: {e}")
-    
-    # Find or create conversation
-    conversation = await Conversation.find_or_create(
-        account.id, sender_id, ig_username
-    )
+    # Get username from the contact cache (Graph is only called for new or stale contacts)
+    ig_username = await get_contact_username(event.sender_id, account)
     
-    # Process attachments
-    attachment_objects = []
-    for att in attachments:
-        att_type = att.get("type", "file")
-        payload = att.get("payload", {})
-        url = payload.get("url")
-        if url:
-            attachment_objects.append(Attachment(type=att_type, url=url))
-    
-    # Create message timestamp
-    if timestamp:
-        message_timestamp = datetime.fromtimestamp(timestamp / 1000)
-    else:
-        message_timestamp = datetime.utcnow()
+    # Find or create conversation (single atomic upsert)
+    conversation_id = await Conversation.upsert_active(account.id, event.sender_id, ig_username)
     
-    # Create message record
-    message = Message(
-        conversation=conversation.id,
+    # Create message record (duplicates are rejected by the unique messageId index)
+    return Message(
+        conversation=conversation_id,
         instagramAccount=account.id,
-        messageId=message_id,
+        messageId=event.mid,
         sender="user",
-        senderId=sender_id,
-        text=text,
-        attachments=attachment_objects,
-        timestamp=message_timestamp,
+        senderId=event.sender_id,
+        text=event.text,
+        attachments=[Attachment(type=att_type, url=url) for att_type, url in event.attachments],
+        timestamp=_event_datetime(event.timestamp),
         isRead=False,
     )
-    await message.insert()
-    
-    # Update conversation
-    conversation.update_last_message(text or f"[{len(attachments)} attachment(s)]", message_timestamp)
-    conversation.unreadCount += 1
-    conversation.updatedAt = datetime.utcnow()
-    await conversation.save()
-    
-    logger.info(f"Message processed: {message_id} from {sender_id} in conversation {conversation.id}")
 
 
-async def process_reaction_event(
-    event: Dict[str, Any], account: InstagramAccount, sender_id: str
-) -> None:
-    """Process reaction event (optional implementation)"""
-    reaction = event.get("reaction", {})
-    logger.info(f"Reaction event received: {reaction} from {sender_id}")
-    # Implement reaction logging if needed
-
+async def process_reaction_event(event: MessagingEvent, account: InstagramAccount) -> None:
+    """Store or remove the sender's reaction on a message (one update by messageId)"""
+    mid = event.reaction.get("mid")
+    if not mid:
+        logger.warning("Message ID missing in reaction event")
+        return
+    
+    collection = Message.get_motor_collection()
+    query = {"messageId": mid, "instagramAccount": account.id}
+    if event.reaction.get("action") == "unreact":
+        await collection.update_one(query, {"$pull": {"reactions": {"userId": event.sender_id}}})
+    else:
+        reaction = {
+            "userId": event.sender_id,
+            "reaction": event.reaction.get("reaction"),
+            "emoji": event.reaction.get("emoji"),
+            "timestamp": _event_datetime(event.timestamp),
+        }
+        # Replace any previous reaction from the same user in a single pipeline update
+        await collection.update_one(
+            query,
+            [
+                {
+                    "$set": {
+                        "reactions": {
+                            "$concatArrays": [
+                                {
+                                    "$filter": {
+                                        "input": {"$ifNull": ["$reactions", []]},
+                                        "cond": {"$ne": ["$$this.userId", event.sender_id]},
+                                    }
+                                },
+                                [reaction],
+                            ]
+                        }
+                    }
+                }
+            ],
+        )
+    logger.info(f"Reaction {event.reaction.get('action', 'react')} on {mid} from {event.sender_id}")
 
-async def process_read_event(
-    event: Dict[str, Any], account: InstagramAccount, sender_id: str
-) -> None:
-    """Process read receipt event (optional implementation)"""
-    read = event.get("read", {})
-    logger.info(f"Read receipt received: {read} from {sender_id}")
-    # Implement read receipt logging if needed
 
+async def process_read_event(event: MessagingEvent, account: InstagramAccount) -> None:
+    """Advance the conversation's seen watermark (one update regardless of message count)"""
+    watermark = _event_datetime(event.read.get("watermark") or event.timestamp)
+    await Conversation.get_motor_collection().update_one(
+        {"instagramAccount": account.id, "igUserId": event.sender_id, "isActive": True},
+        {"$max": {"lastSeenByUserAt": watermark}},
+    )
+    logger.info(f"Read receipt from {event.sender_id} up to {watermark.isoformat()}")
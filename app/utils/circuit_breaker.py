@@ -0,0 +1,80 @@
+import time
+from typing import Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _Circuit:
+    def __init__(self):
+        self.failures = 0
+        self.open_until = 0.0
+        self.reason: Optional[str] = None
+        self.fatal = False
+
+
+class CircuitBreaker:
+    """Per-key circuit breaker
+
+    A key's circuit opens after failure_threshold consecutive failures, or at
+    once on a fatal failure, and rejects calls until its reset time. After that
+    one probe call is let through per reset period (half-open): a success
+    closes the circuit, a failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float, fatal_reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.fatal_reset_seconds = fatal_reset_seconds
+        self._circuits: Dict[str, _Circuit] = {}
+        self.rejected = 0
+
+    def blocked(self, key: str) -> Optional[Tuple[str, float]]:
+        """(reason, seconds until the next probe) if calls for key must fail fast"""
+        circuit = self._circuits.get(key)
+        if circuit is None or not circuit.open_until:
+            return None
+        now = time.monotonic()
+        if now < circuit.open_until:
+            self.rejected += 1
+            return circuit.reason or "circuit open", circuit.open_until - now
+        # Half-open: let this call probe, keep rejecting others until it reports back
+        circuit.open_until = now + (self.fatal_reset_seconds if circuit.fatal else self.reset_seconds)
+        logger.info(f"{self.name} circuit half-open for {key}, probing")
+        return None
+
+    def record_success(self, key: str) -> None:
+        circuit = self._circuits.pop(key, None)
+        if circuit is not None and circuit.open_until:
+            logger.info(f"{self.name} circuit closed for {key}")
+
+    def record_failure(self, key: str, reason: str, fatal: bool = False) -> None:
+        circuit = self._circuits.setdefault(key, _Circuit())
+        circuit.failures += 1
+        circuit.reason = reason
+        if fatal or circuit.open_until or circuit.failures >= self.failure_threshold:
+            circuit.fatal = fatal
+            circuit.open_until = time.monotonic() + (self.fatal_reset_seconds if fatal else self.reset_seconds)
+            logger.warning(f"{self.name} circuit open for {key} after {circuit.failures} failure(s): {reason}")
+
+    def reset(self, key: str) -> None:
+        """Close key's circuit (e.g. after its credentials changed)"""
+        self._circuits.pop(key, None)
+
+    def metrics(self) -> dict:
+        """Open circuits and rejected call count"""
+        now = time.monotonic()
+        return {
+            "rejected": self.rejected,
+            "open": {
+                key: {
+                    "failures": circuit.failures,
+                    "reason": circuit.reason,
+                    "fatal": circuit.fatal,
+                    "retryInSeconds": round(max(circuit.open_until - now, 0.0), 1),
+                }
+                for key, circuit in self._circuits.items()
+                if circuit.open_until
+            },
+        }
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Job:
+    func: Callable[..., Awaitable[Any]]
+    args: tuple
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class PartitionedDispatcher:
+    """Run jobs concurrently across partitions while keeping arrival order within a partition
+
+    Each partition key gets its own FIFO queue drained by a single task, so jobs
+    for the same key never overlap. A shared semaphore caps how many jobs run at
+    once across all partitions.
+    """
+
+    def __init__(self, name: str, concurrency: int):
+        self.name = name
+        self.concurrency = concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._partitions: Dict[Hashable, Deque[_Job]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._processed = 0
+        self._failed = 0
+
+    def submit(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args: Any) -> asyncio.Future:
+        """Queue a job on a partition and return a future for its result"""
+        job = _Job(func=func, args=args, future=asyncio.get_running_loop().create_future())
+        queue = self._partitions.get(key)
+        if queue is None:
+            queue = deque()
+            self._partitions[key] = queue
+            queue.append(job)
+            task = asyncio.create_task(self._drain(key, queue))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            queue.append(job)
+        return job.future
+
+    async def _drain(self, key: Hashable, queue: Deque[_Job]) -> None:
+        """Run a partition's jobs one after another until its queue is empty"""
+        try:
+            while queue:
+                # Leave the job at the head of the queue while it runs so it counts towards lag
+                job = queue[0]
+                async with self._semaphore:
+                    try:
+                        result = await job.func(*job.args)
+                        if not job.future.done():
+                            job.future.set_result(result)
+                        self._processed += 1
+                    except Exception as e:
+                        if not job.future.done():
+                            job.future.set_exception(e)
+                        self._failed += 1
+                queue.popleft()
+        finally:
+            # Cancelled (e.g. shutdown): don't leave callers waiting, and let the
+            # next submit for this key start a fresh drain task
+            for job in queue:
+                job.future.cancel()
+            queue.clear()
+            if self._partitions.get(key) is queue:
+                del self._partitions[key]
+
+    def metrics(self, max_partitions: int = 50) -> dict:
+        """Queue depth and per-partition lag (age of the oldest queued job)"""
+        now = time.monotonic()
+        lags = sorted(
+            ((key, now - queue[0].enqueued_at) for key, queue in self._partitions.items() if queue),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+        return {
+            "name": self.name,
+            "concurrency": self.concurrency,
+            "queueDepth": sum(len(queue) for queue in self._partitions.values()),
+            "activePartitions": len(self._partitions),
+            "maxPartitionLagSeconds": round(lags[0][1], 3) if lags else 0.0,
+            "partitionLagSeconds": {
+                ":".join(str(part) for part in key) if isinstance(key, tuple) else str(key): round(lag, 3)
+                for key, lag in lags[:max_partitions]
+            },
+            "processed": self._processed,
+            "failed": self._failed,
+        }
@@ -0,0 +1,92 @@
+import asyncio
+from typing import Any, Dict, Optional, Set, Tuple
+from app.config.settings import settings
+from app.utils import meta_api
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileBatcher:
+    """Coalesce Instagram profile lookups into Graph batch requests
+
+    Lookups for the same account and token that arrive within window seconds
+    are sent as one batch of up to max_size sub-requests (sent immediately once
+    full); each caller gets its own profile or error back. A lone lookup is
+    sent as a plain GET.
+    """
+
+    def __init__(self, window: float, max_size: int):
+        self.window = window
+        self.max_size = min(max_size, meta_api.GRAPH_BATCH_LIMIT)
+        self._pending: Dict[Tuple[str, str], Dict[str, asyncio.Future]] = {}
+        self._timers: Dict[Tuple[str, str], asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.lookups = 0
+        self.requests = 0
+
+    async def get(self, ig_user_id: str, page_access_token: str, account_key: Optional[str] = None) -> Dict[str, Any]:
+        """Get a profile ({"username", "name"}) through the next batch for this account"""
+        group = (account_key or "", page_access_token)
+        pending = self._pending.setdefault(group, {})
+        future = pending.get(ig_user_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            pending[ig_user_id] = future
+            self.lookups += 1
+            if len(pending) >= self.max_size:
+                self._flush(group)
+            elif group not in self._timers:
+                self._timers[group] = asyncio.get_running_loop().call_later(self.window, self._flush, group)
+        # shield: a cancelled caller must not cancel the lookup for others in the batch
+        return await asyncio.shield(future)
+
+    def _flush(self, group: Tuple[str, str]) -> None:
+        timer = self._timers.pop(group, None)
+        if timer:
+            timer.cancel()
+        pending = self._pending.pop(group, None)
+        if pending:
+            task = asyncio.create_task(self._send(group, pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, group: Tuple[str, str], pending: Dict[str, asyncio.Future]) -> None:
+        account_key, page_access_token = group
+        self.requests += 1
+        try:
+            if len(pending) == 1:
+                ig_user_id = next(iter(pending))
+                results = {
+                    ig_user_id: await meta_api.get_instagram_user_profile(
+                        ig_user_id, page_access_token, account_key or None
+                    )
+                }
+            else:
+                results = await meta_api.get_instagram_user_profiles(
+                    list(pending), page_access_token, account_key or None
+                )
+        except Exception as e:
+            results = {ig_user_id: e for ig_user_id in pending}
+
+        for ig_user_id, future in pending.items():
+            if future.done():
+                continue
+            result = results.get(ig_user_id)
+            if result is None:
+                future.set_exception(meta_api.MetaAPIError("Missing from batch response", retryable=True))
+            elif isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def metrics(self) -> dict:
+        """Lookups and the Graph requests that served them"""
+        return {
+            "lookups": self.lookups,
+            "requests": self.requests,
+            "pending": sum(len(pending) for pending in self._pending.values()),
+        }
+
+
+profile_batcher = ProfileBatcher(settings.META_BATCH_WINDOW_SECONDS, settings.META_BATCH_MAX_SIZE)
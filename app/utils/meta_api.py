@@ -1,59 +1,333 @@
+import asyncio
+import random
 import httpx
-from typing import Optional, Dict, Any
+import orjson
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, List, Union, AsyncIterator, Tuple
 from app.config.settings import settings
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.rate_limiter import rate_limiter, RateLimitWaitExceeded, RATE_LIMIT_ERROR_CODES
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Shared, pooled client for all Graph calls (created on startup, closed on shutdown)
+_client: Optional[httpx.AsyncClient] = None
 
-async def get_instagram_user_profile(ig_user_id: str, page_access_token: str) -> Dict[str, Any]:
-    """Get Instagram user profile by user ID"""
-    url = f"https://graph.facebook.com/{settings.META_API_VERSION}/{ig_user_id}"
+PROFILE_TIMEOUT = httpx.Timeout(settings.META_PROFILE_TIMEOUT_SECONDS, connect=settings.META_CONNECT_TIMEOUT_SECONDS)
+DISCOVERY_TIMEOUT = httpx.Timeout(settings.META_DISCOVERY_TIMEOUT_SECONDS, connect=settings.META_CONNECT_TIMEOUT_SECONDS)
+SEND_TIMEOUT = httpx.Timeout(settings.META_SEND_TIMEOUT_SECONDS, connect=settings.META_CONNECT_TIMEOUT_SECONDS)
+
+# Per-task override of META_RATE_LIMIT_MAX_WAIT_SECONDS (see allow_rate_limit_wait)
+_rate_limit_max_wait: ContextVar[Optional[float]] = ContextVar("rate_limit_max_wait", default=None)
+
+# Invalid/expired token (190), missing app permission (3) and permission denied (10):
+# every call with the same token will fail, so the account's circuit opens at once
+FATAL_ERROR_CODES = {190, 3, 10}
+# Code 10 with this subcode is the 24-hour messaging window, which only affects one recipient
+MESSAGING_WINDOW_SUBCODE = 2534022
+# Unknown error / service temporarily unavailable
+TRANSIENT_ERROR_CODES = {1, 2}
+# Failures where the request never reached Meta, so even a send can be retried safely
+RETRY_SAFE_TRANSPORT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# Maximum sub-requests in one Graph batch request
+GRAPH_BATCH_LIMIT = 50
+MEDIA_FIELDS = "id,caption,media_type,media_url,permalink,timestamp"
+
+# Per-account breaker (keyed like the rate limiter: page or Instagram Business ID)
+circuit_breaker = CircuitBreaker(
+    "Meta Graph",
+    failure_threshold=settings.META_CIRCUIT_FAILURE_THRESHOLD,
+    reset_seconds=settings.META_CIRCUIT_RESET_SECONDS,
+    fatal_reset_seconds=settings.META_CIRCUIT_FATAL_RESET_SECONDS,
+)
+
+
+class MetaAPIError(Exception):
+    """A Graph API call that failed (after any retries)"""
+
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        code: Optional[int] = None,
+        subcode: Optional[int] = None,
+        error_type: Optional[str] = None,
+        retryable: bool = False,
+    ):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+        self.subcode = subcode
+        self.error_type = error_type
+        self.retryable = retryable
+
+    @property
+    def fatal(self) -> bool:
+        """The account's token or app can't make this call; retrying won't help"""
+        return self.code in FATAL_ERROR_CODES and not (
+            self.code == 10 and self.subcode == MESSAGING_WINDOW_SUBCODE
+        )
+
+    @property
+    def rate_limited(self) -> bool:
+        return self.status_code == 429 or self.code in RATE_LIMIT_ERROR_CODES
+
+
+class CircuitOpenError(MetaAPIError):
+    """Raised without calling Graph while an account's circuit is open"""
+
+    def __init__(self, account_key: str, reason: str, retry_after: float):
+        super().__init__(
+            f"Meta API calls for {account_key} suspended for {retry_after:.0f}s after: {reason}",
+            retryable=True,
+        )
+        self.retry_after = retry_after
+
+
+class RateLimitedError(MetaAPIError):
+    """Raised without calling Graph when the account's rate limit would make the caller wait too long"""
+
+    def __init__(self, account_key: str, retry_after: float):
+        super().__init__(
+            f"Meta API rate limit for {account_key}: retry in {retry_after:.0f}s",
+            status_code=429,
+            retryable=True,
+        )
+        self.retry_after = retry_after
+
+
+def allow_rate_limit_wait(seconds: float) -> None:
+    """Let Graph calls made by the current task wait up to seconds for the rate limiter
+
+    For background jobs nobody is waiting on; request and webhook paths keep the
+    short META_RATE_LIMIT_MAX_WAIT_SECONDS and fail fast with RateLimitedError.
+    """
+    _rate_limit_max_wait.set(seconds)
+
+
+def _build_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=settings.META_HTTP2,
+        limits=httpx.Limits(
+            max_connections=settings.META_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.META_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.META_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        timeout=SEND_TIMEOUT,
+        transport=transport,
+    )
+
+
+async def init_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> None:
+    """Create the shared Graph API client (transport can be overridden for tests and benchmarks)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = _build_client(transport)
+    logger.info(f"Meta Graph client ready (http2={settings.META_HTTP2})")
+
+
+async def close_client() -> None:
+    """Close the shared Graph API client and its connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared Graph API client, creating it if startup didn't"""
+    global _client
+    if _client is None:
+        _client = _build_client()
+    return _client
+
+
+def graph_url(path: str) -> str:
+    """Versioned Graph API URL for a path like '{id}' or '{page_id}/messages'"""
+    return f"{settings.META_GRAPH_URL}/{settings.META_API_VERSION}/{path}"
+
+
+def _graph_error(status_code: int, body: Union[str, bytes], idempotent: bool) -> MetaAPIError:
+    """Build a MetaAPIError from a Graph error status and body"""
+    try:
+        error = orjson.loads(body).get("error") or {}
+    except (orjson.JSONDecodeError, AttributeError):
+        error = {}
+    code = error.get("code")
+    # 5xx without a transient error code may have been processed: only idempotent calls are retried blindly
+    retryable = bool(error.get("is_transient")) or code in TRANSIENT_ERROR_CODES or (
+        idempotent and status_code >= 500
+    )
+    return MetaAPIError(
+        error.get("message") or (body.decode("utf-8", "replace") if isinstance(body, bytes) else body) or f"HTTP {status_code}",
+        status_code=status_code,
+        code=code,
+        subcode=error.get("error_subcode"),
+        error_type=error.get("type"),
+        retryable=retryable,
+    )
+
+
+def _retry_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter"""
+    ceiling = min(settings.META_RETRY_BASE_DELAY_SECONDS * (2 ** (attempt - 1)), settings.META_RETRY_MAX_DELAY_SECONDS)
+    return random.uniform(0, ceiling)
+
+
+async def _graph_request(
+    method: str, url: str, account_key: str, idempotent: Optional[bool] = None, **kwargs: Any
+) -> httpx.Response:
+    """Send a Graph request with rate limiting, retries and the account's circuit breaker
+    
+    idempotent defaults to True for GETs; only idempotent calls are retried
+    after failures that may have reached Meta. Returns a successful response;
+    raises MetaAPIError (CircuitOpenError or RateLimitedError when failing
+    fast) otherwise.
+    """
+    if idempotent is None:
+        idempotent = method == "GET"
+    blocked = circuit_breaker.blocked(account_key)
+    if blocked:
+        raise CircuitOpenError(account_key, *blocked)
+    
+    max_wait = _rate_limit_max_wait.get()
+    if max_wait is None:
+        max_wait = settings.META_RATE_LIMIT_MAX_WAIT_SECONDS
+    attempts = max(settings.META_RETRY_ATTEMPTS, 1)
+    for attempt in range(1, attempts + 1):
+        try:
+            await rate_limiter.acquire(account_key, max_wait)
+        except RateLimitWaitExceeded as e:
+            raise RateLimitedError(account_key, e.retry_after) from None
+        try:
+            response = await get_client().request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            error = MetaAPIError(
+                f"{type(e).__name__}: {e}",
+                retryable=idempotent or isinstance(e, RETRY_SAFE_TRANSPORT_ERRORS),
+            )
+        else:
+            rate_limiter.observe(account_key, response)
+            if response.is_success:
+                circuit_breaker.record_success(account_key)
+                return response
+            error = _graph_error(response.status_code, response.content, idempotent)
+        
+        if error.fatal:
+            circuit_breaker.record_failure(account_key, str(error), fatal=True)
+            raise error
+        if not error.retryable:
+            if error.status_code is None or error.status_code >= 500:
+                circuit_breaker.record_failure(account_key, str(error))
+            elif not error.rate_limited:
+                # Graph answered; a client error says nothing about its health
+                circuit_breaker.record_success(account_key)
+            raise error
+        if attempt < attempts:
+            delay = _retry_delay(attempt)
+            logger.warning(f"Graph {method} for {account_key} failed ({error}), retry {attempt}/{attempts - 1} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+    
+    circuit_breaker.record_failure(account_key, str(error))
+    raise error
+
+
+async def get_instagram_user_profile(
+    ig_user_id: str, page_access_token: str, account_key: Optional[str] = None
+) -> Dict[str, Any]:
+    """Get Instagram user profile by user ID
+    
+    account_key (the page or Instagram Business ID the token belongs to) selects
+    the rate-limit bucket; defaults to the user ID.
+    """
+    url = graph_url(ig_user_id)
     params = {
         "fields": "username,name",
         "access_token": page_access_token,
     }
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            return {
-                "username": data.get("username"),
-                "name": data.get("name"),
-            }
-        except httpx.HTTPError as e:
-            logger.error(f"Error fetching Instagram user profile: {e}")
-            raise
+    try:
+        response = await _graph_request("GET", url, account_key or ig_user_id, params=params, timeout=PROFILE_TIMEOUT)
+        data = response.json()
+        return {
+            "username": data.get("username"),
+            "name": data.get("name"),
+        }
+    except MetaAPIError as e:
+        logger.error(f"Error fetching Instagram user profile: {e}")
+        raise
+
+
+async def get_instagram_user_profiles(
+    ig_user_ids: List[str], page_access_token: str, account_key: Optional[str] = None
+) -> Dict[str, Union[Dict[str, Any], MetaAPIError]]:
+    """Get up to GRAPH_BATCH_LIMIT Instagram user profiles in one Graph batch request
+    
+    Returns the profile, or the MetaAPIError of its sub-request, for each user ID.
+    """
+    if len(ig_user_ids) > GRAPH_BATCH_LIMIT:
+        raise ValueError(f"At most {GRAPH_BATCH_LIMIT} profiles per batch request")
+    
+    url = f"{settings.META_GRAPH_URL}/{settings.META_API_VERSION}"
+    batch = [{"method": "GET", "relative_url": f"{ig_user_id}?fields=username,name"} for ig_user_id in ig_user_ids]
+    data = {
+        "batch": orjson.dumps(batch).decode(),
+        "include_headers": "false",
+        "access_token": page_access_token,
+    }
+    
+    try:
+        # A batch of GETs is safe to retry as a whole
+        response = await _graph_request(
+            "POST", url, account_key or ig_user_ids[0], idempotent=True, data=data, timeout=DISCOVERY_TIMEOUT
+        )
+        items = response.json()
+    except MetaAPIError as e:
+        logger.error(f"Error fetching {len(ig_user_ids)} Instagram user profiles: {e}")
+        raise
+    
+    results: Dict[str, Union[Dict[str, Any], MetaAPIError]] = {}
+    for ig_user_id, item in zip(ig_user_ids, items):
+        if not item:
+            # Graph returns null for sub-requests it didn't get to in time
+            results[ig_user_id] = MetaAPIError("Batch sub-request not completed", retryable=True)
+        elif item.get("code") == 200:
+            profile = orjson.loads(item.get("body") or "{}")
+            results[ig_user_id] = {"username": profile.get("username"), "name": profile.get("name")}
+        else:
+            error = _graph_error(item.get("code") or 500, item.get("body") or "", idempotent=True)
+            if error.fatal:
+                circuit_breaker.record_failure(account_key or ig_user_ids[0], str(error), fatal=True)
+            results[ig_user_id] = error
+    return results
 
 
 async def get_instagram_user_by_username(
     instagram_business_id: str, username: str, page_access_token: str
 ) -> Dict[str, Any]:
     """Get Instagram user profile by username using business_discovery"""
-    url = f"https://graph.facebook.com/{settings.META_API_VERSION}/{instagram_business_id}"
+    url = graph_url(instagram_business_id)
     params = {
         "fields": f"business_discovery.username({username}){{username,name,biography,website,profile_picture_url}}",
         "access_token": page_access_token,
     }
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            business_discovery = data.get("business_discovery", {})
-            return {
-                "username": business_discovery.get("username"),
-                "name": business_discovery.get("name"),
-                "biography": business_discovery.get("biography"),
-                "website": business_discovery.get("website"),
-                "profile_picture_url": business_discovery.get("profile_picture_url"),
-            }
-        except httpx.HTTPError as e:
-            logger.error(f"Error fetching Instagram user by username: {e}")
-            raise
+    try:
+        response = await _graph_request("GET", url, instagram_business_id, params=params, timeout=PROFILE_TIMEOUT)
+        data = response.json()
+        business_discovery = data.get("business_discovery", {})
+        return {
+            "username": business_discovery.get("username"),
+            "name": business_discovery.get("name"),
+            "biography": business_discovery.get("biography"),
+            "website": business_discovery.get("website"),
+            "profile_picture_url": business_discovery.get("profile_picture_url"),
+        }
+    except MetaAPIError as e:
+        logger.error(f"Error fetching Instagram user by username: {e}")
+        raise
 
 
 async def send_instagram_message(
@@ -77,7 +351,7 @@ async def send_instagram_message(
     """
     # Use Page ID if available, otherwise fall back to Instagram Business ID
     target_id = page_id or instagram_business_id
-    url = f"https://graph.facebook.com/{settings.META_API_VERSION}/{target_id}/messages"
+    url = graph_url(f"{target_id}/messages")
     
     headers = {"Content-Type": "application/json"}
     params = {"access_token": page_access_token}
@@ -91,49 +365,46 @@ async def send_instagram_message(
         data["messaging_type"] = "MESSAGE_TAG"
         data["tag"] = messaging_tag
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(url, json=data, headers=headers, params=params)
-            response.raise_for_status()
-            result = response.json()
-            return {"message_id": result.get("message_id")}
-        except httpx.HTTPStatusError as e:
-            error_detail = "Unknown error"
-            user_friendly_message = None
-            if e.response is not None:
-                try:
-                    error_data = e.response.json()
-                    error_detail = error_data.get("error", {}).get("message", str(e.response.text))
-                    error_code = error_data.get("error", {}).get("code", "")
-                    error_type = error_data.get("error", {}).get("type", "")
-                    logger.error(f"Meta API Error - Type: {error_type}, Code: {error_code}, Message: {error_detail}")
-                    
-                    # Provide user-friendly error messages
-                    if error_code == 10 or "(#10)" in error_detail:
-                        user_friendly_message = (
-                            "Cannot send message: The 24-hour messaging window has expired. "
-                            "The user must message you again to open a new window, or you need to use "
-                            "an approved messaging tag (requires Meta App Review approval)."
-                        )
-                    elif error_code == 3 or "(#3)" in error_detail:
-                        user_friendly_message = (
-                            "Cannot send message: Application does not have permission. "
-                            "Please check your Meta App permissions and access token."
-                        )
-                except:
-                    error_detail = e.response.text
-            
-            if user_friendly_message:
-                logger.error(f"Error sending Instagram message: {user_friendly_message}")
-                raise Exception(f"Failed to send message: {user_friendly_message}")
-            else:
-                logger.error(f"Error sending Instagram message: {error_detail}")
-                raise Exception(f"Failed to send message: {error_detail}")
-        except httpx.HTTPError as e:
-            logger.error(f"Error sending Instagram message: {e}")
-            if hasattr(e, "response") and e.response is not None:
-                logger.error(f"Response: {e.response.text}")
-            raise
+    try:
+        response = await _graph_request(
+            "POST", url, target_id, json=data, headers=headers, params=params, timeout=SEND_TIMEOUT
+        )
+        result = response.json()
+        return {"message_id": result.get("message_id")}
+    except (CircuitOpenError, RateLimitedError) as e:
+        logger.error(f"Error sending Instagram message: {e}")
+        raise
+    except MetaAPIError as e:
+        logger.error(f"Meta API Error - Type: {e.error_type}, Code: {e.code}, Subcode: {e.subcode}, Message: {e}")
+        
+        # Provide user-friendly error messages
+        user_friendly_message = None
+        if e.code == 10 and e.subcode == MESSAGING_WINDOW_SUBCODE:
+            user_friendly_message = (
+                "Cannot send message: The 24-hour messaging window has expired. "
+                "The user must message you again to open a new window, or you need to use "
+                "an approved messaging tag (requires Meta App Review approval)."
+            )
+        elif e.code in (3, 10):
+            user_friendly_message = (
+                "Cannot send message: Application does not have permission. "
+                "Please check your Meta App permissions and access token."
+            )
+        elif e.code == 190:
+            user_friendly_message = (
+                "Cannot send message: The page access token is invalid or expired. "
+                "Please reconnect the Instagram account."
+            )
+        
+        logger.error(f"Error sending Instagram message: {user_friendly_message or e}")
+        raise MetaAPIError(
+            f"Failed to send message: {user_friendly_message or e}",
+            status_code=e.status_code,
+            code=e.code,
+            subcode=e.subcode,
+            error_type=e.error_type,
+            retryable=e.retryable,
+        ) from e
 
 
 async def send_instagram_attachment(
@@ -146,7 +417,7 @@ async def send_instagram_attachment(
     """Send an attachment via Instagram Messaging API"""
     # Use Page ID if available, otherwise fall back to Instagram Business ID
     target_id = page_id or instagram_business_id
-    url = f"https://graph.facebook.com/{settings.META_API_VERSION}/{target_id}/messages"
+    url = graph_url(f"{target_id}/messages")
     
     headers = {"Content-Type": "application/json"}
     params = {"access_token": page_access_token}
@@ -160,61 +431,138 @@ async def send_instagram_attachment(
         },
     }
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(url, json=data, headers=headers, params=params)
-            response.raise_for_status()
-            result = response.json()
-            return {"message_id": result.get("message_id")}
-        except httpx.HTTPStatusError as e:
-            error_detail = "Unknown error"
-            if e.response is not None:
-                try:
-                    error_data = e.response.json()
-                    error_detail = error_data.get("error", {}).get("message", str(e.response.text))
-                    error_code = error_data.get("error", {}).get("code", "")
-                    error_type = error_data.get("error", {}).get("type", "")
-                    logger.error(f"Meta API Error - Type: {error_type}, Code: {error_code}, Message: {error_detail}")
-                except:
-                    error_detail = e.response.text
-            logger.error(f"Error sending Instagram attachment: {error_detail}")
-            raise Exception(f"Failed to send attachment: {error_detail}")
-        except httpx.HTTPError as e:
-            logger.error(f"Error sending Instagram attachment: {e}")
-            if hasattr(e, "response") and e.response is not None:
-                logger.error(f"Response: {e.response.text}")
-            raise
+    try:
+        response = await _graph_request(
+            "POST", url, target_id, json=data, headers=headers, params=params, timeout=SEND_TIMEOUT
+        )
+        result = response.json()
+        return {"message_id": result.get("message_id")}
+    except (CircuitOpenError, RateLimitedError) as e:
+        logger.error(f"Error sending Instagram attachment: {e}")
+        raise
+    except MetaAPIError as e:
+        logger.error(f"Meta API Error - Type: {e.error_type}, Code: {e.code}, Subcode: {e.subcode}, Message: {e}")
+        raise MetaAPIError(
+            f"Failed to send attachment: {e}",
+            status_code=e.status_code,
+            code=e.code,
+            subcode=e.subcode,
+            error_type=e.error_type,
+            retryable=e.retryable,
+        ) from e
 
 
 async def get_instagram_profile_details(
     instagram_business_id: str, username: str, page_access_token: str
 ) -> Dict[str, Any]:
     """Get full Instagram profile details including media"""
-    url = f"https://graph.facebook.com/{settings.META_API_VERSION}/{instagram_business_id}"
+    url = graph_url(instagram_business_id)
     params = {
-        "fields": f"business_discovery.username({username}){{username,name,biography,website,profile_picture_url,followers_count,media_count,media{{id,caption,media_type,media_url,permalink,timestamp}}}}",
+        "fields": f"business_discovery.username({username}){{username,name,biography,website,profile_picture_url,followers_count,media_count,media{{{MEDIA_FIELDS}}}}}",
         "access_token": page_access_token,
     }
     
-    async with httpx.AsyncClient() as client:
+    try:
+        response = await _graph_request("GET", url, instagram_business_id, params=params, timeout=DISCOVERY_TIMEOUT)
+        data = response.json()
+        business_discovery = data.get("business_discovery", {})
+        media = business_discovery.get("media", {}).get("data", [])
+        
+        return {
+            "username": business_discovery.get("username"),
+            "name": business_discovery.get("name"),
+            "biography": business_discovery.get("biography"),
+            "website": business_discovery.get("website"),
+            "profilePictureUrl": business_discovery.get("profile_picture_url"),
+            "followersCount": business_discovery.get("followers_count", 0),
+            "mediaCount": business_discovery.get("media_count", 0),
+            "media": media,
+        }
+    except MetaAPIError as e:
+        logger.error(f"Error fetching Instagram profile details: {e}")
+        raise
+
+
+
+async def iter_instagram_media_pages(
+    instagram_business_id: str,
+    username: str,
+    page_access_token: str,
+    page_size: int = 25,
+    after: Optional[str] = None,
+) -> AsyncIterator[Tuple[List[Dict[str, Any]], Optional[str]]]:
+    """Yield (media, next cursor) pages of an account's media via business_discovery
+    
+    Pages are requested lazily as the caller iterates, following Graph's
+    `after` cursors; the last page yields a None cursor.
+    """
+    url = graph_url(instagram_business_id)
+    while True:
+        media_edge = f"media.limit({page_size})" + (f".after({after})" if after else "")
+        params = {
+            "fields": f"business_discovery.username({username}){{{media_edge}{{{MEDIA_FIELDS}}}}}",
+            "access_token": page_access_token,
+        }
         try:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            business_discovery = data.get("business_discovery", {})
-            media = business_discovery.get("media", {}).get("data", [])
-            
-            return {
-                "username": business_discovery.get("username"),
-                "name": business_discovery.get("name"),
-                "biography": business_discovery.get("biography"),
-                "website": business_discovery.get("website"),
-                "profilePictureUrl": business_discovery.get("profile_picture_url"),
-                "followersCount": business_discovery.get("followers_count", 0),
-                "mediaCount": business_discovery.get("media_count", 0),
-                "media": media,
-            }
-        except httpx.HTTPError as e:
-            logger.error(f"Error fetching Instagram profile details: {e}")
+            response = await _graph_request("GET", url, instagram_business_id, params=params, timeout=DISCOVERY_TIMEOUT)
+        except MetaAPIError as e:
+            logger.error(f"Error fetching Instagram media page: {e}")
             raise
+        media = response.json().get("business_discovery", {}).get("media", {})
+        paging = media.get("paging", {})
+        # Graph omits `next` on the last page even though a cursor is still returned
+        after = paging.get("cursors", {}).get("after") if paging.get("next") else None
+        yield media.get("data", []), after
+        if not after:
+            return
+
+
+async def iter_instagram_media(
+    instagram_business_id: str, username: str, page_access_token: str, page_size: int = 50
+) -> AsyncIterator[Dict[str, Any]]:
+    """Yield an account's media items one by one, fetching pages on demand"""
+    async for media, _ in iter_instagram_media_pages(
+        instagram_business_id, username, page_access_token, page_size
+    ):
+        for item in media:
+            yield item
+
 
+async def _iter_edge_pages(
+    url: str, account_key: str, params: Dict[str, Any], after: Optional[str] = None
+) -> AsyncIterator[Tuple[List[Dict[str, Any]], Optional[str]]]:
+    """Yield (items, next cursor) pages of a Graph edge, following `after` cursors on demand"""
+    while True:
+        page_params = dict(params, after=after) if after else params
+        response = await _graph_request("GET", url, account_key, params=page_params, timeout=DISCOVERY_TIMEOUT)
+        data = response.json()
+        paging = data.get("paging", {})
+        after = paging.get("cursors", {}).get("after") if paging.get("next") else None
+        yield data.get("data", []), after
+        if not after:
+            return
+
+
+def iter_instagram_conversation_pages(
+    page_id: str, page_access_token: str, page_size: int = 50, after: Optional[str] = None
+) -> AsyncIterator[Tuple[List[Dict[str, Any]], Optional[str]]]:
+    """Yield (conversations, next cursor) pages of a page's Instagram conversations, newest first"""
+    params = {
+        "platform": "instagram",
+        "fields": "id,updated_time,participants",
+        "limit": page_size,
+        "access_token": page_access_token,
+    }
+    return _iter_edge_pages(graph_url(f"{page_id}/conversations"), page_id, params, after)
+
+
+def iter_instagram_conversation_messages(
+    conversation_id: str, page_access_token: str, account_key: str, page_size: int = 100
+) -> AsyncIterator[Tuple[List[Dict[str, Any]], Optional[str]]]:
+    """Yield (messages, next cursor) pages of one conversation, newest first"""
+    params = {
+        "fields": "id,created_time,from,to,message,attachments",
+        "limit": page_size,
+        "access_token": page_access_token,
+    }
+    return _iter_edge_pages(graph_url(f"{conversation_id}/messages"), account_key, params)
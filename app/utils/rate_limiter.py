@@ -0,0 +1,170 @@
+import asyncio
+import json
+import math
+import time
+from typing import Any, Dict
+import httpx
+from app.config.settings import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Graph error codes that mean "slow down" (app, user, page and custom rate limits)
+RATE_LIMIT_ERROR_CODES = {4, 17, 32, 613}
+
+
+def _max_usage(usage: Dict[str, Any]) -> float:
+    """Highest of the call count / CPU time / total time percentages in a usage object"""
+    return float(max(usage.get("call_count", 0) or 0, usage.get("total_cputime", 0) or 0, usage.get("total_time", 0) or 0))
+
+
+class RateLimitWaitExceeded(Exception):
+    """A token would take longer than the caller's max_wait"""
+
+    def __init__(self, key: str, retry_after: float):
+        super().__init__(f"Rate limit for {key}: next call allowed in {retry_after:.1f}s")
+        self.key = key
+        self.retry_after = retry_after
+
+
+class _Bucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.factor = 1.0  # Throttling factor from this key's business use case usage
+        self.usage = 0.0
+        self.paused_until = 0.0
+        self.waiting = 0
+        self.acquired = 0
+        self.waited_seconds = 0.0
+        self.rejected = 0
+        self.lock = asyncio.Lock()
+
+
+class GraphRateLimiter:
+    """Adaptive token-bucket limiter for Graph API calls, one bucket per page/account
+
+    Buckets refill at META_RATE_LIMIT_PER_SECOND. Once Meta's X-App-Usage or
+    X-Business-Use-Case-Usage headers report usage above
+    META_USAGE_SLOWDOWN_THRESHOLD percent the refill rate is scaled down, and a
+    bucket is paused entirely while Meta reports a time to regain access.
+    Callers over the limit wait in FIFO order, up to their max_wait.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[str, _Bucket] = {}
+        self.app_usage = 0.0
+        self.app_factor = 1.0
+
+    def _bucket(self, key: str) -> _Bucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = _Bucket(settings.META_RATE_LIMIT_PER_SECOND, settings.META_RATE_LIMIT_BURST)
+            self._buckets[key] = bucket
+        return bucket
+
+    @staticmethod
+    def _factor(usage: float) -> float:
+        """Scale the refill rate down linearly from the slowdown threshold to 100% usage"""
+        threshold = settings.META_USAGE_SLOWDOWN_THRESHOLD
+        if usage <= threshold:
+            return 1.0
+        remaining = max(100.0 - usage, 0.0) / max(100.0 - threshold, 1e-9)
+        return max(settings.META_RATE_LIMIT_MIN_FACTOR, remaining)
+
+    async def acquire(self, key: str, max_wait: float = math.inf) -> None:
+        """Wait for a token on key's bucket
+
+        Raises RateLimitWaitExceeded at once, instead of sleeping, when the bucket
+        is paused or queued for longer than max_wait seconds.
+        """
+        bucket = self._bucket(key)
+        started = time.monotonic()
+        if bucket.paused_until - started > max_wait:
+            bucket.rejected += 1
+            raise RateLimitWaitExceeded(key, bucket.paused_until - started)
+        bucket.waiting += 1
+        try:
+            try:
+                await asyncio.wait_for(bucket.lock.acquire(), timeout=None if max_wait == math.inf else max_wait)
+            except asyncio.TimeoutError:
+                bucket.rejected += 1
+                raise RateLimitWaitExceeded(key, max(bucket.paused_until - time.monotonic(), max_wait)) from None
+            try:
+                while True:
+                    now = time.monotonic()
+                    rate = bucket.rate * min(bucket.factor, self.app_factor)
+                    bucket.tokens = min(bucket.capacity, bucket.tokens + (now - bucket.updated) * rate)
+                    bucket.updated = now
+                    if now < bucket.paused_until:
+                        wait = bucket.paused_until - now
+                    elif bucket.tokens >= 1:
+                        bucket.tokens -= 1
+                        break
+                    else:
+                        wait = (1 - bucket.tokens) / rate
+                    if now - started + wait > max_wait:
+                        bucket.rejected += 1
+                        raise RateLimitWaitExceeded(key, wait)
+                    await asyncio.sleep(wait)
+            finally:
+                bucket.lock.release()
+        finally:
+            bucket.waiting -= 1
+        bucket.acquired += 1
+        bucket.waited_seconds += time.monotonic() - started
+
+    def observe(self, key: str, response: httpx.Response) -> None:
+        """Adjust throttling from a Graph response's usage headers and rate-limit errors"""
+        bucket = self._bucket(key)
+        now = time.monotonic()
+        try:
+            app_usage = response.headers.get("x-app-usage")
+            if app_usage:
+                self.app_usage = _max_usage(json.loads(app_usage))
+                self.app_factor = self._factor(self.app_usage)
+
+            business_usage = response.headers.get("x-business-use-case-usage")
+            if business_usage:
+                entries = [entry for values in json.loads(business_usage).values() for entry in values]
+                if entries:
+                    bucket.usage = max(_max_usage(entry) for entry in entries)
+                    bucket.factor = self._factor(bucket.usage)
+                    # Reported in minutes
+                    regain = max(entry.get("estimated_time_to_regain_access", 0) or 0 for entry in entries)
+                    if regain:
+                        bucket.paused_until = max(bucket.paused_until, now + regain * 60)
+
+            if response.status_code == 429 or (
+                response.status_code >= 400 and response.json().get("error", {}).get("code") in RATE_LIMIT_ERROR_CODES
+            ):
+                bucket.paused_until = max(bucket.paused_until, now + settings.META_RATE_LIMIT_PAUSE_SECONDS)
+                logger.warning(f"Graph rate limit hit for {key}; pausing until usage recovers")
+        except (ValueError, AttributeError, TypeError) as e:
+            logger.debug(f"Could not parse Graph usage headers for {key}: {e}")
+
+    def metrics(self) -> dict:
+        """Limiter state per key"""
+        now = time.monotonic()
+        return {
+            "appUsagePercent": self.app_usage,
+            "appFactor": round(self.app_factor, 3),
+            "buckets": {
+                key: {
+                    "tokens": round(bucket.tokens, 2),
+                    "usagePercent": bucket.usage,
+                    "factor": round(bucket.factor, 3),
+                    "pausedForSeconds": round(max(bucket.paused_until - now, 0.0), 1),
+                    "waiting": bucket.waiting,
+                    "acquired": bucket.acquired,
+                    "rejected": bucket.rejected,
+                    "waitedSeconds": round(bucket.waited_seconds, 3),
+                }
+                for key, bucket in self._buckets.items()
+            },
+        }
+
+
+rate_limiter = GraphRateLimiter()
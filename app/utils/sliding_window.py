@@ -0,0 +1,45 @@
+import time
+from collections import OrderedDict, deque
+from typing import Deque
+
+
+class SlidingWindowLimiter:
+    """In-memory sliding-window attempt limiter, one window per key
+
+    An attempt is allowed while fewer than `limit` attempts for its key were
+    allowed in the last `window` seconds. Rejected attempts are not counted, so a
+    client that keeps retrying gets in again once its old attempts age out.
+    At most max_keys keys are tracked; the least recently used are forgotten.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self.rejected = 0
+        self._hits: "OrderedDict[str, Deque[float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._hits)
+
+    def hit(self, key: str, limit: int, window: float) -> float:
+        """Record an attempt; returns 0 if allowed, else seconds until one is"""
+        now = time.monotonic()
+        hits = self._hits.get(key)
+        if hits is None:
+            hits = self._hits[key] = deque()
+        self._hits.move_to_end(key)
+        while hits and hits[0] <= now - window:
+            hits.popleft()
+
+        if len(hits) >= limit:
+            self.rejected += 1
+            return hits[0] + window - now
+        hits.append(now)
+        while len(self._hits) > self.max_keys:
+            self._hits.popitem(last=False)
+        return 0.0
+
+    def reset(self, key: str) -> None:
+        self._hits.pop(key, None)
+
+    def metrics(self) -> dict:
+        return {"keys": len(self._hits), "rejected": self.rejected}
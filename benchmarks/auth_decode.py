@@ -0,0 +1,51 @@
+"""Access-token verification benchmark
+
+Measures the per-request cost of app.core.security.decode_token, as run by
+get_current_user on every authenticated request, with the verified-payload
+cache disabled (full HS256 verify + JSON decode each time) and enabled. No
+MongoDB needed:
+
+    python -m benchmarks.auth_decode --requests 100000 --tokens 50
+"""
+import argparse
+import time
+from typing import List
+
+from benchmarks import env  # noqa: F401  (must precede app imports)
+
+from app.config.settings import settings
+from app.core import security
+from benchmarks.stats import summarize
+
+
+def run(tokens: List[str], requests: int, cache_size: int) -> List[float]:
+    """Decode `requests` tokens round-robin; returns per-call microseconds"""
+    settings.JWT_DECODE_CACHE_SIZE = cache_size
+    security._decoded.clear()
+    timings = []
+    for i in range(requests):
+        token = tokens[i % len(tokens)]
+        started = time.perf_counter()
+        payload = security.decode_token(token)
+        timings.append((time.perf_counter() - started) * 1_000_000)
+        assert payload and payload["type"] == "access"
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--tokens", type=int, default=50, help="distinct clients (tokens) in rotation")
+    args = parser.parse_args()
+
+    tokens = [
+        security.create_access_token({"sub": f"{i:024x}", "role": "user"}) for i in range(args.tokens)
+    ]
+    cache_size = settings.JWT_DECODE_CACHE_SIZE
+    for label, size in (("uncached", 0), ("cached", cache_size)):
+        timings = run(tokens, args.requests, size)
+        print(f"{label:<10} {args.requests / (sum(timings) / 1_000_000):>12,.0f} decodes/s   latency (us) {summarize(timings)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Event-loop stall benchmark for password verification
+
+Runs concurrent bcrypt verifications (what a burst of logins does) while a
+probe task measures how late the event loop wakes it up, first calling
+verify_password inline (the old login path) and then verify_password_async (the
+bcrypt thread pool). No MongoDB needed:
+
+    python -m benchmarks.bcrypt_stall --logins 20 --rounds 12
+
+Stall is the probe's lateness beyond its 5 ms sleep; in a server it is the delay
+added to every other request, including webhook acks.
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from benchmarks import env  # noqa: F401  (must precede app imports)
+
+from app.config.settings import settings
+from app.core import security
+from benchmarks.stats import summarize
+
+PROBE_INTERVAL = 0.005
+
+
+async def probe(stalls: List[float], stop: asyncio.Event) -> None:
+    """Record how late each 5 ms sleep wakes up (ms)"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        stalls.append(max(time.perf_counter() - started - PROBE_INTERVAL, 0.0) * 1000)
+
+
+async def run(mode: str, hashed: str, logins: int) -> None:
+    stalls: List[float] = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(stalls, stop))
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+
+    async def login() -> None:
+        if mode == "inline":
+            assert security.verify_password("benchmark-password-1", hashed)
+        else:
+            assert await security.verify_password_async("benchmark-password-1", hashed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+
+    print(
+        f"{mode:<7} {logins} logins in {elapsed:.2f}s   loop stall (ms) {summarize(stalls)} "
+        f"max={max(stalls, default=0.0):.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=settings.BCRYPT_ROUNDS)
+    parser.add_argument("--workers", type=int, default=settings.BCRYPT_MAX_WORKERS)
+    args = parser.parse_args()
+
+    settings.BCRYPT_ROUNDS = args.rounds
+    settings.BCRYPT_MAX_WORKERS = args.workers
+    hashed = security.get_password_hash("benchmark-password-1")
+    print(f"bcrypt cost {args.rounds}, {args.workers} pool workers")
+    for mode in ("inline", "pool"):
+        asyncio.run(run(mode, hashed, args.logins))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""Default settings so benchmarks can import the app without a .env file
+
+Import this module before anything from `app`. Real environment variables win.
+"""
+import os
+
+BENCHMARK_ENV = {
+    "NODE_ENV": "benchmark",
+    "PORT": "8000",
+    "MONGODB_URL": "mongodb://127.0.0.1:27017/instagram-dm-benchmark",
+    "JWT_SECRET": "benchmark-secret",
+    "JWT_ACCESS_EXPIRATION_MINUTES": "30",
+    "JWT_REFRESH_EXPIRATION_DAYS": "30",
+    "META_APP_ID": "benchmark-app",
+    "META_APP_SECRET": "benchmark-app-secret",
+    "META_VERIFY_TOKEN": "benchmark-verify-token",
+    "META_API_VERSION": "v21.0",
+    "CORS_ORIGINS": "*",
+    "CLOUDINARY_CLOUD_NAME": "benchmark",
+    "CLOUDINARY_API_KEY": "benchmark",
+    "CLOUDINARY_API_SECRET": "benchmark",
+}
+
+for key, value in BENCHMARK_ENV.items():
+    os.environ.setdefault(key, value)
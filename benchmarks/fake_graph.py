@@ -0,0 +1,334 @@
+"""Offline stand-in for the Meta Graph API
+
+Implements the endpoints app.utils.meta_api calls, with configurable latency,
+injected errors and rate-limit usage headers:
+
+    GET  /{version}/{id}                       user profile (fields=username,name)
+    GET  /{version}/{id}?fields=business_discovery...   business discovery + media (cursor paged)
+    GET  /{version}/{page_id}/conversations    Instagram conversations (cursor paged)
+    GET  /{version}/{conversation_id}/messages conversation history (cursor paged)
+    POST /{version}/{page_id}/messages         send text/attachment
+    POST /{version}                            batch (form field `batch`)
+
+Use it in-process through an httpx transport:
+
+    fake = FakeGraph(latency_ms=80, error_rate=0.05, errors=["500", "190"])
+    await meta_api.init_client(transport=fake.transport())
+
+or as a server that META_GRAPH_URL can point at:
+
+    python -m benchmarks.fake_graph --port 8099 --latency-ms 80 --error-rate 0.05
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs
+
+import httpx
+
+
+# Injectable errors: name -> (HTTP status, Graph error object or None for an empty body)
+ERRORS: Dict[str, Tuple[int, Optional[Dict[str, Any]]]] = {
+    "10": (400, {
+        "message": "(#10) This message is sent outside of allowed window.",
+        "type": "OAuthException", "code": 10, "error_subcode": 2534022,
+    }),
+    "10-permission": (400, {"message": "(#10) Permission denied", "type": "OAuthException", "code": 10}),
+    "3": (400, {"message": "(#3) Application does not have the capability to make this API call.", "type": "OAuthException", "code": 3}),
+    "190": (400, {"message": "Invalid OAuth access token - Cannot parse access token", "type": "OAuthException", "code": 190}),
+    "4": (400, {"message": "(#4) Application request limit reached", "type": "OAuthException", "code": 4}),
+    "500": (500, {"message": "An unexpected error has occurred. Please retry your request later.", "type": "OAuthException", "code": 2, "is_transient": True}),
+    "503": (503, None),
+}
+
+
+class FakeGraph:
+    """ASGI app imitating the Graph endpoints used by meta_api
+
+    latency: "fixed" (latency_ms), "uniform" (latency_ms +/- jitter_ms) or
+    "lognormal" (median latency_ms, shape sigma) per request.
+    error_rate: share of requests (and batch sub-requests) answered with one
+    of `errors`, picked uniformly.
+    usage_percent / usage_step: value reported in X-App-Usage and
+    X-Business-Use-Case-Usage, growing by usage_step per request (capped at 100).
+    media_count: posts each business_discovery account has, served in pages of
+    media.limit(n) (25 by default) with offset cursors.
+    conversation_count / messages_per_conversation: history served by the
+    conversations and messages edges (`limit` per page, offset cursors).
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        latency: str = "fixed",
+        jitter_ms: float = 0.0,
+        sigma: float = 0.5,
+        error_rate: float = 0.0,
+        errors: Sequence[str] = ("500",),
+        usage_percent: Optional[float] = None,
+        usage_step: float = 0.0,
+        regain_access_minutes: int = 0,
+        media_count: int = 3,
+        conversation_count: int = 0,
+        messages_per_conversation: int = 20,
+        seed: Optional[int] = None,
+    ):
+        unknown = set(errors) - set(ERRORS)
+        if unknown:
+            raise ValueError(f"Unknown error kinds: {sorted(unknown)}; choose from {sorted(ERRORS)}")
+        self.latency_ms = latency_ms
+        self.latency = latency
+        self.jitter_ms = jitter_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.errors = list(errors)
+        self.usage_percent = usage_percent
+        self.usage_step = usage_step
+        self.regain_access_minutes = regain_access_minutes
+        self.media_count = media_count
+        self.conversation_count = conversation_count
+        self.messages_per_conversation = messages_per_conversation
+        self.random = random.Random(seed)
+        self.requests: Counter = Counter()
+        self.injected: Counter = Counter()
+        self._message_ids = itertools.count(1)
+
+    def transport(self) -> httpx.ASGITransport:
+        """httpx transport that routes requests to this app in-process"""
+        return httpx.ASGITransport(app=self)
+
+    def _delay(self) -> float:
+        if self.latency == "uniform":
+            ms = self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)
+        elif self.latency == "lognormal":
+            ms = self.random.lognormvariate(0, self.sigma) * self.latency_ms
+        else:
+            ms = self.latency_ms
+        return max(ms, 0.0) / 1000
+
+    def _fault(self) -> Optional[Tuple[int, Optional[Dict[str, Any]]]]:
+        if self.error_rate and self.random.random() < self.error_rate:
+            kind = self.random.choice(self.errors)
+            self.injected[kind] += 1
+            return ERRORS[kind]
+        return None
+
+    def _usage_headers(self, account_id: str) -> List[Tuple[bytes, bytes]]:
+        if self.usage_percent is None:
+            return []
+        usage = min(self.usage_percent, 100.0)
+        self.usage_percent += self.usage_step
+        app_usage = {"call_count": usage, "total_cputime": usage / 2, "total_time": usage / 2}
+        business_usage = {
+            account_id: [{
+                "type": "messenger",
+                "call_count": usage,
+                "total_cputime": usage / 2,
+                "total_time": usage / 2,
+                "estimated_time_to_regain_access": self.regain_access_minutes if usage >= 100 else 0,
+            }]
+        }
+        return [
+            (b"x-app-usage", json.dumps(app_usage).encode()),
+            (b"x-business-use-case-usage", json.dumps(business_usage).encode()),
+        ]
+
+    def _handle(self, method: str, path: str, query: Dict[str, str], body: bytes) -> Tuple[int, Any]:
+        """Answer one (sub-)request: (status, JSON body)"""
+        fault = self._fault()
+        if fault:
+            status, error = fault
+            return status, {"error": error} if error else None
+
+        parts = [part for part in path.split("/") if part]
+        if parts and parts[0].startswith("v") and parts[0][1:].replace(".", "").isdigit():
+            parts = parts[1:]  # Drop the API version
+
+        if method == "POST" and len(parts) == 2 and parts[1] == "messages":
+            self.requests["send"] += 1
+            payload = json.loads(body or b"{}")
+            recipient = payload.get("recipient", {}).get("id")
+            return 200, {"recipient_id": recipient, "message_id": f"m_fake_{next(self._message_ids)}"}
+
+        if method == "GET" and len(parts) == 2 and parts[1] == "conversations":
+            self.requests["conversations"] += 1
+            return 200, self._conversations(parts[0], query)
+
+        if method == "GET" and len(parts) == 2 and parts[1] == "messages":
+            self.requests["conversation_messages"] += 1
+            return 200, self._conversation_messages(parts[0], query)
+
+        if method == "GET" and len(parts) == 1:
+            fields = query.get("fields", "")
+            if fields.startswith("business_discovery"):
+                self.requests["business_discovery"] += 1
+                username = fields[len("business_discovery.username("):].split(")", 1)[0]
+                return 200, {"business_discovery": self._business_profile(username, fields), "id": parts[0]}
+            self.requests["profile"] += 1
+            return 200, {"id": parts[0], "username": f"user_{parts[0][-6:]}", "name": f"User {parts[0][-4:]}"}
+
+        return 404, {"error": {"message": f"Unknown path {path}", "type": "GraphMethodException", "code": 100}}
+
+    def _business_profile(self, username: str, fields: str) -> Dict[str, Any]:
+        limit = re.search(r"media\.limit\((\d+)\)", fields)
+        after = re.search(r"\.after\(([^)]*)\)", fields)
+        start = int(after.group(1)) if after else 0
+        end = min(start + (int(limit.group(1)) if limit else 25), self.media_count)
+        media: Dict[str, Any] = {
+            "data": [
+                {
+                    "id": f"{username}_media_{i}",
+                    "caption": f"Post {i}",
+                    "media_type": "IMAGE",
+                    "media_url": f"https://example.com/{username}/{i}.jpg",
+                    "permalink": f"https://instagram.com/p/{username}{i}",
+                    "timestamp": "2024-01-01T00:00:00+0000",
+                }
+                for i in range(start, end)
+            ],
+            "paging": {"cursors": {"before": str(start), "after": str(end)}},
+        }
+        if end < self.media_count:
+            media["paging"]["next"] = f"https://graph.facebook.com/fake?after={end}"
+        return {
+            "username": username,
+            "name": username.title(),
+            "biography": "Fake Graph profile",
+            "website": None,
+            "profile_picture_url": f"https://example.com/{username}.jpg",
+            "followers_count": 1234,
+            "media_count": self.media_count,
+            "media": media,
+        }
+
+    @staticmethod
+    def _page(query: Dict[str, str], total: int, default_limit: int) -> Tuple[range, Dict[str, Any]]:
+        """Offset window for `limit`/`after` and its Graph paging object"""
+        start = int(query.get("after") or 0)
+        end = min(start + int(query.get("limit") or default_limit), total)
+        paging: Dict[str, Any] = {"cursors": {"before": str(start), "after": str(end)}}
+        if end < total:
+            paging["next"] = f"https://graph.facebook.com/fake?after={end}"
+        return range(start, end), paging
+
+    def _conversations(self, page_id: str, query: Dict[str, str]) -> Dict[str, Any]:
+        window, paging = self._page(query, self.conversation_count, 25)
+        return {
+            "data": [
+                {
+                    "id": f"t_{page_id}_{i}",
+                    "updated_time": "2024-01-01T00:00:00+0000",
+                    "participants": {"data": [
+                        {"id": page_id, "username": "fake_business"},
+                        {"id": str(9000000000000000 + i), "username": f"user_{i}"},
+                    ]},
+                }
+                for i in window
+            ],
+            "paging": paging,
+        }
+
+    def _conversation_messages(self, conversation_id: str, query: Dict[str, str]) -> Dict[str, Any]:
+        _, page_id, index = conversation_id.rsplit("_", 2)
+        user_id = str(9000000000000000 + int(index))
+        window, paging = self._page(query, self.messages_per_conversation, 100)
+        data = []
+        for i in window:
+            sender, recipient = (user_id, page_id) if i % 2 == 0 else (page_id, user_id)
+            data.append({
+                "id": f"m_{conversation_id}_{i}",
+                "created_time": f"2024-01-01T{23 - i // 60 % 24:02d}:{59 - i % 60:02d}:00+0000",  # Newest first
+                "from": {"id": sender},
+                "to": {"data": [{"id": recipient}]},
+                "message": f"History message {i}",
+            })
+        return {"data": data, "paging": paging}
+
+    def _batch(self, form: Dict[str, str]) -> List[Optional[Dict[str, Any]]]:
+        self.requests["batch"] += 1
+        results = []
+        for item in json.loads(form.get("batch", "[]")):
+            path, _, query_string = item.get("relative_url", "").partition("?")
+            query = {key: values[0] for key, values in parse_qs(query_string).items()}
+            status, body = self._handle(item.get("method", "GET"), path, query, item.get("body", "").encode())
+            results.append({"code": status, "body": json.dumps(body) if body is not None else ""})
+        return results
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        await asyncio.sleep(self._delay())
+
+        query = {key: values[0] for key, values in parse_qs(scope.get("query_string", b"").decode()).items()}
+        parts = [part for part in scope["path"].split("/") if part]
+        account_id = parts[1] if len(parts) > 1 else "app"
+        headers = [(b"content-type", b"application/json")] + self._usage_headers(account_id)
+
+        if scope["method"] == "POST" and len(parts) <= 1:
+            form = {key: values[0] for key, values in parse_qs(body.decode()).items()}
+            status, payload = 200, self._batch(form)
+        else:
+            status, payload = self._handle(scope["method"], scope["path"], query, body)
+
+        content = json.dumps(payload).encode() if payload is not None else b""
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": content})
+
+    def summary(self) -> str:
+        return f"requests {dict(self.requests)}, injected errors {dict(self.injected)}"
+
+
+def add_arguments(parser: argparse.ArgumentParser, prefix: str = "") -> None:
+    """Register FakeGraph options on a benchmark's argument parser"""
+    parser.add_argument(f"--{prefix}latency-ms", type=float, default=50.0, help="Graph response latency")
+    parser.add_argument(f"--{prefix}latency", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument(f"--{prefix}jitter-ms", type=float, default=20.0, help="for --latency uniform")
+    parser.add_argument(f"--{prefix}error-rate", type=float, default=0.0, help="share of requests that fail")
+    parser.add_argument(f"--{prefix}errors", default="500", help=f"comma separated, from {','.join(ERRORS)}")
+    parser.add_argument(f"--{prefix}usage-percent", type=float, default=None, help="report rate-limit usage headers")
+    parser.add_argument(f"--{prefix}usage-step", type=float, default=0.0, help="usage growth per request")
+
+
+def from_arguments(args: argparse.Namespace, prefix: str = "", seed: Optional[int] = None) -> FakeGraph:
+    """Build a FakeGraph from options registered with add_arguments"""
+    def option(name: str) -> Any:
+        return getattr(args, prefix.replace("-", "_") + name)
+
+    return FakeGraph(
+        latency_ms=option("latency_ms"),
+        latency=option("latency"),
+        jitter_ms=option("jitter_ms"),
+        error_rate=option("error_rate"),
+        errors=[kind.strip() for kind in option("errors").split(",") if kind.strip()],
+        usage_percent=option("usage_percent"),
+        usage_step=option("usage_step"),
+        seed=seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    uvicorn.run(from_arguments(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
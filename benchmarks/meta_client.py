@@ -0,0 +1,79 @@
+"""Graph client connection reuse benchmark
+
+Compares per-call latency of a profile lookup made with a fresh httpx client per
+call (the old behaviour) against the shared pooled client in app.utils.meta_api.
+Both hit the fake Graph server (benchmarks.fake_graph) on localhost, so the
+numbers only include plain TCP setup; against graph.facebook.com the
+fresh-client path also pays DNS and TLS.
+
+    python -m benchmarks.meta_client --calls 500
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import time
+
+from benchmarks import env  # noqa: F401  (must precede app imports)
+
+import httpx
+import uvicorn
+
+from benchmarks.fake_graph import FakeGraph
+from benchmarks.stats import summarize
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run(args: argparse.Namespace) -> None:
+    port = free_port()
+    os.environ["META_GRAPH_URL"] = f"http://127.0.0.1:{port}"
+    from app.utils import meta_api
+
+    fake = FakeGraph()
+    server = uvicorn.Server(uvicorn.Config(fake, host="127.0.0.1", port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    try:
+        fresh = []
+        for i in range(args.calls):
+            started = time.perf_counter()
+            async with httpx.AsyncClient() as client:
+                response = await client.get(meta_api.graph_url(str(i)), params={"fields": "username,name", "access_token": "x"})
+                response.raise_for_status()
+            fresh.append((time.perf_counter() - started) * 1000)
+
+        await meta_api.init_client()
+        shared = []
+        for i in range(args.calls):
+            started = time.perf_counter()
+            await meta_api.get_instagram_user_profile(str(i), "x")
+            shared.append((time.perf_counter() - started) * 1000)
+        await meta_api.close_client()
+
+        print(f"calls                 {args.calls} sequential profile lookups")
+        print(f"client per call (ms)  {summarize(fresh)}")
+        print(f"shared client (ms)    {summarize(shared)}")
+    finally:
+        server.should_exit = True
+        await server_task
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    logging.getLogger("app").setLevel(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Synthetic Meta Instagram messaging webhook payloads"""
+import hashlib
+import hmac
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+
+class PayloadGenerator:
+    """Generate realistic webhook deliveries for a set of accounts and senders
+
+    Deliveries mix text messages, attachments, reactions and read receipts,
+    sometimes batch several entries together, and occasionally replay an
+    earlier message event the way Meta does when it retries a delivery.
+    """
+
+    EVENT_WEIGHTS = {
+        "text": 0.60,
+        "attachment": 0.15,
+        "reaction": 0.10,
+        "read": 0.10,
+        "duplicate": 0.05,
+    }
+    ATTACHMENT_TYPES = ["image", "video", "audio", "file", "share"]
+    REACTIONS = [("love", "❤️"), ("like", "\U0001f44d"), ("laugh", "\U0001f602")]
+
+    def __init__(
+        self,
+        accounts: List[Tuple[str, str]],
+        senders: int = 500,
+        max_entries: int = 3,
+        max_events_per_entry: int = 5,
+        seed: Optional[int] = None,
+    ):
+        """accounts is a list of (pageId, instagramBusinessId) pairs"""
+        self.accounts = accounts
+        self.senders = [str(17841400000000000 + i) for i in range(senders)]
+        self.max_entries = max_entries
+        self.max_events_per_entry = max_events_per_entry
+        self.random = random.Random(seed)
+        self.sent_message_events: List[Dict[str, Any]] = []
+        self._counter = 0
+
+    def _next_mid(self) -> str:
+        self._counter += 1
+        return f"aWdfZAG1faXRlbToxOklHTWVzc2FnZAUlEOjE3ODQxN{self._counter:012d}"
+
+    def _event_type(self) -> str:
+        types, weights = zip(*self.EVENT_WEIGHTS.items())
+        event_type = self.random.choices(types, weights)[0]
+        if event_type in ("duplicate", "reaction", "read") and not self.sent_message_events:
+            return "text"
+        return event_type
+
+    def messaging_event(self, recipient_id: str) -> Dict[str, Any]:
+        """One entry[].messaging[] item addressed to recipient_id"""
+        event_type = self._event_type()
+        if event_type == "duplicate":
+            return self.random.choice(self.sent_message_events)
+
+        now_ms = int(time.time() * 1000)
+        event: Dict[str, Any] = {
+            "sender": {"id": self.random.choice(self.senders)},
+            "recipient": {"id": recipient_id},
+            "timestamp": now_ms,
+        }
+        if event_type == "text":
+            words = self.random.randint(1, 40)
+            event["message"] = {
+                "mid": self._next_mid(),
+                "text": " ".join(self.random.choice(["hi", "price?", "thanks", "order", "when", "ok"]) for _ in range(words)),
+            }
+        elif event_type == "attachment":
+            att_type = self.random.choice(self.ATTACHMENT_TYPES)
+            event["message"] = {
+                "mid": self._next_mid(),
+                "attachments": [
+                    {
+                        "type": att_type,
+                        "payload": {"url": f"https://lookaside.fbsbx.com/ig_messaging_cdn/?asset_id={self._counter}&signature=x"},
+                    }
+                ],
+            }
+        elif event_type == "reaction":
+            target = self.random.choice(self.sent_message_events)
+            reaction, emoji = self.random.choice(self.REACTIONS)
+            event["sender"] = target["sender"]
+            event["reaction"] = {
+                "mid": target["message"]["mid"],
+                "action": self.random.choice(["react", "react", "unreact"]),
+                "reaction": reaction,
+                "emoji": emoji,
+            }
+        else:
+            target = self.random.choice(self.sent_message_events)
+            event["sender"] = target["sender"]
+            event["read"] = {"mid": target["message"]["mid"], "watermark": now_ms}
+
+        if "message" in event:
+            self.sent_message_events.append(event)
+        return event
+
+    def delivery(self) -> Dict[str, Any]:
+        """One webhook POST body with 1..max_entries entries"""
+        entries = []
+        for _ in range(self.random.randint(1, self.max_entries)):
+            page_id, ig_business_id = self.random.choice(self.accounts)
+            recipient_id = self.random.choice([page_id, ig_business_id])
+            entries.append(
+                {
+                    "id": ig_business_id,
+                    "time": int(time.time() * 1000),
+                    "messaging": [
+                        self.messaging_event(recipient_id)
+                        for _ in range(self.random.randint(1, self.max_events_per_entry))
+                    ],
+                }
+            )
+        return {"object": "instagram", "entry": entries}
+
+
+def encode_delivery(delivery: Dict[str, Any], app_secret: str) -> Tuple[bytes, Dict[str, str]]:
+    """Serialize a delivery and build the headers Meta would send with it"""
+    body = orjson.dumps(delivery)
+    signature = hmac.new(app_secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return body, {"Content-Type": "application/json", "X-Hub-Signature-256": f"sha256={signature}"}
+
+
+def message_ids(delivery: Dict[str, Any]) -> List[str]:
+    """Message IDs carried by a delivery"""
+    return [
+        event["message"]["mid"]
+        for entry in delivery["entry"]
+        for event in entry["messaging"]
+        if "message" in event
+    ]
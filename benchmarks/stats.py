@@ -0,0 +1,21 @@
+"""Small statistics helpers shared by the benchmarks"""
+from typing import List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(values: List[float]) -> str:
+    """p50/p99/mean of a list of millisecond timings"""
+    if not values:
+        return "n/a"
+    return (
+        f"p50={percentile(values, 50):.2f} p99={percentile(values, 99):.2f} "
+        f"mean={sum(values) / len(values):.2f}"
+    )
@@ -0,0 +1,144 @@
+"""Webhook ingestion load test
+
+Replays synthetic Meta deliveries against the ASGI app in-process and reports
+ack throughput/latency and end-to-end ingestion lag (POST -> Message stored).
+
+Requires a throwaway local MongoDB; the target database is dropped first:
+
+    docker run -d -p 27017:27017 mongo:7
+    python -m benchmarks.webhook_load --deliveries 2000 --concurrency 50
+
+Graph API calls go to the in-process fake Graph server (benchmarks.fake_graph),
+with configurable latency and fault injection (--graph-latency-ms, --graph-error-rate, ...).
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from benchmarks import env  # noqa: F401  (must precede app imports)
+
+import httpx
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.config.settings import settings
+from app.main import app, startup_event, shutdown_event
+from app.models.instagram_account import InstagramAccount
+from app.models.message import Message
+from app.services import webhook_queue_service
+from app.services.account_index import account_index
+from app.utils import meta_api
+from app.utils.graph_batcher import profile_batcher
+from benchmarks import fake_graph
+from benchmarks.payloads import PayloadGenerator, encode_delivery, message_ids
+from benchmarks.stats import percentile
+
+
+async def seed_accounts(count: int) -> List[tuple]:
+    """Create active accounts and return their (pageId, instagramBusinessId) pairs"""
+    pairs = []
+    for i in range(count):
+        account = InstagramAccount(
+            user=ObjectId(),
+            pageId=str(100000000000000 + i),
+            instagramBusinessId=str(17841400999000000 + i),
+            pageAccessToken="benchmark-token",
+            username=f"bench_account_{i}",
+        )
+        await account.insert()
+        pairs.append((account.pageId, account.instagramBusinessId))
+    await account_index.load()
+    return pairs
+
+
+async def wait_for_drain(timeout: float) -> bool:
+    """Wait until the webhook queue has no pending or processing events"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = await webhook_queue_service.get_queue_stats()
+        if stats["pending"] == 0 and stats["processing"] == 0:
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def run(args: argparse.Namespace) -> None:
+    # Start from an empty database
+    mongo = AsyncIOMotorClient(settings.MONGODB_URL)
+    await mongo.drop_database(mongo.get_default_database().name)
+    mongo.close()
+
+    graph = fake_graph.from_arguments(args, prefix="graph-", seed=args.seed)
+    await startup_event()
+    await meta_api.init_client(transport=graph.transport())
+    try:
+        generator = PayloadGenerator(await seed_accounts(args.accounts), senders=args.senders, seed=args.seed)
+        deliveries = [generator.delivery() for _ in range(args.deliveries)]
+        event_count = sum(len(entry["messaging"]) for d in deliveries for entry in d["entry"])
+
+        sent_at: Dict[str, datetime] = {}
+        ack_latencies: List[float] = []
+        statuses: Dict[int, int] = {}
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+            async def post(delivery: dict) -> None:
+                body, headers = encode_delivery(delivery, settings.META_APP_SECRET)
+                async with semaphore:
+                    now = datetime.utcnow()
+                    for mid in message_ids(delivery):
+                        sent_at.setdefault(mid, now)
+                    started = time.perf_counter()
+                    response = await client.post("/v1/webhook", content=body, headers=headers)
+                    ack_latencies.append((time.perf_counter() - started) * 1000)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(post(delivery) for delivery in deliveries))
+            ack_elapsed = time.perf_counter() - started
+
+        drained = await wait_for_drain(args.drain_timeout)
+        total_elapsed = time.perf_counter() - started
+
+        lags = []
+        stored = await Message.find({"messageId": {"$in": list(sent_at)}}).to_list()
+        for message in stored:
+            lags.append((message.createdAt - sent_at[message.messageId]).total_seconds() * 1000)
+
+        print(f"deliveries            {args.deliveries} ({event_count} messaging events, {len(sent_at)} unique messages)")
+        print(f"response codes        {statuses}")
+        print(f"ack throughput        {args.deliveries / ack_elapsed:,.0f} deliveries/s")
+        print(f"ack latency (ms)      p50={percentile(ack_latencies, 50):.2f} p99={percentile(ack_latencies, 99):.2f} max={max(ack_latencies):.2f}")
+        print(f"ingest throughput     {event_count / total_elapsed:,.0f} events/s (queue drained: {drained})")
+        print(f"ingestion lag (ms)    p50={percentile(lags, 50):.1f} p99={percentile(lags, 99):.1f} max={max(lags, default=0):.1f}")
+        print(f"messages stored       {len(stored)}/{len(sent_at)}")
+        batching = profile_batcher.metrics()
+        print(f"profile lookups       {batching['lookups']} in {batching['requests']} Graph requests")
+        print(f"fake Graph            {graph.summary()}")
+        if lags:
+            print(f"mean lag (ms)         {statistics.mean(lags):.1f}")
+    finally:
+        await shutdown_event()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deliveries", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent webhook POSTs")
+    parser.add_argument("--accounts", type=int, default=5)
+    parser.add_argument("--senders", type=int, default=500)
+    fake_graph.add_arguments(parser, prefix="graph-")
+    parser.add_argument("--drain-timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    logging.getLogger("app").setLevel(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()